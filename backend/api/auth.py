@@ -4,17 +4,21 @@ from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
 import os
 
 from backend.api.database import get_db
 from backend.api.models.vitya import User
+from backend.api.services.principal_cache import principal_cache
 
 SECRET_KEY = os.getenv("SECRET_KEY", "fallback-secret-for-dev")
 ALGORITHM = "HS256"
 
 security = HTTPBearer()
 
+# columns kept in the principal cache (password hash stays in the DB)
+PRINCIPAL_COLUMNS = ("id", "username", "email")
+
 # ✅ CREATE TOKEN
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -39,11 +43,24 @@ def token_required(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
 
+        signature = token.rsplit(".", 1)[-1]
+
+        cached = principal_cache.get(user_id, signature)
+        if cached is not None:
+            return _attach_principal(db, cached)
+
         current_user = db.query(User).filter(User.id == user_id).first()
 
         if current_user is None:
             raise HTTPException(status_code=401, detail="User not found")
 
+        principal_cache.put(
+            user_id,
+            signature,
+            {col: getattr(current_user, col) for col in PRINCIPAL_COLUMNS},
+            expires_at=payload.get("exp"),
+        )
+
         return current_user
 
     except JWTError:
@@ -52,6 +69,18 @@ def token_required(
             detail="Token is invalid or expired"
         )
 
+
+def _attach_principal(db: Session, values: dict) -> User:
+    # Build a detached User from cached columns and merge it without a SELECT;
+    # relationships and the password column still lazy-load on access.
+    user = User(**values)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
+def invalidate_principal(user_id: int):
+    principal_cache.invalidate_user(user_id)
+
 # ✅ CREATE RESET TOKEN (Short-lived: 15 mins)
 def create_reset_token(email: str):
     to_encode = {"sub": email, "purpose": "password_reset"}
@@ -0,0 +1,432 @@
+"""
+Versioned schema migrations.
+
+Run once per deploy, outside of worker boot:
+
+    python -m backend.api.migrations upgrade   # apply pending migrations
+    python -m backend.api.migrations status    # show current / head version
+    python -m backend.api.migrations check     # EXPLAIN every hot route query
+
+Every step is idempotent (checkfirst / inspector based) so a database that was
+previously bootstrapped with Base.metadata.create_all can be adopted as-is.
+"""
+import argparse
+import logging
+import sys
+from datetime import date, datetime
+
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, String, Table, bindparam, inspect, select, func, text
+)
+
+from sqlalchemy.orm import Session
+
+from backend.api.models.vitya import (
+    CategoryStats, Expense, Income, JobCheckpoint, MonthlyRollup, PersonaAssignment, PersonaCentroid,
+    PopulationSketch, PrecomputedResult, QuantileSketch, User, UserDataVersion
+)
+from backend.api.services import (
+    anomalies, category_stats, exports, forecasting, insights, ledger, personas, rollups, sketches,
+    subscriptions, transactions
+)
+from backend.api.time_buckets import month_label_bucket, time_bucket
+
+# advisory lock id used to serialise concurrent runners on Postgres
+MIGRATION_LOCK_ID = 80810
+
+# kept out of Base.metadata so create_all never touches it
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String),
+    Column("applied_at", DateTime, default=datetime.utcnow),
+)
+
+MIGRATIONS = []
+
+
+def migration(version: int, description: str):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+# ---------------------------
+# IDEMPOTENT DDL HELPERS
+# ---------------------------
+def create_tables(conn, *tables):
+    for table in tables:
+        table.create(bind=conn, checkfirst=True)
+
+
+def create_indexes(conn, *indexes):
+    for index in indexes:
+        index.create(bind=conn, checkfirst=True)
+
+
+def add_column(conn, table_name: str, column: Column):
+    existing = {c["name"] for c in inspect(conn).get_columns(table_name)}
+    if column.name in existing:
+        return
+
+    col_type = column.type.compile(dialect=conn.dialect)
+    conn.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {column.name} {col_type}'))
+
+
+def drop_column(conn, table_name: str, column_name: str):
+    existing = {c["name"] for c in inspect(conn).get_columns(table_name)}
+    if column_name not in existing:
+        return
+
+    # SQLite supports DROP COLUMN from 3.35
+    conn.execute(text(f'ALTER TABLE {table_name} DROP COLUMN {column_name}'))
+
+
+def table_index(model, name: str):
+    return next(ix for ix in model.__table__.indexes if ix.name == name)
+
+
+# ---------------------------
+# MIGRATIONS
+# ---------------------------
+@migration(1, "baseline users / income / expense tables")
+def _baseline(conn):
+    create_tables(conn, User.__table__, Income.__table__, Expense.__table__)
+
+
+@migration(2, "hot path composite indexes and unique username/email indexes")
+def _hot_path_indexes(conn):
+    create_indexes(
+        conn,
+        table_index(Expense, "ix_expense_user_category_date"),
+        table_index(Income, "ix_income_user_date"),
+        table_index(User, "ix_users_username"),
+        table_index(User, "ix_users_email"),
+    )
+
+
+@migration(3, "monthly_rollup table, backfilled from expense / income")
+def _monthly_rollup(conn):
+    create_tables(conn, MonthlyRollup.__table__)
+    rollups.rebuild(Session(bind=conn))
+
+
+@migration(4, "expense (user_id, date) index for the ledger feed")
+def _expense_user_date(conn):
+    create_indexes(conn, table_index(Expense, "ix_expense_user_date"))
+
+
+def _backfill_fingerprints(conn, model, description_column, batch_size=5000):
+    table = model.__table__
+    last_id = 0
+
+    while True:
+        rows = conn.execute(
+            select(table.c.id, table.c.date, table.c.amount, description_column)
+            .where(table.c.id > last_id, table.c.fingerprint.is_(None))
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+
+        conn.execute(
+            table.update().where(table.c.id == bindparam("row_id")).values(fingerprint=bindparam("digest")),
+            [{"row_id": r[0], "digest": ledger.fingerprint(r[1], r[2], r[3])} for r in rows],
+        )
+        last_id = rows[-1][0]
+
+
+@migration(5, "fingerprint columns + (user_id, fingerprint) indexes for import dedup")
+def _fingerprints(conn):
+    add_column(conn, "expense", Column("fingerprint", String(16)))
+    add_column(conn, "income", Column("fingerprint", String(16)))
+
+    _backfill_fingerprints(conn, Expense, Expense.__table__.c.description)
+    _backfill_fingerprints(conn, Income, Income.__table__.c.source)
+
+    create_indexes(
+        conn,
+        table_index(Expense, "ix_expense_user_fingerprint"),
+        table_index(Income, "ix_income_user_fingerprint"),
+    )
+
+
+@migration(6, "user_data_version table backing analytics ETags")
+def _user_data_version(conn):
+    create_tables(conn, UserDataVersion.__table__)
+
+
+@migration(7, "category_stats running statistics, backfilled from expense")
+def _category_stats(conn):
+    create_tables(conn, CategoryStats.__table__)
+    category_stats.rebuild(Session(bind=conn))
+
+
+@migration(8, "quantile_sketch / population_sketch t-digests, backfilled")
+def _quantile_sketches(conn):
+    create_tables(conn, QuantileSketch.__table__, PopulationSketch.__table__)
+    session = Session(bind=conn)
+    sketches.rebuild(session)
+    sketches.rebuild_population(session)
+
+
+@migration(9, "precomputed_result / job_checkpoint tables for the nightly precompute job")
+def _precompute_tables(conn):
+    create_tables(conn, PrecomputedResult.__table__, JobCheckpoint.__table__)
+
+
+@migration(10, "persona_assignment / persona_centroid tables (filled by `personas build`)")
+def _personas(conn):
+    create_tables(conn, PersonaAssignment.__table__, PersonaCentroid.__table__)
+
+
+
+@migration(11, "drop the unused category_stats.ewma column")
+def _drop_category_ewma(conn):
+    drop_column(conn, "category_stats", "ewma")
+
+# ---------------------------
+# RUNNER
+# ---------------------------
+def head_version() -> int:
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def current_version(conn) -> int:
+    if not inspect(conn).has_table(schema_version.name):
+        return 0
+    return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def _lock(conn):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+
+
+def upgrade(engine, target: int = None) -> int:
+    target = head_version() if target is None else target
+
+    with engine.begin() as conn:
+        _lock(conn)
+        schema_version.create(bind=conn, checkfirst=True)
+
+    for version, description, step in MIGRATIONS:
+        if version > target:
+            break
+
+        # one transaction per step; the lock makes parallel runners wait and
+        # the re-read lets them skip what another runner already applied
+        with engine.begin() as conn:
+            _lock(conn)
+            if version <= current_version(conn):
+                continue
+
+            logging.info(f"Applying migration {version}: {description}")
+            step(conn)
+            conn.execute(schema_version.insert().values(
+                version=version,
+                description=description,
+                applied_at=datetime.utcnow(),
+            ))
+
+    with engine.connect() as conn:
+        return current_version(conn)
+
+
+def is_current(engine) -> bool:
+    with engine.connect() as conn:
+        return current_version(conn) >= head_version()
+
+
+# ---------------------------
+# EXPLAIN CHECK
+# ---------------------------
+def route_queries(dialect: str, user_id: int = 1, category: str = "Food"):
+    """
+    The statements each read route in api/routes/ai.py and api/routes/vitya.py
+    issues, keyed by "<module>.<function>".
+    """
+    stats_row = select(CategoryStats).where(
+        CategoryStats.user_id == user_id, CategoryStats.category == category
+    )
+
+    def rollup_categories(kind):
+        return select(MonthlyRollup.category, func.sum(MonthlyRollup.total)).where(
+            MonthlyRollup.user_id == user_id, MonthlyRollup.kind == kind
+        ).group_by(MonthlyRollup.category)
+
+    def rollup_total(kind):
+        return select(func.sum(MonthlyRollup.total)).where(
+            MonthlyRollup.user_id == user_id, MonthlyRollup.kind == kind
+        )
+
+    def rollup_buckets(kind, granularity="month"):
+        bucket = month_label_bucket(MonthlyRollup.month, granularity).label("month")
+        return select(bucket, func.sum(MonthlyRollup.total)).where(
+            MonthlyRollup.user_id == user_id, MonthlyRollup.kind == kind
+        ).group_by(bucket).order_by(bucket)
+
+    def raw_buckets(model, granularity):
+        bucket = time_bucket(model.date, granularity, dialect).label("month")
+        return select(bucket, func.sum(model.amount)).where(
+            model.user_id == user_id
+        ).group_by(bucket)
+
+    return {
+        "ai.predict_expense": [forecasting.series_query(user_id)],
+        "ai.forecast_expenses": [forecasting.series_query(user_id)],
+        "ai.category_insights": [insights.columns_query(user_id)],
+        "ai.list_anomalies": [
+            anomalies.latest_query(user_id),
+            anomalies.scored_query(dialect, user_id, as_of=date(2025, 1, 1)).limit(21),
+        ],
+        "ai.list_subscriptions": [
+            select(func.max(Expense.date)).where(Expense.user_id == user_id, Expense.amount > 0),
+            subscriptions.history_query(dialect, user_id, datetime(2025, 1, 1)),
+        ],
+        "ai.detect_overspending": [stats_row],
+        "ai.category_percentile": [
+            select(QuantileSketch.digest).where(
+                QuantileSketch.user_id == user_id, QuantileSketch.category == category
+            )
+        ],
+        "ai.peer_compare": [
+            select(PopulationSketch.month).where(
+                PopulationSketch.category == category
+            ).order_by(PopulationSketch.month.desc()).limit(1),
+        ],
+        "ai.waste_analysis": [rollup_categories(rollups.EXPENSE)],
+        "ai.budget_plan": [rollup_total(rollups.INCOME), rollup_categories(rollups.EXPENSE)],
+        "ai.financial_advisor": [
+            personas.stamp_query(user_id),
+            stats_row,
+            personas.centroid_query(user_id, category),
+            rollup_total(rollups.EXPENSE),
+        ],
+        "ai.monthly_trend": [rollup_buckets(rollups.EXPENSE), raw_buckets(Expense, "week")],
+        "ai.anomaly_detection": [
+            stats_row,
+            select(Expense.amount, Expense.date).where(
+                Expense.user_id == user_id, Expense.category == category, Expense.amount > 100
+            ).order_by(Expense.date),
+        ],
+        "vitya.download_financial_csv": [
+            exports.export_query("expenses", user_id),
+            exports.export_query("incomes", user_id, start=datetime(2025, 1, 1).date()),
+        ],
+        "vitya.download_expenses_csv": [exports.export_query("expenses", user_id)],
+        "vitya.download_incomes_csv": [exports.export_query("incomes", user_id)],
+        "vitya.get_expenses_chart": [rollup_categories(rollups.EXPENSE)],
+        "vitya.get_financial_overview": [rollup_total(rollups.INCOME), rollup_categories(rollups.EXPENSE)],
+        "vitya.get_expense_income_trend": [
+            rollup_buckets(rollups.INCOME),
+            rollup_buckets(rollups.EXPENSE),
+            raw_buckets(Income, "day"),
+            raw_buckets(Expense, "day"),
+        ],
+        "vitya.get_expense_graph": [rollup_categories(rollups.EXPENSE)],
+        "vitya.get_recent_transactions": [transactions.feed_query(user_id, 11)],
+        "vitya.list_transactions": [
+            transactions.feed_query(user_id, 21, (datetime(2025, 1, 1), transactions.EXPENSE, 10)),
+            transactions.feed_query(user_id, 21, type=transactions.EXPENSE, category=category),
+            transactions.feed_query(user_id, 21, type=transactions.INCOME, start=datetime(2025, 1, 1).date()),
+        ],
+    }
+
+
+def explain(conn, statement):
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+        return [row[-1] for row in rows]
+
+    rows = conn.exec_driver_sql(f"EXPLAIN {compiled}").all()
+    return [row[0] for row in rows]
+
+
+def plan_uses_index(dialect: str, plan) -> bool:
+    if dialect == "sqlite":
+        # scans of derived tables (UNION branches, subqueries, CTEs) are not table reads
+        derived = {
+            line.split(" ", 1)[1] for line in plan
+            if line.startswith(("MATERIALIZE", "CO-ROUTINE"))
+        }
+        scans = [
+            line for line in plan
+            if line.startswith(("SCAN", "SEARCH"))
+            and not line.split(" ")[1].startswith(("anon_", "(subquery"))
+            and line.split(" ")[1] not in derived
+        ]
+        # "USING INTEGER PRIMARY KEY" is a rowid lookup, as good as an index
+        return bool(scans) and all(
+            "USING" in line and ("INDEX" in line or "PRIMARY KEY" in line) for line in scans
+        )
+
+    joined = "\n".join(plan)
+    return "Seq Scan" not in joined and "Index" in joined
+
+
+def check_indexes(engine) -> dict:
+    results = {}
+
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            # tiny dev tables make seq scans cheaper; we want to know whether
+            # an index *can* serve the query, not what the planner picks today
+            conn.execute(text("SET enable_seqscan = off"))
+
+        for route, statements in route_queries(conn.dialect.name).items():
+            plans = [explain(conn, stmt) for stmt in statements]
+            results[route] = {
+                "uses_index": all(plan_uses_index(conn.dialect.name, p) for p in plans),
+                "plans": plans,
+            }
+
+        conn.rollback()
+
+    return results
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def main(argv=None):
+    from backend.api.database import engine
+
+    parser = argparse.ArgumentParser(description="Vitya schema migrations")
+    parser.add_argument("command", choices=["upgrade", "status", "check"])
+    parser.add_argument("--target", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    if args.command == "upgrade":
+        version = upgrade(engine, args.target)
+        print(f"Schema at version {version} (head {head_version()})")
+        return 0
+
+    if args.command == "status":
+        with engine.connect() as conn:
+            print(f"Schema at version {current_version(conn)} (head {head_version()})")
+        return 0
+
+    failed = 0
+    for route, result in check_indexes(engine).items():
+        ok = result["uses_index"]
+        failed += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {route}")
+        if not ok:
+            for plan in result["plans"]:
+                for line in plan:
+                    print(f"       {line}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
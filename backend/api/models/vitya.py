@@ -1,10 +1,14 @@
-from sqlalchemy import Column, DateTime, Integer, String, Float, Date, ForeignKey
+from sqlalchemy import Column, DateTime, Integer, String, Float, Date, ForeignKey, Index, LargeBinary, Text
 from sqlalchemy.orm import relationship
 from backend.api.database import Base
 from datetime import datetime
 class User(Base):
 
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_username", "username", unique=True),
+        Index("ix_users_email", "email", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True)
@@ -17,18 +21,28 @@ class User(Base):
 class Income(Base):
 
     __tablename__ = "income"
+    __table_args__ = (
+        Index("ix_income_user_date", "user_id", "date"),
+        Index("ix_income_user_fingerprint", "user_id", "fingerprint"),
+    )
 
     id = Column(Integer, primary_key=True)
     amount = Column(Float)
     source = Column(String)
     date = Column(DateTime, default=datetime.utcnow) 
     user_id = Column(Integer, ForeignKey("users.id"))
+    fingerprint = Column(String(16))    # hash of (date, amount, source) for dedup
     user = relationship("User", back_populates="incomes")
 
 
 class Expense(Base):
 
     __tablename__ = "expense"
+    __table_args__ = (
+        Index("ix_expense_user_category_date", "user_id", "category", "date"),
+        Index("ix_expense_user_date", "user_id", "date"),
+        Index("ix_expense_user_fingerprint", "user_id", "fingerprint"),
+    )
 
     id = Column(Integer, primary_key=True,index=True)
     amount = Column(Float)
@@ -36,4 +50,113 @@ class Expense(Base):
     description = Column(String)
     date = Column(DateTime, default=datetime.utcnow)
     user_id = Column(Integer, ForeignKey("users.id"))
-    user = relationship("User", back_populates="expenses")
\ No newline at end of file
+    fingerprint = Column(String(16))    # hash of (date, amount, description) for dedup
+    user = relationship("User", back_populates="expenses")
+
+
+class MonthlyRollup(Base):
+
+    __tablename__ = "monthly_rollup"
+
+    # kind is "expense" or "income"; category holds the income source for incomes
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    kind = Column(String, primary_key=True)
+    month = Column(String, primary_key=True)        # YYYY-MM
+    category = Column(String, primary_key=True)
+    total = Column(Float, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class UserDataVersion(Base):
+
+    __tablename__ = "user_data_version"
+
+    # bumped in the same transaction as every ledger write; read routes use it as their ETag
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class CategoryStats(Base):
+
+    __tablename__ = "category_stats"
+
+    # running moments of expense amounts per (user, category), maintained by the ledger
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    category = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    mean = Column(Float, nullable=False, default=0)
+    m2 = Column(Float, nullable=False, default=0)       # Welford sum of squared deviations
+    min_amount = Column(Float)
+    max_amount = Column(Float)
+    last_amount = Column(Float)
+    last_date = Column(DateTime)
+
+
+class QuantileSketch(Base):
+
+    __tablename__ = "quantile_sketch"
+
+    # t-digest of one user's expense amounts in one category and month
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    category = Column(String, primary_key=True)
+    month = Column(String, primary_key=True)        # YYYY-MM
+    count = Column(Integer, nullable=False, default=0)
+    digest = Column(LargeBinary, nullable=False)
+
+
+class PopulationSketch(Base):
+
+    __tablename__ = "population_sketch"
+
+    # t-digest of per-user monthly totals across all users, rebuilt offline
+    category = Column(String, primary_key=True)
+    month = Column(String, primary_key=True)        # YYYY-MM
+    users = Column(Integer, nullable=False, default=0)
+    digest = Column(LargeBinary, nullable=False)
+    built_at = Column(DateTime, default=datetime.utcnow)
+
+
+class PrecomputedResult(Base):
+
+    __tablename__ = "precomputed_result"
+
+    # /api/ai response computed by the nightly job; served while version is current
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    endpoint = Column(String, primary_key=True)
+    params = Column(String, primary_key=True)       # canonical JSON of the route arguments
+    version = Column(Integer, nullable=False)
+    payload = Column(Text, nullable=False)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+
+class JobCheckpoint(Base):
+
+    __tablename__ = "job_checkpoint"
+
+    job = Column(String, primary_key=True)
+    status = Column(String, nullable=False)         # "running" / "done"
+    last_user_id = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class PersonaAssignment(Base):
+
+    __tablename__ = "persona_assignment"
+
+    # spending-persona cluster of each user, rebuilt offline from monthly_rollup
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    cluster = Column(Integer, nullable=False)
+    distance = Column(Float)                        # to the cluster centroid, in share space
+    built_at = Column(DateTime, default=datetime.utcnow)
+
+
+class PersonaCentroid(Base):
+
+    __tablename__ = "persona_centroid"
+
+    # average share of spending per category within one cluster
+    cluster = Column(Integer, primary_key=True)
+    category = Column(String, primary_key=True)
+    share = Column(Float, nullable=False)
+    users = Column(Integer, nullable=False, default=0)
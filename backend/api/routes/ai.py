@@ -1,61 +1,68 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-import numpy as np
-from sklearn.linear_model import LinearRegression
-from datetime import datetime
+from datetime import date, datetime
+from typing import Optional
+import os
 
 from backend.api.database import get_db
-from backend.api.models.vitya import Expense, Income
+from backend.api.models.vitya import Expense
 from backend.api.auth import token_required
+from backend.api.schemas.vitya import BudgetSimulation
+from backend.api.time_buckets import MONTH_DERIVED, dialect_name, time_bucket, validate_granularity
+from backend.api.services import (
+    anomalies, budget_simulation, category_stats, data_version, forecasting, goal_projection, insights, personas,
+    rollups, sketches, subscriptions
+)
+from backend.api.services.response_cache import cached
 
 router = APIRouter()
 
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", "100"))
+
 
 # ================= PREDICTION ================= #
-@router.get("/predict/{category}")
+@router.get("/predict/{category}", dependencies=[Depends(data_version.analytics_etag)])
+@cached("predict")
 def predict_expense(category: str, current_user=Depends(token_required), db: Session = Depends(get_db)):
 
-    expenses = db.query(Expense).filter(
-        Expense.user_id == current_user.id,
-        Expense.category == category
-    ).order_by(Expense.date).all()
+    # every category shares the user's month axis, so fit them all (one query)
+    result = forecasting.forecast(db, current_user.id)
+    prediction = result["forecasts"].get(category)
 
-    if len(expenses) < 3:
+    if prediction is None:
         raise HTTPException(status_code=400, detail="Not enough data")
 
-    amounts = [float(e.amount) for e in expenses]
-
-    X = np.arange(len(amounts)).reshape(-1, 1)
-    y = np.array(amounts)
-
-    model = LinearRegression()
-    model.fit(X, y)
-
-    prediction = model.predict([[len(amounts)]])[0]
-
     return {
         "category": category,
-        "predicted_next_month_expense": round(float(prediction), 2)
+        "target_month": result["target_month"],
+        "predicted_next_month_expense": prediction["forecast"]
     }
 
 
+@router.get("/forecast", dependencies=[Depends(data_version.analytics_etag)])
+@cached("forecast")
+def forecast_expenses(current_user=Depends(token_required), db: Session = Depends(get_db),
+                      method: str = "ols", horizon: int = 1):
+
+    try:
+        return forecasting.forecast(db, current_user.id, method=method, horizon=min(horizon, 12))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # ================= OVERSPENDING ================= #
-@router.get("/overspending/{category}")
+@router.get("/overspending/{category}", dependencies=[Depends(data_version.analytics_etag)])
+@cached("overspending")
 def detect_overspending(category: str, current_user=Depends(token_required), db: Session = Depends(get_db)):
 
-    expenses = db.query(Expense).filter(
-        Expense.user_id == current_user.id,
-        Expense.category == category
-    ).order_by(Expense.date).all()
+    stats = category_stats.get(db, current_user.id, category)
 
-    if len(expenses) < 3:
+    if stats is None or stats.count < 3:
         raise HTTPException(status_code=400, detail="Not enough data")
 
-    amounts = [float(e.amount) for e in expenses]
-
-    avg = sum(amounts) / len(amounts)
-    last = amounts[-1]
+    avg = stats.mean
+    last = stats.last_amount
 
     return {
         "average_spending": round(avg, 2),
@@ -65,15 +72,11 @@ def detect_overspending(category: str, current_user=Depends(token_required), db:
 
 
 # ================= WASTE ANALYSIS ================= #
-@router.get("/waste-analysis")
+@router.get("/waste-analysis", dependencies=[Depends(data_version.analytics_etag)])
+@cached("waste-analysis")
 def waste_analysis(current_user=Depends(token_required), db: Session = Depends(get_db)):
 
-    expenses = db.query(
-        Expense.category,
-        func.sum(Expense.amount).label("total")
-    ).filter(
-        Expense.user_id == current_user.id
-    ).group_by(Expense.category).all()
+    expenses = rollups.category_totals(db, current_user.id)
 
     if not expenses:
         return []
@@ -99,21 +102,16 @@ def waste_analysis(current_user=Depends(token_required), db: Session = Depends(g
 
 
 # ================= BUDGET ================= #
-@router.get("/budget-plan")
+@router.get("/budget-plan", dependencies=[Depends(data_version.analytics_etag)])
+@cached("budget-plan")
 def budget_plan(current_user=Depends(token_required), db: Session = Depends(get_db)):
 
-    income = db.query(func.sum(Income.amount))\
-        .filter(Income.user_id == current_user.id).scalar() or 0
+    income = rollups.kind_total(db, current_user.id, rollups.INCOME)
 
     if income <= 0:
         raise HTTPException(status_code=404, detail="No income data")
 
-    expenses = db.query(
-        Expense.category,
-        func.sum(Expense.amount).label("total")
-    ).filter(
-        Expense.user_id == current_user.id
-    ).group_by(Expense.category).all()
+    expenses = rollups.category_totals(db, current_user.id)
 
     if not expenses:
         raise HTTPException(status_code=404, detail="No expense data")
@@ -170,22 +168,63 @@ def budget_plan(current_user=Depends(token_required), db: Session = Depends(get_
     }
 
 
+# grid of savings rates x category caps x income changes x inflation, one matrix pass
+@router.post("/budget-simulate")
+@cached("budget-simulate")
+def budget_simulate(data: BudgetSimulation, current_user=Depends(token_required), db: Session = Depends(get_db)):
+
+    try:
+        result = budget_simulation.run(
+            db,
+            current_user.id,
+            savings_rates=data.savings_rates,
+            income_changes=data.income_changes,
+            inflation=data.inflation,
+            category_caps=data.category_caps,
+            months=data.months,
+            limit=max(1, min(data.limit, MAX_PAGE_SIZE)),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if result is None:
+        raise HTTPException(status_code=404, detail="No income or expense data")
+
+    return result
+
+
+# ================= GOAL PROJECTION ================= #
+# bootstrapped monthly net cash flow, time-to-goal percentiles
+@router.get("/goal-projection", dependencies=[Depends(data_version.analytics_etag)])
+@cached("goal-projection")
+def goal_projection_route(goal: float, start: Optional[float] = None, horizon: int = 120,
+                          current_user=Depends(token_required), db: Session = Depends(get_db)):
+
+    try:
+        result = goal_projection.project(db, current_user.id, goal, start=start, horizon=horizon)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if result is None:
+        raise HTTPException(status_code=400, detail="Not enough data")
+
+    return result
+
+
 # ================= ADVISOR ================= #
-@router.get("/advisor/{category}")
+# the persona block comes from the nightly build, so its stamp joins the data
+# version in the ETag and cache key
+@router.get("/advisor/{category}", dependencies=[Depends(data_version.stamped_etag(personas.build_stamp))])
+@cached("advisor", stamp=personas.build_stamp)
 def financial_advisor(category: str, current_user=Depends(token_required), db: Session = Depends(get_db)):
 
-    expenses = db.query(Expense).filter(
-        Expense.user_id == current_user.id,
-        Expense.category == category
-    ).order_by(Expense.date).all()
+    stats = category_stats.get(db, current_user.id, category)
 
-    if len(expenses) < 3:
+    if stats is None or stats.count < 3:
         return {"message": "Not enough data"}
 
-    amounts = [float(e.amount) for e in expenses]
-
-    avg = sum(amounts) / len(amounts)
-    last = amounts[-1]
+    avg = stats.mean
+    last = stats.last_amount
 
     if last > avg:
         advice = "Spending increasing. Reduce expenses."
@@ -194,7 +233,7 @@ def financial_advisor(category: str, current_user=Depends(token_required), db: S
     else:
         advice = "Spending stable."
 
-    return {
+    result = {
         "category": category,
         "average_spending": round(avg, 2),
         "last_expense": round(last, 2),
@@ -202,53 +241,163 @@ def financial_advisor(category: str, current_user=Depends(token_required), db: S
         "advice": advice
     }
 
+    # "people like you": the user's cluster centroid, built nightly
+    persona = personas.compare(db, current_user.id, category, stats.count * stats.mean)
+    if persona is not None:
+        result["persona"] = persona
+
+    return result
+
 
 # ================= MONTHLY TREND ================= #
-@router.get("/monthly-trend")
-def monthly_trend(current_user=Depends(token_required), db: Session = Depends(get_db)):
+@router.get("/monthly-trend", dependencies=[Depends(data_version.analytics_etag)])
+@cached("monthly-trend")
+def monthly_trend(current_user=Depends(token_required), db: Session = Depends(get_db), granularity: str = "month"):
 
     try:
+        granularity = validate_granularity(granularity)
+        bucket = time_bucket(Expense.date, granularity, dialect_name(db)).label("month")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if granularity in MONTH_DERIVED:
+        data = rollups.bucket_totals(db, current_user.id, rollups.EXPENSE, granularity)
+    else:
         data = db.query(
-            func.strftime("%Y-%m", Expense.date).label("month"),
+            bucket,
             func.sum(Expense.amount).label("amount")
         ).filter(
             Expense.user_id == current_user.id
-        ).group_by("month").all()
-
-        if not data:
-            return []
-
-        return [
-            {"month": m, "amount": float(a or 0)}
-            for m, a in data
-        ]
+        ).group_by(bucket).order_by(bucket).all()
 
-    except Exception as e:
-        print("MONTHLY TREND ERROR:", e)
-        return []
+    return [
+        {"month": m, "amount": float(a or 0)}
+        for m, a in data
+    ]
 
 # ================= ANOMALY ================= #
-@router.get("/anomaly/{category}")
+@router.get("/anomaly/{category}", dependencies=[Depends(data_version.analytics_etag)])
+@cached("anomaly")
 def anomaly_detection(category: str, current_user=Depends(token_required), db: Session = Depends(get_db)):
 
-    expenses = db.query(Expense).filter(
-        Expense.user_id == current_user.id,
-        Expense.category == category
-    ).all()
+    stats = category_stats.get(db, current_user.id, category)
 
-    amounts = [float(e.amount) for e in expenses]
-
-    if len(amounts) < 5:
+    if stats is None or stats.count < 5:
         return {"message": "Not enough data"}
 
-    avg = sum(amounts) / len(amounts)
+    avg = stats.mean
+
+    # the stats row gives the threshold; only the flagged rows are read
+    flagged = db.query(Expense.amount, Expense.date).filter(
+        Expense.user_id == current_user.id,
+        Expense.category == category,
+        Expense.amount > avg * 2
+    ).order_by(Expense.date).all()
 
     anomalies = [
-        {"amount": e.amount, "date": e.date}
-        for e in expenses if e.amount > avg * 2
+        {"amount": amount, "date": date}
+        for amount, date in flagged
     ]
 
     return {
         "average_expense": round(avg, 2),
         "anomalies": anomalies
-    }
\ No newline at end of file
+    }
+
+
+# ================= ANOMALIES (ALL CATEGORIES) ================= #
+# robust / rolling / weekday detectors scored in SQL, flagged rows paged newest first
+@router.get("/anomalies", dependencies=[Depends(data_version.analytics_etag)])
+@cached("anomalies")
+def list_anomalies(
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    threshold: float = anomalies.DEFAULT_THRESHOLD,
+    method: str = "any",
+    category: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    lookback_days: int = anomalies.LOOKBACK_DAYS,
+    current_user=Depends(token_required),
+    db: Session = Depends(get_db)
+):
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    try:
+        items, next_cursor = anomalies.detect(
+            db,
+            current_user.id,
+            limit=limit,
+            cursor=cursor,
+            threshold=threshold,
+            method=method,
+            category=category,
+            start=start,
+            end=end,
+            lookback_days=lookback_days,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "items": items,
+        "next_cursor": next_cursor
+    }
+
+
+# ================= SUBSCRIPTIONS ================= #
+# recurring charges grouped by description and amount band, with the next expected date
+@router.get("/subscriptions", dependencies=[Depends(data_version.analytics_etag)])
+@cached("subscriptions")
+def list_subscriptions(lookback_days: int = subscriptions.LOOKBACK_DAYS,
+                       current_user=Depends(token_required), db: Session = Depends(get_db)):
+
+    try:
+        return subscriptions.detect(db, current_user.id, lookback_days=lookback_days)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# ================= INSIGHTS ================= #
+# predict / overspending / advisor / anomaly for every category in one query
+@router.get("/insights", dependencies=[Depends(data_version.analytics_etag)])
+@cached("insights")
+def category_insights(current_user=Depends(token_required), db: Session = Depends(get_db)):
+
+    return insights.compute(db, current_user.id)
+
+
+# ================= PERCENTILES ================= #
+# t-digest per (user, category, month); months is a comma separated YYYY-MM list
+@router.get("/percentile/{category}", dependencies=[Depends(data_version.analytics_etag)])
+@cached("percentile")
+def category_percentile(category: str, q: float = 0.9, months: Optional[str] = None,
+                        current_user=Depends(token_required), db: Session = Depends(get_db)):
+
+    selected = [m.strip() for m in months.split(",") if m.strip()] if months else None
+
+    try:
+        result = sketches.percentile(db, current_user.id, category, q=q, months=selected)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if result is None:
+        raise HTTPException(status_code=400, detail="Not enough data")
+
+    return result
+
+
+# population sketch is rebuilt offline, so this one isn't tied to the user's data version
+@router.get("/peer-compare/{category}")
+def peer_compare(category: str, q: float = 0.95, month: Optional[str] = None,
+                 current_user=Depends(token_required), db: Session = Depends(get_db)):
+
+    try:
+        result = sketches.peer_compare(db, current_user.id, category, q=q, month=month)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if result is None:
+        raise HTTPException(status_code=400, detail="Not enough data")
+
+    return result
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from datetime import datetime
+from typing import Any, List
 
 from backend.api.database import get_db
 from backend.api.models.vitya import Expense, User
 from backend.api.schemas.vitya import ExpenseCreate
 from backend.api.auth import token_required
+from backend.api.services import ledger
 
 
 router = APIRouter()
@@ -22,25 +24,84 @@ def add_expense(
     date_value = data.date if data.date else datetime.utcnow()
 
     try:
-        exp = Expense(
+        expense_id = ledger.record_expense(
+            db,
+            current_user.id,
             amount=data.amount,
             category=data.category,
             description=data.description,
-            date=date_value,
-            user_id=current_user.id
+            date=date_value
         )
 
-        db.add(exp)
         db.commit()
-        db.refresh(exp)
 
         return {
             "message": "Expense added successfully",
-            "expense_id": exp.id
+            "expense_id": expense_id
         }
 
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Expense creation failed: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/bulk")
+def add_expenses_bulk(
+    items: List[Any],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(token_required)
+):
+    if len(items) > ledger.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {ledger.BULK_MAX_ITEMS} expenses per request"
+        )
+
+    valid, invalid = ledger.validate_items(items, ExpenseCreate)
+
+    try:
+        ids = ledger.record_expenses(db, current_user.id, [
+            data.model_dump() for _, data in valid
+        ])
+        db.commit()
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Expense creation failed: {str(e)}"
+        )
+
+    results = [{"index": index, "expense_id": expense_id} for (index, _), expense_id in zip(valid, ids)]
+    results += [{"index": index, "errors": errors} for index, errors in invalid]
+    results.sort(key=lambda r: r["index"])
+
+    return {
+        "message": f"{len(ids)} expenses added, {len(invalid)} rejected",
+        "inserted": len(ids),
+        "rejected": len(invalid),
+        "results": results
+    }
+
+
+@router.delete("/{expense_id}")
+def delete_expense(
+    expense_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(token_required)
+):
+    try:
+        deleted = ledger.delete_expense(db, current_user.id, expense_id)
+        if deleted:
+            db.commit()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Expense deletion failed: {str(e)}"
+        )
+
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Expense not found")
+
+    return {"message": "Expense deleted successfully", "expense_id": expense_id}
@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from datetime import datetime
+from typing import Any, List
 
 from backend.api.database import get_db
 from backend.api.models.vitya import Income, User
 from backend.api.schemas.vitya import IncomeCreate
 from backend.api.auth import token_required
-from datetime import datetime
+from backend.api.services import ledger
 
 router = APIRouter()
 
@@ -21,24 +22,83 @@ def add_income(
     date_value = data.date if data.date else datetime.utcnow()
 
     try:
-        inc = Income(
+        income_id = ledger.record_income(
+            db,
+            current_user.id,
             amount=data.amount,
             source=data.source,
-            date=date_value,
-            user_id=current_user.id
+            date=date_value
         )
 
-        db.add(inc)
         db.commit()
-        db.refresh(inc)
 
         return {
             "message": "Income added successfully",
-            "income_id": inc.id
+            "income_id": income_id
         }
 
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Income creation failed: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/bulk")
+def add_incomes_bulk(
+    items: List[Any],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(token_required)
+):
+    if len(items) > ledger.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {ledger.BULK_MAX_ITEMS} incomes per request"
+        )
+
+    valid, invalid = ledger.validate_items(items, IncomeCreate)
+
+    try:
+        ids = ledger.record_incomes(db, current_user.id, [
+            data.model_dump() for _, data in valid
+        ])
+        db.commit()
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Income creation failed: {str(e)}"
+        )
+
+    results = [{"index": index, "income_id": income_id} for (index, _), income_id in zip(valid, ids)]
+    results += [{"index": index, "errors": errors} for index, errors in invalid]
+    results.sort(key=lambda r: r["index"])
+
+    return {
+        "message": f"{len(ids)} incomes added, {len(invalid)} rejected",
+        "inserted": len(ids),
+        "rejected": len(invalid),
+        "results": results
+    }
+
+
+@router.delete("/{income_id}")
+def delete_income(
+    income_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(token_required)
+):
+    try:
+        deleted = ledger.delete_income(db, current_user.id, income_id)
+        if deleted:
+            db.commit()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Income deletion failed: {str(e)}"
+        )
+
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Income not found")
+
+    return {"message": "Income deleted successfully", "income_id": income_id}
@@ -8,7 +8,7 @@ from passlib.context import CryptContext
 from backend.api.database import get_db
 from backend.api.models.vitya import User
 from backend.api.schemas.vitya import Register, Login, ForgotPasswordRequest, ResetPasswordRequest
-from backend.api.auth import SECRET_KEY, ALGORITHM, token_required, create_reset_token, verify_reset_token
+from backend.api.auth import SECRET_KEY, ALGORITHM, token_required, create_reset_token, verify_reset_token, invalidate_principal
 
 router = APIRouter()
 
@@ -142,4 +142,6 @@ def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db))
     user.password = pwd_context.hash(request.new_password)
     db.commit()
 
+    invalidate_principal(user.id)
+
     return {"message": "Password has been reset successfully"}
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Response, Depends,HTTPException
+from fastapi import APIRouter, Response, Depends,HTTPException, File, UploadFile
 from sqlalchemy.orm import Session
 from backend.api.database import get_db
 from backend.api.models.vitya import Expense, Income, User
 from sqlalchemy import desc, func
 
 from backend.api.auth import token_required
+from backend.api.time_buckets import MONTH_DERIVED, dialect_name, time_bucket, validate_granularity
+from backend.api.services import data_version, exports, rollups, statement_import, transactions
 import io
 import base64
 import csv
@@ -12,6 +14,8 @@ import matplotlib
 import matplotlib.pyplot as plt
 import pandas as pd
 import os
+from datetime import date
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -22,108 +26,74 @@ router = APIRouter()
 
 ML_API_BASE = os.environ.get("ML_API_BASE")
 ML_REQUEST_TIMEOUT = int(os.environ.get("ML_REQUEST_TIMEOUT", "15"))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", "100"))
 
 # -------------------------------
 # CSV EXPORT
 # -------------------------------
-from fastapi.responses import Response
-
+# Rows stream from a server-side cursor; memory stays flat with ledger size.
 @router.get("/export/csv")
 def download_financial_csv(
     type: str = "expenses",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    gzip: bool = False,
     current_user: User = Depends(token_required)
 ):
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    if type == "expenses":
-        writer.writerow(["ID", "Amount", "Category", "Description", "Date"])
-        for e in current_user.expenses:
-            writer.writerow([e.id, float(e.amount), e.category, e.description or "", e.date.strftime("%Y-%m-%d") if e.date else ""])
-        filename = "expenses.csv"
-    else:
-        writer.writerow(["ID", "Amount", "Source", "Date"])
-        for i in current_user.incomes:
-            writer.writerow([i.id, float(i.amount), i.source, i.date.strftime("%Y-%m-%d") if i.date else ""])
-        filename = "incomes.csv"
-
-    output.seek(0)
-    return Response(
-        content=output.getvalue(),
-        media_type="text/csv",
-        headers={
-            "Content-Disposition": f"attachment; filename={filename}"
-        }
-    )
+    kind = "expenses" if type == "expenses" else "incomes"
+    return exports.csv_response(kind, current_user.id, start, end, gzip)
 
 @router.get("/csv")
 def download_expenses_csv(
-    current_user: User = Depends(token_required)
+    current_user: User = Depends(token_required),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    gzip: bool = False
 ):
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    writer.writerow(["ID", "Amount", "Category", "Description", "Date"])
-
-    for e in current_user.expenses:
-        writer.writerow([
-            e.id,
-            float(e.amount),
-            e.category,
-            e.description or "",
-            e.date.strftime("%Y-%m-%d") if e.date else ""
-        ])
-
-    output.seek(0)
-
-    return Response(
-        content=output.getvalue(),
-        media_type="text/csv",
-        headers={
-            "Content-Disposition": "attachment; filename=expenses.csv"
-        }
-    )
-@router.get("/csv")
+    return exports.csv_response("expenses", current_user.id, start, end, gzip)
+
+@router.get("/csv/incomes")
 def download_incomes_csv(
-    current_user: User = Depends(token_required)
+    current_user: User = Depends(token_required),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    gzip: bool = False
 ):
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    writer.writerow(["ID", "Amount", "Source", "Date"])
-
-    for i in current_user.incomes:
-        writer.writerow([
-            i.id,
-            float(i.amount),
-            i.source,
-            i.date.strftime("%Y-%m-%d") if i.date else ""
-        ])
-
-    output.seek(0)
-
-    return Response(
-        content=output.getvalue(),
-        media_type="text/csv",
-        headers={
-            "Content-Disposition": "attachment; filename=incomes.csv"
-        }
-    )
+    return exports.csv_response("incomes", current_user.id, start, end, gzip)
+
+# -------------------------------
+# BANK STATEMENT IMPORT
+# -------------------------------
+# Parsed line by line and inserted in batches; rows already in the ledger
+# (same date, amount, description) are skipped.
+@router.post("/import/csv")
+def import_statement_csv(
+    file: UploadFile = File(...),
+    current_user: User = Depends(token_required),
+    db: Session = Depends(get_db)
+):
+    try:
+        report = statement_import.import_statement(db, current_user.id, file.file)
+        db.commit()
+    except statement_import.StatementFormatError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {"message": "Statement imported", **report}
+
 # -------------------------------
 # EXPENSE BAR CHART DATA
 # -------------------------------
-@router.get("/expenses_chart")
+@router.get("/expenses_chart", dependencies=[Depends(data_version.analytics_etag)])
 def get_expenses_chart(
     current_user: User = Depends(token_required),
     db: Session = Depends(get_db)
 ):
     try:
-        data = db.query(
-            Expense.category,
-            func.sum(Expense.amount).label("amount")
-        ).filter(
-            Expense.user_id == current_user.id
-        ).group_by(Expense.category).all()
+        data = rollups.category_totals(db, current_user.id)
 
         return [
             {"category": cat, "amount": float(amount)}
@@ -137,32 +107,23 @@ def get_expenses_chart(
 # -------------------------------
 # FINANCIAL OVERVIEW
 # -------------------------------
-@router.get("/financial_overview")
+@router.get("/financial_overview", dependencies=[Depends(data_version.analytics_etag)])
 def get_financial_overview(
     current_user: User = Depends(token_required),
     db: Session = Depends(get_db)
 ):
     try:
-        total_income = db.query(func.sum(Income.amount)).filter(
-            Income.user_id == current_user.id
-        ).scalar() or 0
-
-        total_expenses = db.query(func.sum(Expense.amount)).filter(
-            Expense.user_id == current_user.id
-        ).scalar() or 0
+        total_income = rollups.kind_total(db, current_user.id, rollups.INCOME)
 
-        distribution_data = db.query(
-            Expense.category,
-            func.sum(Expense.amount)
-        ).filter(
-            Expense.user_id == current_user.id
-        ).group_by(Expense.category).all()
+        distribution_data = rollups.category_totals(db, current_user.id)
 
         distribution = {
             cat: float(amount)
             for cat, amount in distribution_data
         }
 
+        total_expenses = sum(distribution.values())
+
         return {
             "total_income": float(total_income),
             "total_expenses": float(total_expenses),
@@ -177,33 +138,49 @@ def get_financial_overview(
 # -------------------------------
 # TREND GRAPH
 # -------------------------------
-@router.get("/expense_income_trend")
+@router.get("/expense_income_trend", dependencies=[Depends(data_version.analytics_etag)])
 def get_expense_income_trend(
     current_user: User = Depends(token_required),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    granularity: str = "month"
 ):
     try:
-        income = db.query(
-            func.strftime('%Y-%m', Income.date).label("month"),
-            func.sum(Income.amount).label("total")
-        ).filter(
-            Income.user_id == current_user.id
-        ).group_by("month").all()
-
-        expense = db.query(
-            func.strftime('%Y-%m', Expense.date).label("month"),
-            func.sum(Expense.amount).label("total")
-        ).filter(
-            Expense.user_id == current_user.id
-        ).group_by("month").all()
+        granularity = validate_granularity(granularity)
+        dialect = dialect_name(db)
+        income_bucket = time_bucket(Income.date, granularity, dialect).label("month")
+        expense_bucket = time_bucket(Expense.date, granularity, dialect).label("month")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # month buckets keep their historical "YYYY-MM-01" shape for the charts
+    suffix = "-01" if granularity == "month" else ""
+
+    try:
+        if granularity in MONTH_DERIVED:
+            income = rollups.bucket_totals(db, current_user.id, rollups.INCOME, granularity)
+            expense = rollups.bucket_totals(db, current_user.id, rollups.EXPENSE, granularity)
+        else:
+            income = db.query(
+                income_bucket,
+                func.sum(Income.amount).label("total")
+            ).filter(
+                Income.user_id == current_user.id
+            ).group_by(income_bucket).order_by(income_bucket).all()
+
+            expense = db.query(
+                expense_bucket,
+                func.sum(Expense.amount).label("total")
+            ).filter(
+                Expense.user_id == current_user.id
+            ).group_by(expense_bucket).order_by(expense_bucket).all()
 
         return {
             "income": [
-                {"month": m + "-01", "amount": float(a)}
+                {"month": m + suffix, "amount": float(a)}
                 for m, a in income
             ],
             "expense": [
-                {"month": m + "-01", "amount": float(a)}
+                {"month": m + suffix, "amount": float(a)}
                 for m, a in expense
             ]
         }
@@ -211,18 +188,13 @@ def get_expense_income_trend(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
-@router.get("/graph")
+@router.get("/graph", dependencies=[Depends(data_version.analytics_etag)])
 def get_expense_graph(
     current_user: User = Depends(token_required),
     db: Session = Depends(get_db)
 ):
     try:
-        data = db.query(
-            Expense.category,
-            func.sum(Expense.amount).label("amount")
-        ).filter(
-            Expense.user_id == current_user.id
-        ).group_by(Expense.category).all()
+        data = rollups.category_totals(db, current_user.id)
 
         chart_data = [
             {"category": cat, "amount": float(amount)}
@@ -234,36 +206,46 @@ def get_expense_graph(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
-@router.get("/transactions/recent")
+@router.get("/transactions/recent", dependencies=[Depends(data_version.analytics_etag)])
 def get_recent_transactions(
     current_user: User = Depends(token_required),
+    db: Session = Depends(get_db)
+):
+    rows, _ = transactions.feed(db, current_user.id, limit=10)
+    return [transactions.serialize(row) for row in rows]
+
+
+@router.get("/transactions", dependencies=[Depends(data_version.analytics_etag)])
+def list_transactions(
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    type: Optional[str] = None,
+    category: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: User = Depends(token_required),
+    db: Session = Depends(get_db)
 ):
-        items = []
-
-        # Format expenses
-        for e in current_user.expenses:
-            items.append({
-                "_id": e.id,
-                "type": "expense",
-                "amount": float(e.amount),
-                "date": e.date.isoformat(),
-                "category": e.category,
-                "description": e.description
-            })
-
-        # Format incomes
-        for i in current_user.incomes:
-            items.append({
-                "_id": i.id,
-                "type": "income",
-                "amount": float(i.amount),
-                "date": i.date.isoformat(),
-                "category": i.source
-            })
-
-        # Sort combined data (latest first)
-        items.sort(key=lambda x: x["date"], reverse=True)
-
-        return items[:10]
-
-    
\ No newline at end of file
+    if type is not None and type not in transactions.TYPES:
+        raise HTTPException(status_code=400, detail="type must be 'expense' or 'income'")
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    try:
+        rows, next_cursor = transactions.feed(
+            db,
+            current_user.id,
+            limit=limit,
+            cursor=cursor,
+            type=type,
+            category=category,
+            start=start,
+            end=end,
+        )
+    except transactions.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "items": [transactions.serialize(row) for row in rows],
+        "next_cursor": next_cursor
+    }
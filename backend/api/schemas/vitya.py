@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from typing import Dict, List
 from datetime import date
 
 class Register(BaseModel):
@@ -37,3 +38,14 @@ class ResetPasswordRequest(BaseModel):
     token: str
     new_password: str
 
+
+
+class BudgetSimulation(BaseModel):
+
+    # every combination of these axes is one scenario
+    savings_rates: List[float] = [0.1, 0.2, 0.3]
+    income_changes: List[float] = [0.0]         # -0.1 = income drops 10%
+    inflation: List[float] = [0.0]              # 0.05 = prices up 5%
+    category_caps: Dict[str, List[float]] = {}  # candidate monthly caps per category
+    months: int = 3                             # baseline = average of the last N months
+    limit: int = 20                             # Pareto plans returned
@@ -1,71 +1,79 @@
+import numpy as np
 import pandas as pd
-import pickle
-import os
-from sklearn.linear_model import LinearRegression
 
-models = {}
-MODEL_FILE = "models.pkl"
+from backend.api.services.micro_batcher import MicroBatcher
+from backend.api.services.model_registry import model_registry
 
-def save_models():
-    with open(MODEL_FILE, "wb") as f:
-        pickle.dump(models, f)
+# a model row is (slope, intercept) of monthly spend against month index
+MIN_MONTHS = 2
 
-def load_models():
-    global models
-    if os.path.exists(MODEL_FILE):
-        with open(MODEL_FILE, "rb") as f:
-            models = pickle.load(f)
-
-def train_model(df: pd.DataFrame):
-
-    models.clear()
 
+def _monthly(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
     df["date"] = pd.to_datetime(df["date"])
 
-    df = df.groupby(
+    return df.groupby(
         ["category", pd.Grouper(key="date", freq="ME")]
     )["amount"].sum().reset_index()
 
-    for category in df["category"].unique():
 
-        cat_df = df[df["category"] == category]
+def train_model(df: pd.DataFrame, user_id: int) -> int:
+    """Fit one trend line per category and save them as a new version. -> version"""
+
+    df = _monthly(df)
+
+    categories, params = [], []
 
-        if len(cat_df) < 2:
+    for category, cat_df in df.groupby("category", sort=True):
+
+        if len(cat_df) < MIN_MONTHS:
             continue
 
-        cat_df["month_index"] = range(len(cat_df))
+        slope, intercept = np.polyfit(np.arange(len(cat_df)), cat_df["amount"].to_numpy(dtype=float), 1)
 
-        model = LinearRegression()
-        model.fit(cat_df[["month_index"]], cat_df["amount"])
+        categories.append(category)
+        params.append((slope, intercept))
 
-        models[category] = model
+    return model_registry.save(user_id, categories, np.array(params, dtype=np.float64).reshape(-1, 2))
 
-    save_models()
 
-def predict(df: pd.DataFrame):
+def evaluate_batch(items):
+    """[(params rows, month indexes), ...] -> [predictions, ...], one stacked evaluation."""
+    params = np.concatenate([rows for rows, _ in items])
+    idx = np.concatenate([months for _, months in items])
+    values = params[:, 0] * idx + params[:, 1]
+    return np.split(values, np.cumsum([len(months) for _, months in items])[:-1])
 
-    df["date"] = pd.to_datetime(df["date"])
 
-    df_month = df.groupby(
-        ["category", pd.Grouper(key="date", freq="ME")]
-    )["amount"].sum().reset_index()
+predict_batcher = MicroBatcher("ai_service.predict", evaluate_batch)
 
-    result = []
 
-    for category in df_month["category"].unique():
+def predict(df: pd.DataFrame, user_id: int, version: int = None):
 
-        if category not in models:
-            continue
+    bundle = model_registry.load(user_id, version)
+    if bundle is None:
+        return []
+
+    df_month = _monthly(df)
 
-        model = models[category]
+    categories, rows, months = [], [], []
+
+    for category, cat_df in df_month.groupby("category", sort=False):
+
+        model = bundle.get(category)
+        if model is None:
+            continue
 
-        idx = len(df_month[df_month["category"] == category])
+        categories.append(category)
+        rows.append(model)
+        months.append(len(cat_df))
 
-        predicted = model.predict([[idx]])[0]
+    if not categories:
+        return []
 
-        result.append({
-            "category": category,
-            "prediction": round(predicted,2)
-        })
+    values = predict_batcher((np.array(rows, dtype=np.float64).reshape(-1, 2), np.array(months, dtype=np.float64)))
 
-    return result
\ No newline at end of file
+    return [
+        {"category": category, "prediction": round(float(value), 2)}
+        for category, value in zip(categories, values)
+    ]
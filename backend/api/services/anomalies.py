@@ -0,0 +1,209 @@
+"""
+Anomaly engine: every category of a user scored in one SQL statement.
+
+Three detectors, each evaluated in the database so only flagged rows leave it:
+
+    robust   modified z-score 0.6745 * |x - median| / MAD over the category
+    rolling  z-score against the previous ROLLING_WINDOW expenses of the category
+    weekday  z-score against the previous WEEKDAY_WINDOW expenses of the
+             category on the same day of the week
+
+Median and MAD come from row_number() over amounts sorted per category (no
+percentile function needed, so SQLite works too); rolling baselines are
+windowed avg(x) / avg(x * x) frames. Comparisons are squared so no sqrt is
+needed in SQL; the page's scores are finished in Python.
+
+Flagged rows come back newest first, a page at a time, with the same
+cursor format as the transaction feed.
+"""
+import math
+import os
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import and_, func, literal, or_, select, tuple_
+from sqlalchemy.orm import Session
+
+from backend.api.models.vitya import Expense
+from backend.api.services import transactions
+from backend.api.time_buckets import dialect_name, weekday
+
+METHODS = ("robust", "rolling", "weekday", "any")
+
+ROLLING_WINDOW = int(os.getenv("ANOMALY_ROLLING_WINDOW", "30"))
+WEEKDAY_WINDOW = int(os.getenv("ANOMALY_WEEKDAY_WINDOW", "12"))
+# history scored per request, counted back from `end` (or the user's latest
+# expense); 0 = everything. Keeps the window sorts bounded by recent volume
+# rather than account age. Never anchored to today: responses are cached and
+# ETagged per data version, so the window may only move when the data does.
+LOOKBACK_DAYS = int(os.getenv("ANOMALY_LOOKBACK_DAYS", "365"))
+# baselines with fewer prior rows than this don't flag anything
+MIN_HISTORY = 5
+DEFAULT_THRESHOLD = 3.5
+MAD_SCALE = 0.6745
+
+
+# ---------------------------
+# SQL
+# ---------------------------
+def _median(source, value, name: str):
+    """Per-category median of source.c[value] via the middle one or two ranks."""
+    ranked = select(
+        source.c.category,
+        source.c[value].label("value"),
+        func.row_number().over(partition_by=source.c.category, order_by=source.c[value]).label("rn"),
+        func.count().over(partition_by=source.c.category).label("n"),
+    ).subquery()
+
+    return select(
+        ranked.c.category,
+        func.avg(ranked.c.value).label(name),
+    ).where(
+        ranked.c.rn.in_([(ranked.c.n + 1) // 2, (ranked.c.n + 2) // 2])
+    ).group_by(ranked.c.category).cte(f"{name}_by_category")
+
+
+def _window_stats(column, partition, window: int, prefix: str):
+    frame = dict(partition_by=partition, order_by=(Expense.date, Expense.id), rows=(-window, -1))
+    return [
+        func.avg(column).over(**frame).label(f"{prefix}_mean"),
+        func.avg(column * column).over(**frame).label(f"{prefix}_sq"),
+        func.count(column).over(**frame).label(f"{prefix}_n"),
+    ]
+
+
+def _z_exceeds(x, mean, sq, n, threshold: float):
+    var = sq - mean * mean
+    return and_(n >= MIN_HISTORY, var > 0, (x - mean) * (x - mean) > threshold * threshold * var)
+
+
+def scored_query(dialect: str, user_id: int, threshold: float = DEFAULT_THRESHOLD, method: str = "any",
+                 category: str = None, start: date = None, end: date = None,
+                 lookback_days: int = LOOKBACK_DAYS, as_of: date = None):
+    """
+    Flagged rows with the raw baseline columns, newest first (unpaged). The
+    lookback counts back from `end`, else from `as_of`; with neither, the
+    whole history is scored.
+    """
+    history = [Expense.user_id == user_id, Expense.date.isnot(None)]
+    if category is not None:
+        history.append(Expense.category == category)
+    anchor = end or as_of
+    if lookback_days and anchor is not None:
+        since = anchor - timedelta(days=lookback_days)
+        history.append(Expense.date >= datetime.combine(since, time.min))
+
+    base = select(Expense.category, Expense.amount).where(
+        *history,
+        Expense.category.isnot(None),
+    ).cte("base")
+
+    medians = _median(base, "amount", "median")
+
+    deviations = select(
+        base.c.category,
+        func.abs(base.c.amount - medians.c.median).label("deviation"),
+    ).join(medians, medians.c.category == base.c.category).cte("deviations")
+
+    mads = _median(deviations, "deviation", "mad")
+
+    dow = weekday(Expense.date, dialect)
+    scored = select(
+        Expense.id.label("id"),
+        literal(transactions.EXPENSE).label("type"),
+        Expense.category.label("category"),
+        Expense.amount.label("amount"),
+        Expense.date.label("date"),
+        Expense.description.label("description"),
+        medians.c.median,
+        mads.c.mad,
+        *_window_stats(Expense.amount, Expense.category, ROLLING_WINDOW, "rolling"),
+        *_window_stats(Expense.amount, (Expense.category, dow), WEEKDAY_WINDOW, "weekday"),
+    ).join(
+        medians, medians.c.category == Expense.category
+    ).join(
+        mads, mads.c.category == Expense.category
+    ).where(*history).subquery("scored")
+
+    c = scored.c
+    checks = {
+        "robust": and_(c.mad > 0, MAD_SCALE * func.abs(c.amount - c.median) > threshold * c.mad),
+        "rolling": _z_exceeds(c.amount, c.rolling_mean, c.rolling_sq, c.rolling_n, threshold),
+        "weekday": _z_exceeds(c.amount, c.weekday_mean, c.weekday_sq, c.weekday_n, threshold),
+    }
+    flagged = or_(*checks.values()) if method == "any" else checks[method]
+
+    query = select(scored).where(flagged)
+    if start is not None:
+        query = query.where(c.date >= datetime.combine(start, time.min))
+    if end is not None:
+        query = query.where(c.date < datetime.combine(end + timedelta(days=1), time.min))
+
+    return query.order_by(c.date.desc(), c.id.desc())
+
+
+# ---------------------------
+# SCORING
+# ---------------------------
+def _z(x, mean, sq, n):
+    if mean is None or n is None or n < MIN_HISTORY:
+        return None
+    var = sq - mean * mean
+    return round((x - mean) / math.sqrt(var), 2) if var > 0 else None
+
+
+def serialize(row) -> dict:
+    amount = float(row.amount)
+    return {
+        "_id": row.id,
+        "category": row.category,
+        "amount": amount,
+        "date": row.date.isoformat(),
+        "description": row.description,
+        "scores": {
+            "robust": round(MAD_SCALE * (amount - row.median) / row.mad, 2) if row.mad else None,
+            "rolling": _z(amount, row.rolling_mean, row.rolling_sq, row.rolling_n),
+            "weekday": _z(amount, row.weekday_mean, row.weekday_sq, row.weekday_n),
+        },
+        "baseline": {
+            "median": round(float(row.median), 2),
+            "mad": round(float(row.mad), 2),
+            "rolling_mean": round(float(row.rolling_mean), 2) if row.rolling_mean is not None else None,
+            "weekday_mean": round(float(row.weekday_mean), 2) if row.weekday_mean is not None else None,
+        },
+    }
+
+
+def latest_query(user_id: int):
+    return select(func.max(Expense.date)).where(Expense.user_id == user_id)
+
+
+def detect(db: Session, user_id: int, limit: int = 20, cursor: str = None, threshold: float = DEFAULT_THRESHOLD,
+           method: str = "any", category: str = None, start: date = None, end: date = None,
+           lookback_days: int = LOOKBACK_DAYS):
+    """One page of flagged expenses plus the cursor for the next page."""
+    if method not in METHODS:
+        raise ValueError(f"Unsupported method '{method}', use one of {', '.join(METHODS)}")
+    if threshold <= 0:
+        raise ValueError("threshold must be positive")
+    if lookback_days < 0:
+        raise ValueError("lookback_days can't be negative")
+
+    as_of = None
+    if lookback_days and end is None:
+        latest = db.execute(latest_query(user_id)).scalar()
+        if latest is None:
+            return [], None
+        as_of = latest.date()
+
+    query = scored_query(dialect_name(db), user_id, threshold, method, category, start, end, lookback_days, as_of)
+
+    if cursor:
+        when, _, row_id = transactions.decode_cursor(cursor)
+        flagged = query.selected_columns
+        query = query.where(tuple_(flagged.date, flagged.id) < tuple_(when, row_id))
+
+    rows = db.execute(query.limit(limit + 1)).all()
+    page = rows[:limit]
+    next_cursor = transactions.encode_cursor(page[-1]) if len(rows) > limit else None
+
+    return [serialize(row) for row in page], next_cursor
@@ -0,0 +1,190 @@
+"""
+What-if budget simulation over the user's monthly category baseline.
+
+Scenario axes are combined as a full grid:
+
+    plan axes       savings rate, one candidate cap per capped category
+    condition axes  income change, inflation
+
+Every scenario is a row of one (scenarios x categories) spend matrix, so
+the grid is evaluated with a handful of NumPy operations whatever its size.
+A plan is feasible under a condition when its spending fits in the income
+left after the savings target. For each condition the result is the Pareto
+set of feasible plans: no other plan saves a larger share of income while
+cutting less.
+"""
+import os
+import time
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from backend.api.services import forecasting, rollups
+
+MAX_SCENARIOS = int(os.getenv("BUDGET_SIM_MAX_SCENARIOS", "100000"))
+
+
+# ---------------------------
+# BASELINE
+# ---------------------------
+def _window_average(months, Y, window):
+    """Per-row average of the columns whose month label is in window."""
+    cols = [i for i, label in enumerate(months) if label in window]
+    return Y[:, cols].sum(axis=1) / len(window)
+
+
+def baseline(db: Session, user_id: int, months: int = 3):
+    """
+    -> (categories, monthly spend per category, monthly income, months
+    averaged) over the last N months, or fewer when the history is shorter.
+    """
+    names, expense_months, Y, _ = forecasting.monthly_matrix(db, user_id)
+    _, income_months, I, _ = forecasting.monthly_matrix(db, user_id, rollups.INCOME)
+    if not names or not income_months:
+        return names, np.zeros(len(names)), 0.0, 0
+
+    end = forecasting.month_index(max(expense_months[-1], income_months[-1]))
+    # months before the first expense or income aren't zero spending, just missing
+    first = forecasting.month_index(min(expense_months[0], income_months[0]))
+    months = min(months, end - first + 1)
+    window = {forecasting.month_label(end - i) for i in range(months)}
+
+    spend = _window_average(expense_months, Y, window)
+    income = float(_window_average(income_months, I, window).sum())
+    return names, spend, income, months
+
+
+# ---------------------------
+# SIMULATION
+# ---------------------------
+def _check(values, name, low, high=np.inf):
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        raise ValueError(f"{name} needs at least one value")
+    if ((values < low) | (values > high)).any():
+        raise ValueError(f"{name} must be within [{low}, {high}]")
+    return values
+
+
+def _axes(names, savings_rates, income_changes, inflation, caps):
+    """Validated grid axes. -> (rates, changes, prices, [(column, caps)], sizes)"""
+    rates = _check(savings_rates, "savings_rates", 0, 1)
+    changes = _check(income_changes, "income_changes", -1)
+    prices = _check(inflation, "inflation", -1)
+
+    column = {name: i for i, name in enumerate(names)}
+    capped = []
+    for category, values in caps.items():
+        if category not in column:
+            raise ValueError(f"No spending in '{category}' to cap")
+        capped.append((column[category], _check(values, f"category_caps[{category}]", 0)))
+
+    sizes = [len(rates), len(changes), len(prices)] + [len(values) for _, values in capped]
+    n = int(np.prod(sizes))
+    if n > MAX_SCENARIOS:
+        raise ValueError(f"{n} scenarios requested, at most {MAX_SCENARIOS} allowed")
+
+    return rates, changes, prices, capped, sizes
+
+
+def simulate(spend, income, names, savings_rates, income_changes, inflation, caps) -> dict:
+    """
+    Evaluate the full scenario grid. -> dict of per-scenario arrays plus the
+    axis index of every scenario (for reading its parameters back).
+    """
+    rates, changes, prices, capped, sizes = _axes(names, savings_rates, income_changes, inflation, caps)
+    n = int(np.prod(sizes))
+
+    axes = np.unravel_index(np.arange(n), sizes)
+    rate, change, price = rates[axes[0]], changes[axes[1]], prices[axes[2]]
+
+    wanted = spend[None, :] * (1 + price)[:, None]
+    budgets = wanted.copy()
+    for (col, values), index in zip(capped, axes[3:]):
+        np.minimum(budgets[:, col], values[index], out=budgets[:, col])
+
+    monthly_income = income * (1 + change)
+    total = budgets.sum(axis=1)
+    savings = monthly_income - total
+
+    return {
+        "axes": axes,
+        "capped": [names[col] for col, _ in capped],
+        "cap_values": [values for _, values in capped],
+        "budgets": budgets,
+        "income": monthly_income,
+        "savings": savings,
+        "sacrifice": wanted.sum(axis=1) - total,
+        "feasible": savings >= monthly_income * rate,
+        # condition id: scenarios sharing income change and inflation
+        "condition": axes[1] * len(prices) + axes[2],
+    }
+
+
+def pareto_front(rate, sacrifice) -> np.ndarray:
+    """Indices of points not dominated on (rate high, sacrifice low), cheapest first."""
+    order = np.lexsort((-rate, sacrifice))
+    best_before = np.concatenate(([-np.inf], np.maximum.accumulate(rate[order])[:-1]))
+    return order[rate[order] > best_before]
+
+
+# ---------------------------
+# ENTRY POINT
+# ---------------------------
+def run(db: Session, user_id: int, savings_rates, income_changes, inflation, category_caps,
+        months: int = 3, limit: int = 20) -> dict:
+    if months < 1:
+        raise ValueError("months must be at least 1")
+
+    names, spend, income, months = baseline(db, user_id, months)
+    if not names:
+        return None
+    # bad axes are still a 400, but no grid is evaluated without an income
+    _axes(names, savings_rates, income_changes, inflation, category_caps)
+    if income <= 0:
+        return None
+
+    started = time.perf_counter()
+    sim = simulate(spend, income, names, savings_rates, income_changes, inflation, category_caps)
+
+    rates = np.asarray(savings_rates, dtype=np.float64)
+    changes = np.asarray(income_changes, dtype=np.float64)
+    prices = np.asarray(inflation, dtype=np.float64)
+    rate = rates[sim["axes"][0]]
+
+    conditions = []
+    for condition in np.unique(sim["condition"]):
+        members = np.flatnonzero((sim["condition"] == condition) & sim["feasible"])
+        front = members[pareto_front(rate[members], sim["sacrifice"][members])][:limit]
+
+        conditions.append({
+            "income_change": float(changes[condition // len(prices)]),
+            "inflation": float(prices[condition % len(prices)]),
+            "feasible_plans": int(len(members)),
+            "pareto": [_plan(sim, names, rate, i) for i in front],
+        })
+
+    return {
+        "baseline": {
+            "months": months,
+            "monthly_income": round(income, 2),
+            "monthly_spend": {name: round(float(v), 2) for name, v in zip(names, spend)},
+        },
+        "scenarios_evaluated": int(len(rate)),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        "conditions": conditions,
+    }
+
+
+def _plan(sim, names, rate, i) -> dict:
+    return {
+        "savings_rate": float(rate[i]),
+        "monthly_income": round(float(sim["income"][i]), 2),
+        "monthly_savings": round(float(sim["savings"][i]), 2),
+        "sacrifice": round(float(sim["sacrifice"][i]), 2),
+        "caps": {
+            category: float(values[index[i]])
+            for category, values, index in zip(sim["capped"], sim["cap_values"], sim["axes"][3:])
+        },
+        "budgets": {name: round(float(v), 2) for name, v in zip(names, sim["budgets"][i])},
+    }
@@ -0,0 +1,243 @@
+"""
+Running statistics of expense amounts per (user, category).
+
+One row holds count, mean and M2 (Welford), min / max and the latest amount,
+so the overspending / advisor / anomaly checks read a single primary-key row
+instead of the category's history.
+
+    python -m backend.api.services.category_stats rebuild [--user-id N]
+
+Inserts are folded in with Chan's parallel-merge formula inside one upsert,
+so concurrent writers never read-modify-write. Deletes downdate the moments
+exactly; min / max / latest can't be un-merged and are refreshed from the
+category's remaining rows.
+"""
+import argparse
+import logging
+import sys
+from collections import defaultdict
+
+import numpy as np
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.orm import Session
+
+from backend.api.models.vitya import CategoryStats, Expense
+from backend.api.services import rollups
+from backend.api.time_buckets import dialect_name
+
+
+# ---------------------------
+# BATCH SUMMARIES
+# ---------------------------
+def summarize(amounts: np.ndarray) -> dict:
+    """Moments of one date-ordered batch."""
+    n = len(amounts)
+    mean = float(amounts.mean())
+
+    return {
+        "count": n,
+        "mean": mean,
+        "m2": float(((amounts - mean) ** 2).sum()),
+        "min_amount": float(amounts.min()),
+        "max_amount": float(amounts.max()),
+        "last_amount": float(amounts[-1]),
+    }
+
+
+# ---------------------------
+# WRITE PATH
+# ---------------------------
+def _upsert(db: Session):
+    if dialect_name(db) == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    table = CategoryStats.__table__
+    stmt = insert(table)
+    new = stmt.excluded
+    old = table.c
+
+    total = old.count + new.count
+    delta = new.mean - old.mean
+
+    return stmt.on_conflict_do_update(
+        index_elements=[old.user_id, old.category],
+        set_={
+            "count": total,
+            "mean": old.mean + delta * new.count / total,
+            "m2": old.m2 + new.m2 + delta * delta * old.count * new.count / total,
+            "min_amount": case((new.min_amount < old.min_amount, new.min_amount), else_=old.min_amount),
+            "max_amount": case((new.max_amount > old.max_amount, new.max_amount), else_=old.max_amount),
+            "last_amount": case((new.last_date >= old.last_date, new.last_amount), else_=old.last_amount),
+            "last_date": case((new.last_date >= old.last_date, new.last_date), else_=old.last_date),
+        },
+    )
+
+
+def apply(db: Session, user_id: int, entries):
+    """Fold (date, category, amount) expense entries in, inside the caller's transaction."""
+    groups = defaultdict(list)
+    for date_value, category, amount in entries:
+        groups[category or rollups.UNCATEGORIZED].append((date_value, float(amount or 0)))
+
+    if not groups:
+        return
+
+    params = []
+    for category, items in groups.items():
+        items.sort(key=lambda item: item[0])
+        summary = summarize(np.array([amount for _, amount in items]))
+        summary.update(user_id=user_id, category=category, last_date=items[-1][0])
+        params.append(summary)
+
+    db.execute(_upsert(db), params)
+
+
+def remove(db: Session, user_id: int, entries):
+    """
+    Take (date, category, amount) entries back out. Call after the expense
+    rows are deleted (flushed) so the refresh reads the remaining history.
+    """
+    groups = defaultdict(list)
+    for _, category, amount in entries:
+        groups[category or rollups.UNCATEGORIZED].append(float(amount or 0))
+
+    for category, amounts in groups.items():
+        row = db.get(CategoryStats, (user_id, category), with_for_update=True)
+        if row is None:
+            continue
+
+        removed = np.array(amounts)
+        nb = len(removed)
+        remaining = row.count - nb
+
+        if remaining <= 0:
+            db.delete(row)
+            continue
+
+        # reverse of Chan's merge: total = remaining (+) removed
+        mb = float(removed.mean())
+        m2b = float(((removed - mb) ** 2).sum())
+        mean = (row.count * row.mean - nb * mb) / remaining
+        delta = mb - mean
+
+        row.m2 = max(row.m2 - m2b - delta * delta * remaining * nb / row.count, 0.0)
+        row.mean = mean
+        row.count = remaining
+
+        _refresh_tail(db, row)
+
+    db.flush()
+
+
+def _refresh_tail(db: Session, row: CategoryStats):
+    # rows without a category are tracked under UNCATEGORIZED, as in the rollup
+    if row.category == rollups.UNCATEGORIZED:
+        in_category = func.coalesce(Expense.category, rollups.UNCATEGORIZED) == row.category
+    else:
+        in_category = Expense.category == row.category
+
+    row.min_amount, row.max_amount = db.execute(
+        select(func.min(Expense.amount), func.max(Expense.amount)).where(
+            Expense.user_id == row.user_id, in_category
+        )
+    ).one()
+
+    latest = db.execute(
+        select(Expense.amount, Expense.date).where(
+            Expense.user_id == row.user_id, in_category, Expense.date.isnot(None)
+        ).order_by(Expense.date.desc(), Expense.id.desc()).limit(1)
+    ).first()
+
+    if latest is not None:
+        row.last_amount, row.last_date = float(latest[0]), latest[1]
+
+
+# ---------------------------
+# READ PATH
+# ---------------------------
+def get(db: Session, user_id: int, category: str):
+    return db.get(CategoryStats, (user_id, category))
+
+
+# ---------------------------
+# REBUILD / BACKFILL
+# ---------------------------
+def rebuild(db: Session, user_id: int = None, batch_size: int = 10_000):
+    """Recompute stats from the expense table (all users, or one user)."""
+    wipe = delete(CategoryStats)
+    if user_id is not None:
+        wipe = wipe.where(CategoryStats.user_id == user_id)
+    db.execute(wipe)
+
+    category = func.coalesce(Expense.category, rollups.UNCATEGORIZED)
+    query = select(Expense.user_id, category, Expense.date, Expense.amount).where(
+        Expense.user_id.isnot(None),
+        Expense.date.isnot(None),
+    )
+    if user_id is not None:
+        query = query.where(Expense.user_id == user_id)
+    query = query.order_by(Expense.user_id, category, Expense.date, Expense.id)
+
+    insert_stmt = CategoryStats.__table__.insert()
+    pending, key, amounts, last_date = [], None, [], None
+
+    def close_group():
+        summary = summarize(np.array(amounts))
+        pending.append({
+            "user_id": key[0],
+            "category": key[1],
+            "count": summary["count"],
+            "mean": summary["mean"],
+            "m2": summary["m2"],
+            "min_amount": summary["min_amount"],
+            "max_amount": summary["max_amount"],
+            "last_amount": summary["last_amount"],
+            "last_date": last_date,
+        })
+
+    for uid, cat, when, amount in db.execute(query.execution_options(yield_per=batch_size)):
+        if (uid, cat) != key:
+            if key is not None:
+                close_group()
+                if len(pending) >= 1000:
+                    db.execute(insert_stmt, pending)
+                    pending = []
+            key, amounts = (uid, cat), []
+        amounts.append(float(amount or 0))
+        last_date = when
+
+    if key is not None:
+        close_group()
+    if pending:
+        db.execute(insert_stmt, pending)
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def main(argv=None):
+    from backend.api.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Rebuild per-category running statistics")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    db = SessionLocal()
+    try:
+        rebuild(db, args.user_id)
+        db.commit()
+    finally:
+        db.close()
+
+    scope = f"user {args.user_id}" if args.user_id is not None else "all users"
+    logging.info(f"Category stats rebuilt for {scope}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.api.auth import token_required
+from backend.api.database import get_db
+from backend.api.models.vitya import UserDataVersion
+from backend.api.time_buckets import dialect_name
+
+
+# ---------------------------
+# COUNTER
+# ---------------------------
+def _upsert(db: Session):
+    if dialect_name(db) == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    stmt = insert(UserDataVersion)
+    return stmt.on_conflict_do_update(
+        index_elements=[UserDataVersion.user_id],
+        set_={"version": UserDataVersion.version + 1},
+    )
+
+
+def bump(db: Session, user_id: int):
+    """Advance the user's data version inside the caller's transaction."""
+    db.execute(_upsert(db), {"user_id": user_id, "version": 1})
+    db.info.get("data_versions", {}).pop(user_id, None)
+
+
+def current(db: Session, user_id: int) -> int:
+    # memoised on the session: the ETag check and the response cache both ask
+    seen = db.info.setdefault("data_versions", {})
+    if user_id not in seen:
+        seen[user_id] = db.execute(
+            select(UserDataVersion.version).where(UserDataVersion.user_id == user_id)
+        ).scalar() or 0
+    return seen[user_id]
+
+
+# ---------------------------
+# CONDITIONAL GET
+# ---------------------------
+def etag_for(user_id: int, version: int, stamp: str = None) -> str:
+    if stamp is not None:
+        return f'"u{user_id}-v{version}-{stamp}"'
+    return f'"u{user_id}-v{version}"'
+
+
+def _matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so a W/ prefix still matches
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def analytics_etag(
+    request: Request,
+    response: Response,
+    current_user=Depends(token_required),
+    db: Session = Depends(get_db)
+):
+    """
+    Route dependency: tag the response with the user's data version and
+    short-circuit with 304 before the handler runs when the client already
+    holds it.
+    """
+    _conditional(request, response, etag_for(current_user.id, current(db, current_user.id)))
+
+
+def stamped_etag(stamp):
+    """
+    analytics_etag for routes that also embed something built offline:
+    `stamp(db, user_id)` joins the data version in the ETag, so a rebuild
+    invalidates the client's copy too (pair with cached(..., stamp=...)).
+    """
+    def dependency(
+        request: Request,
+        response: Response,
+        current_user=Depends(token_required),
+        db: Session = Depends(get_db)
+    ):
+        etag = etag_for(current_user.id, current(db, current_user.id), stamp(db, current_user.id))
+        _conditional(request, response, etag)
+
+    return dependency
+
+
+def _conditional(request: Request, response: Response, etag: str):
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        raise HTTPException(status_code=304, headers=headers)
+
+    response.headers.update(headers)
@@ -0,0 +1,97 @@
+import csv
+import io
+import os
+import zlib
+from datetime import date, datetime, time, timedelta
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from backend.api.database import SessionLocal
+from backend.api.models.vitya import Expense, Income
+
+# rows pulled per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORTS = {
+    "expenses": {
+        "header": ["ID", "Amount", "Category", "Description", "Date"],
+        "columns": (Expense.id, Expense.amount, Expense.category, Expense.description, Expense.date),
+        "model": Expense,
+    },
+    "incomes": {
+        "header": ["ID", "Amount", "Source", "Date"],
+        "columns": (Income.id, Income.amount, Income.source, Income.date),
+        "model": Income,
+    },
+}
+
+
+def export_query(kind: str, user_id: int, start: date = None, end: date = None):
+    spec = EXPORTS[kind]
+    model = spec["model"]
+
+    query = select(*spec["columns"]).where(model.user_id == user_id)
+
+    if start is not None:
+        query = query.where(model.date >= datetime.combine(start, time.min))
+    if end is not None:
+        query = query.where(model.date < datetime.combine(end + timedelta(days=1), time.min))
+
+    return query.order_by(model.date, model.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+def _format(row) -> list:
+    *values, when = row
+    values[1] = float(values[1])
+    values = [v if v is not None else "" for v in values]
+    values.append(when.strftime("%Y-%m-%d") if when else "")
+    return values
+
+
+def csv_chunks(kind: str, user_id: int, start: date = None, end: date = None):
+    """
+    Yield the CSV one cursor batch at a time.
+
+    Runs on its own session: the request session is closed before a
+    StreamingResponse body starts to be sent.
+    """
+    db = SessionLocal()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    try:
+        writer.writerow(EXPORTS[kind]["header"])
+
+        result = db.execute(export_query(kind, user_id, start, end))
+        for batch in result.partitions():
+            writer.writerows(_format(row) for row in batch)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
+
+def gzip_chunks(chunks, level: int = 6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)   # wbits 31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def csv_response(kind: str, user_id: int, start: date = None, end: date = None, gzip: bool = False):
+    chunks = csv_chunks(kind, user_id, start, end)
+    headers = {"Content-Disposition": f"attachment; filename={kind}.csv"}
+
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+
+    return StreamingResponse(chunks, media_type="text/csv", headers=headers)
@@ -0,0 +1,213 @@
+"""
+Monthly spend forecasting, vectorised over categories.
+
+Series come straight from monthly_rollup (one indexed query per user), laid
+out as a (categories x months) matrix with missing months filled with 0.
+Each category's series starts at its first active month; earlier cells are
+masked out of every fit.
+
+    ols   closed-form least squares trend, all rows solved at once
+    holt  damped-trend exponential smoothing, rows updated in lock-step
+"""
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.api.models.vitya import MonthlyRollup
+from backend.api.services import rollups
+from backend.api.services.micro_batcher import MicroBatcher
+
+METHODS = ("ols", "holt")
+
+# months a category needs before it is forecast
+MIN_MONTHS = 3
+
+# damped Holt defaults; phi < 1 flattens the trend as the horizon grows
+HOLT_ALPHA = 0.5
+HOLT_BETA = 0.3
+HOLT_PHI = 0.9
+
+
+# ---------------------------
+# SERIES
+# ---------------------------
+def series_query(user_id: int, kind: str = rollups.EXPENSE, categories=None):
+    query = select(MonthlyRollup.category, MonthlyRollup.month, MonthlyRollup.total).where(
+        MonthlyRollup.user_id == user_id,
+        MonthlyRollup.kind == kind,
+    )
+    if categories is not None:
+        query = query.where(MonthlyRollup.category.in_(list(categories)))
+    return query
+
+
+def month_index(label: str) -> int:
+    year, month = label.split("-")
+    return int(year) * 12 + int(month) - 1
+
+
+def month_label(index: int) -> str:
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def matrix_from_columns(codes: np.ndarray, month_ids: np.ndarray, amounts: np.ndarray, rows: int):
+    """
+    Scatter (row code, absolute month index, amount) columns into the
+    (rows x months) series matrix. -> (first month index, Y, mask)
+    """
+    if not len(codes):
+        return None, np.zeros((rows, 0)), np.zeros((rows, 0), dtype=bool)
+
+    first = int(month_ids.min())
+    width = int(month_ids.max()) - first + 1
+
+    Y = np.zeros((rows, width))
+    np.add.at(Y, (codes, month_ids - first), amounts)
+
+    active = Y != 0
+    starts = np.where(active.any(axis=1), active.argmax(axis=1), width)
+    mask = np.arange(width)[None, :] >= starts[:, None]
+    return first, Y, mask
+
+
+def monthly_matrix(db: Session, user_id: int, kind: str = rollups.EXPENSE, categories=None):
+    """
+    -> (categories, months, Y, mask)
+
+    Y[c, m] is the total for category c in month m; mask[c, m] is True from the
+    category's first active month onwards.
+    """
+    rows = db.execute(series_query(user_id, kind, categories)).all()
+    if not rows:
+        return [], [], np.zeros((0, 0)), np.zeros((0, 0), dtype=bool)
+
+    names = sorted({r[0] for r in rows})
+    row_of = {name: i for i, name in enumerate(names)}
+
+    first, Y, mask = matrix_from_columns(
+        np.fromiter((row_of[r[0]] for r in rows), dtype=np.int64, count=len(rows)),
+        np.fromiter((month_index(r[1]) for r in rows), dtype=np.int64, count=len(rows)),
+        np.fromiter((float(r[2] or 0) for r in rows), dtype=np.float64, count=len(rows)),
+        len(names),
+    )
+
+    months = [month_label(first + i) for i in range(Y.shape[1])]
+    return names, months, Y, mask
+
+
+# ---------------------------
+# MODELS
+# ---------------------------
+def ols_forecast(Y: np.ndarray, mask: np.ndarray, horizon: int = 1) -> np.ndarray:
+    """Per-row least squares line over the masked cells, evaluated `horizon` months past the end."""
+    W = mask.astype(np.float64)
+    x = np.arange(Y.shape[1], dtype=np.float64)
+
+    n = W.sum(axis=1)
+    sx = W @ x
+    sxx = W @ (x * x)
+    sy = (W * Y).sum(axis=1)
+    sxy = (W * Y) @ x
+
+    denom = n * sxx - sx * sx
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(denom > 0, (n * sxy - sx * sy) / denom, 0.0)
+        intercept = np.where(n > 0, (sy - slope * sx) / n, 0.0)
+
+    target = Y.shape[1] - 1 + horizon
+    return np.maximum(intercept + slope * target, 0.0)
+
+
+def holt_forecast(Y: np.ndarray, mask: np.ndarray, horizon: int = 1,
+                  alpha: float = HOLT_ALPHA, beta: float = HOLT_BETA, phi: float = HOLT_PHI) -> np.ndarray:
+    """Damped-trend exponential smoothing; rows that haven't started yet are held at zero."""
+    rows, width = Y.shape
+    level = np.zeros(rows)
+    trend = np.zeros(rows)
+    started = np.zeros(rows, dtype=bool)
+
+    for t in range(width):
+        y = Y[:, t]
+        live = mask[:, t]
+        opening = live & ~started
+
+        new_level = alpha * y + (1 - alpha) * (level + phi * trend)
+        new_trend = beta * (new_level - level) + (1 - beta) * phi * trend
+
+        level = np.where(opening, y, np.where(live, new_level, level))
+        trend = np.where(opening, 0.0, np.where(live, new_trend, trend))
+        started |= live
+
+    damping = phi * (1 - phi ** horizon) / (1 - phi) if phi != 1 else float(horizon)
+    return np.maximum(level + damping * trend, 0.0)
+
+
+MODELS = {
+    "ols": ols_forecast,
+    "holt": holt_forecast,
+}
+
+
+def evaluate_batch(items):
+    """
+    [(Y, mask, method, horizon), ...] -> [forecast per row, ...]
+
+    Requests sharing a method and horizon are stacked into one matrix. Narrower
+    matrices are left-padded with masked-out months, which changes neither
+    model: both only see masked cells and forecast relative to the last column.
+    """
+    results = [None] * len(items)
+    groups = {}
+    for i, (_, _, method, horizon) in enumerate(items):
+        groups.setdefault((method, horizon), []).append(i)
+
+    for (method, horizon), members in groups.items():
+        width = max(items[i][0].shape[1] for i in members)
+        Y = np.vstack([np.pad(items[i][0], ((0, 0), (width - items[i][0].shape[1], 0))) for i in members])
+        mask = np.vstack([np.pad(items[i][1], ((0, 0), (width - items[i][1].shape[1], 0))) for i in members])
+
+        values = MODELS[method](Y, mask, horizon)
+        bounds = np.cumsum([0] + [items[i][0].shape[0] for i in members])
+        for i, start, end in zip(members, bounds[:-1], bounds[1:]):
+            results[i] = values[start:end]
+
+    return results
+
+
+# concurrent forecast requests are evaluated together
+forecast_batcher = MicroBatcher("forecast", evaluate_batch)
+
+
+# ---------------------------
+# ENTRY POINT
+# ---------------------------
+def forecast(db: Session, user_id: int, method: str = "ols", horizon: int = 1,
+             kind: str = rollups.EXPENSE, categories=None) -> dict:
+    """
+    Forecast every category of the user (or just `categories`) in one call.
+    Categories with fewer than MIN_MONTHS months of history are left out.
+    """
+    if method not in MODELS:
+        raise ValueError(f"Unsupported method '{method}', use one of {', '.join(METHODS)}")
+    if horizon < 1:
+        raise ValueError("horizon must be at least 1")
+
+    names, months, Y, mask = monthly_matrix(db, user_id, kind, categories)
+    if not names:
+        return {"method": method, "target_month": None, "forecasts": {}}
+
+    observed = mask.sum(axis=1)
+    values = forecast_batcher((Y, mask, method, horizon))
+
+    return {
+        "method": method,
+        "target_month": month_label(month_index(months[-1]) + horizon),
+        "forecasts": {
+            name: {
+                "months_observed": int(observed[i]),
+                "forecast": round(float(values[i]), 2),
+            }
+            for i, name in enumerate(names)
+            if observed[i] >= MIN_MONTHS
+        },
+    }
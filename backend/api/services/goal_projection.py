@@ -0,0 +1,136 @@
+"""
+"When will I reach my savings goal": Monte Carlo over bootstrapped months.
+
+The user's monthly net cash flow (income - expense, from the same monthly
+rollup buckets as the trend chart) is resampled with replacement into many
+future paths. Each path's balance is a running sum; the month it first
+crosses the goal is its time to goal.
+
+Paths are simulated a block of months at a time, and paths that have reached
+the goal drop out of later blocks, so long horizons only pay for the paths
+still short of the goal. After the first MIN_PATHS, more batches run while the
+measured rate says they fit in the latency budget, up to MAX_PATHS.
+
+The generator is seeded with (user, data version): the same data gives the
+same answer, which is what lets the route cache and ETag it.
+"""
+import os
+import time
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from backend.api.services import data_version, forecasting, rollups
+
+MIN_PATHS = 10_000
+MAX_PATHS = int(os.getenv("GOAL_SIM_MAX_PATHS", "200000"))
+LATENCY_BUDGET_MS = float(os.getenv("GOAL_SIM_BUDGET_MS", "50"))
+MAX_HORIZON = 600           # months
+BLOCK_MONTHS = 12
+MIN_MONTHS = 3
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+# ---------------------------
+# HISTORY
+# ---------------------------
+def monthly_net(db: Session, user_id: int):
+    """-> (labels, net) on a contiguous month axis, empty months counted as 0."""
+    income = rollups.bucket_totals(db, user_id, rollups.INCOME)
+    expense = rollups.bucket_totals(db, user_id, rollups.EXPENSE)
+    if not income and not expense:
+        return [], np.zeros(0)
+
+    ids = [forecasting.month_index(m) for m, _ in income + expense]
+    first, last = min(ids), max(ids)
+
+    net = np.zeros(last - first + 1)
+    for sign, rows in ((1, income), (-1, expense)):
+        for month, total in rows:
+            net[forecasting.month_index(month) - first] += sign * float(total or 0)
+
+    return [forecasting.month_label(first + i) for i in range(len(net))], net
+
+
+# ---------------------------
+# SIMULATION
+# ---------------------------
+def months_to_goal(rng, deltas: np.ndarray, start: float, goal: float, paths: int, horizon: int) -> np.ndarray:
+    """Months until each path's balance reaches goal (1-based); inf if not within horizon."""
+    result = np.full(paths, np.inf)
+    if start >= goal:
+        result[:] = 0
+        return result
+
+    balance = np.full(paths, float(start))
+    active = np.arange(paths)
+
+    for offset in range(0, horizon, BLOCK_MONTHS):
+        width = min(BLOCK_MONTHS, horizon - offset)
+        draws = deltas[rng.integers(0, len(deltas), size=(len(active), width))]
+        running = balance[active, None] + np.cumsum(draws, axis=1)
+
+        reached = running >= goal
+        hit = reached.any(axis=1)
+        result[active[hit]] = offset + reached[hit].argmax(axis=1) + 1
+
+        balance[active] = running[:, -1]
+        active = active[~hit]
+        if not len(active):
+            break
+
+    return result
+
+
+def project(db: Session, user_id: int, goal: float, start: float = None, horizon: int = 120,
+            budget_ms: float = LATENCY_BUDGET_MS) -> dict:
+    if goal <= 0:
+        raise ValueError("goal must be positive")
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise ValueError(f"horizon must be between 1 and {MAX_HORIZON} months")
+
+    labels, net = monthly_net(db, user_id)
+    if len(net) < MIN_MONTHS:
+        return None
+
+    # default starting point: everything saved so far
+    if start is None:
+        start = max(float(net.sum()), 0.0)
+
+    rng = np.random.default_rng([user_id, data_version.current(db, user_id)])
+
+    started = time.perf_counter()
+    batches = [months_to_goal(rng, net, start, goal, MIN_PATHS, horizon)]
+    paths = MIN_PATHS
+
+    while paths < MAX_PATHS:
+        elapsed = (time.perf_counter() - started) * 1000
+        per_batch = elapsed / len(batches)
+        if elapsed + per_batch > budget_ms:
+            break
+        batch = min(MIN_PATHS, MAX_PATHS - paths)
+        batches.append(months_to_goal(rng, net, start, goal, batch, horizon))
+        paths += batch
+
+    months = np.concatenate(batches)
+    reached = np.isfinite(months)
+    last = forecasting.month_index(labels[-1])
+
+    percentiles = {}
+    for p, value in zip(PERCENTILES, np.percentile(months, PERCENTILES, method="higher")):
+        percentiles[f"p{p}"] = {
+            "months": int(value),
+            "month": forecasting.month_label(last + int(value)),
+        } if np.isfinite(value) else None
+
+    return {
+        "goal": goal,
+        "start_balance": round(start, 2),
+        "history_months": len(net),
+        "average_monthly_net": round(float(net.mean()), 2),
+        "horizon_months": horizon,
+        "probability_within_horizon": round(float(reached.mean()), 4),
+        "percentiles": percentiles,
+        "paths": int(paths),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
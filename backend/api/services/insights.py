@@ -0,0 +1,134 @@
+"""
+Every per-category analysis in /api/ai (predict, overspending, advisor,
+anomaly) for all of a user's categories from a single query.
+
+The ledger is fetched once as columns (category code, amount, month, date)
+in (category, date, id) order, and each analysis is a grouped reduction
+over those arrays: np.bincount for counts and sums, the last index of each
+group for the latest amount, one boolean mask for anomalies.
+"""
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.api.models.vitya import Expense
+from backend.api.services import forecasting, rollups
+
+NOT_ENOUGH_DATA = {"message": "Not enough data"}
+
+# same thresholds as the single-category routes
+MIN_TRANSACTIONS = 3
+MIN_ANOMALY_TRANSACTIONS = 5
+OVERSPENDING_FACTOR = 1.5
+ANOMALY_FACTOR = 2
+BUDGET_HEADROOM = 1.2
+
+
+def columns_query(user_id: int):
+    # (user_id, category, date) index order: rows arrive already grouped
+    return select(Expense.category, Expense.amount, Expense.date).where(
+        Expense.user_id == user_id,
+        Expense.date.isnot(None),
+    ).order_by(Expense.category, Expense.date, Expense.id)
+
+
+def load_columns(db: Session, user_id: int):
+    """
+    -> (names, codes, amounts, month_ids, dates)
+
+    Rows are grouped by category and date-ordered within each group; dates
+    stay a tuple of datetimes since only a handful are ever read back.
+    """
+    rows = db.execute(columns_query(user_id)).all()
+    if not rows:
+        return [], np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=np.int64), ()
+
+    categories, amounts, dates = zip(*rows)
+    n = len(rows)
+
+    labels = np.array(categories, dtype=object)
+    starts = np.flatnonzero(np.concatenate(([True], labels[1:] != labels[:-1])))
+    codes = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, n)))
+    names = [labels[i] if labels[i] is not None else rollups.UNCATEGORIZED for i in starts]
+
+    amounts = np.fromiter((float(a or 0) for a in amounts), dtype=np.float64, count=n)
+    month_ids = np.fromiter((d.year * 12 + d.month - 1 for d in dates), dtype=np.int64, count=n)
+    return names, codes, amounts, month_ids, dates
+
+
+def _advice(last: float, avg: float) -> str:
+    if last > avg:
+        return "Spending increasing. Reduce expenses."
+    if last < avg:
+        return "Good control on spending."
+    return "Spending stable."
+
+
+def compute(db: Session, user_id: int) -> dict:
+    names, codes, amounts, month_ids, dates = load_columns(db, user_id)
+    if not names:
+        return {"target_month": None, "categories": {}}
+
+    k = len(names)
+    counts = np.bincount(codes, minlength=k)
+    sums = np.bincount(codes, weights=amounts, minlength=k)
+    avg = sums / np.maximum(counts, 1)
+
+    ends = np.cumsum(counts) - 1
+    last = amounts[ends]
+
+    # next-month forecast from the same columns, no rollup round trip
+    first, Y, mask = forecasting.matrix_from_columns(codes, month_ids, amounts, k)
+    predicted = forecasting.ols_forecast(Y, mask)
+    months_observed = mask.sum(axis=1)
+    target_month = forecasting.month_label(first + Y.shape[1])
+
+    flagged = amounts > avg[codes] * ANOMALY_FACTOR
+    flagged_at = np.flatnonzero(flagged)
+    # codes are grouped, so each category's flagged rows form one slice
+    bounds = np.searchsorted(codes[flagged_at], np.arange(k + 1))
+
+    result = {}
+    for i, name in enumerate(names):
+        n = int(counts[i])
+        mean = float(avg[i])
+        latest = float(last[i])
+
+        entry = {"transactions": n, "last_date": dates[ends[i]].isoformat()}
+
+        if months_observed[i] >= forecasting.MIN_MONTHS:
+            entry["predict"] = {"predicted_next_month_expense": round(float(predicted[i]), 2)}
+        else:
+            entry["predict"] = NOT_ENOUGH_DATA
+
+        if n >= MIN_TRANSACTIONS:
+            entry["overspending"] = {
+                "average_spending": round(mean, 2),
+                "last_spending": round(latest, 2),
+                "overspending": latest > mean * OVERSPENDING_FACTOR,
+            }
+            entry["advisor"] = {
+                "average_spending": round(mean, 2),
+                "last_expense": round(latest, 2),
+                "recommended_budget": round(mean * BUDGET_HEADROOM, 2),
+                "advice": _advice(latest, mean),
+            }
+        else:
+            entry["overspending"] = NOT_ENOUGH_DATA
+            entry["advisor"] = NOT_ENOUGH_DATA
+
+        if n >= MIN_ANOMALY_TRANSACTIONS:
+            rows = flagged_at[bounds[i]:bounds[i + 1]]
+            entry["anomaly"] = {
+                "average_expense": round(mean, 2),
+                "anomalies": [
+                    {"amount": float(amounts[r]), "date": dates[r].isoformat()}
+                    for r in rows
+                ],
+            }
+        else:
+            entry["anomaly"] = NOT_ENOUGH_DATA
+
+        result[name] = entry
+
+    return {"target_month": target_month, "categories": result}
@@ -0,0 +1,177 @@
+import hashlib
+import os
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from backend.api.models.vitya import Expense, Income
+from backend.api.services import category_stats, data_version, rollups, sketches
+from backend.api.services.response_cache import response_cache
+
+# max rows accepted by a single bulk request
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "500"))
+
+# ---------------------------
+# FINGERPRINTS
+# ---------------------------
+def fingerprint(date_value, amount, description) -> str:
+    """Stable 16-hex digest of (day, amount, normalised description) used for dedup."""
+    day = date_value.strftime("%Y-%m-%d") if date_value else ""
+    text = " ".join((description or "").lower().split())
+    raw = f"{day}|{float(amount or 0):.2f}|{text}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def existing_fingerprints(db: Session, user_id: int, model, digests) -> set:
+    if not digests:
+        return set()
+
+    return set(db.execute(
+        select(model.fingerprint).where(
+            model.user_id == user_id,
+            model.fingerprint.in_(list(digests)),
+        )
+    ).scalars())
+
+
+# ---------------------------
+# LEDGER WRITES
+# ---------------------------
+# Every insert / delete of an expense / income goes through here so derived tables and
+# the user's data version are maintained in the same transaction as the row
+# itself. Rows are written with one executemany INSERT ... RETURNING id per
+# call. Callers commit.
+
+
+def _touch(db: Session, user_id: int):
+    data_version.bump(db, user_id)
+    response_cache.invalidate_user(user_id)
+
+
+def record_expense(db: Session, user_id: int, amount, category, description=None, date=None) -> int:
+    return record_expenses(db, user_id, [{
+        "amount": amount,
+        "category": category,
+        "description": description,
+        "date": date,
+    }])[0]
+
+
+def record_income(db: Session, user_id: int, amount, source, date=None) -> int:
+    return record_incomes(db, user_id, [{
+        "amount": amount,
+        "source": source,
+        "date": date,
+    }])[0]
+
+
+def record_expenses(db: Session, user_id: int, items) -> list:
+    rows = [
+        {
+            "amount": item["amount"],
+            "category": item["category"],
+            "description": item.get("description"),
+            "date": item.get("date") or datetime.utcnow(),
+            "user_id": user_id,
+        }
+        for item in items
+    ]
+    if not rows:
+        return []
+
+    for row in rows:
+        row["fingerprint"] = fingerprint(row["date"], row["amount"], row["description"])
+
+    ids = db.execute(
+        insert(Expense).returning(Expense.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+
+    entries = [(r["date"], r["category"], r["amount"]) for r in rows]
+    rollups.apply(db, user_id, rollups.EXPENSE, entries)
+    category_stats.apply(db, user_id, entries)
+    sketches.apply(db, user_id, entries)
+    _touch(db, user_id)
+    return ids
+
+
+def record_incomes(db: Session, user_id: int, items) -> list:
+    rows = [
+        {
+            "amount": item["amount"],
+            "source": item["source"],
+            "date": item.get("date") or datetime.utcnow(),
+            "user_id": user_id,
+        }
+        for item in items
+    ]
+    if not rows:
+        return []
+
+    for row in rows:
+        row["fingerprint"] = fingerprint(row["date"], row["amount"], row["source"])
+
+    ids = db.execute(
+        insert(Income).returning(Income.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+
+    rollups.apply(db, user_id, rollups.INCOME, ((r["date"], r["source"], r["amount"]) for r in rows))
+    _touch(db, user_id)
+    return ids
+
+
+# ---------------------------
+# LEDGER DELETES
+# ---------------------------
+def delete_expense(db: Session, user_id: int, expense_id: int) -> bool:
+    row = db.execute(
+        delete(Expense)
+        .where(Expense.id == expense_id, Expense.user_id == user_id)
+        .returning(Expense.date, Expense.category, Expense.amount)
+    ).first()
+    if row is None:
+        return False
+
+    entries = [tuple(row)]
+    rollups.apply(db, user_id, rollups.EXPENSE, entries, sign=-1)
+    category_stats.remove(db, user_id, entries)
+    sketches.refresh(db, user_id, entries)
+    _touch(db, user_id)
+    return True
+
+
+def delete_income(db: Session, user_id: int, income_id: int) -> bool:
+    row = db.execute(
+        delete(Income)
+        .where(Income.id == income_id, Income.user_id == user_id)
+        .returning(Income.date, Income.source, Income.amount)
+    ).first()
+    if row is None:
+        return False
+
+    rollups.apply(db, user_id, rollups.INCOME, [tuple(row)], sign=-1)
+    _touch(db, user_id)
+    return True
+
+
+# ---------------------------
+# BULK VALIDATION
+# ---------------------------
+def validate_items(items, schema):
+    """
+    Validate every item on its own so one bad row doesn't reject the batch.
+    Returns ([(index, model), ...], [(index, errors), ...]).
+    """
+    valid, invalid = [], []
+
+    for index, raw in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(raw)))
+        except ValidationError as e:
+            invalid.append((index, jsonable_encoder(
+                e.errors(include_url=False, include_context=False, include_input=False)
+            )))
+
+    return valid, invalid
@@ -0,0 +1,32 @@
+"""
+Fixed-bucket histograms for the in-process stats behind /health/stats
+(micro-batch sizes and queue latency, chat routing and handler times).
+
+Not thread-safe on its own: owners observe under their own lock.
+"""
+import bisect
+
+LATENCY_MS_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 25, 50, 100)
+
+
+class Histogram:
+    """Fixed bounds; bucket i counts values in (bounds[i - 1], bounds[i]], the last one the rest."""
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def snapshot(self) -> dict:
+        labels = [f"le_{bound:g}" for bound in self.bounds] + ["le_inf"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else None,
+        }
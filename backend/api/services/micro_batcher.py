@@ -0,0 +1,135 @@
+"""
+In-process micro-batching for small NumPy model evaluations.
+
+Route handlers run in the threadpool; each one submits its item and blocks
+on a Future. One daemon thread per batcher takes the first queued item,
+keeps collecting until MICRO_BATCH_MAX_ITEMS are queued or
+MICRO_BATCH_MAX_WAIT_MS have passed since that item arrived, then calls
+fn(items) once and hands each caller its own result.
+
+fn must take a list of items and return a list of results in the same
+order. An exception from fn is raised in every caller of that batch.
+
+Batch sizes and per-item queue latency are kept as histograms and exposed
+through stats() (and /health/stats).
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from backend.api.services.metrics import LATENCY_MS_BUCKETS, Histogram
+
+MICRO_BATCH_MAX_ITEMS = int(os.getenv("MICRO_BATCH_MAX_ITEMS", "64"))
+MICRO_BATCH_MAX_WAIT_MS = float(os.getenv("MICRO_BATCH_MAX_WAIT_MS", "2"))
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class MicroBatcher:
+
+    def __init__(self, name: str, fn, max_items: int = MICRO_BATCH_MAX_ITEMS,
+                 max_wait_ms: float = MICRO_BATCH_MAX_WAIT_MS):
+        self.name = name
+        self.fn = fn
+        self.max_items = max_items
+        self.max_wait = max_wait_ms / 1000
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_latency_ms = Histogram(LATENCY_MS_BUCKETS)
+        self.errors = 0
+
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._pid = None
+
+        BATCHERS[name] = self
+
+    # ---------------------------
+    # SUBMIT
+    # ---------------------------
+    def submit(self, item) -> Future:
+        future = Future()
+        if self.max_items <= 1:
+            # batching off: evaluate in the caller's thread
+            try:
+                future.set_result(self.fn([item])[0])
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._ensure_worker()
+        self._queue.put((time.perf_counter(), item, future))
+        return future
+
+    def __call__(self, item):
+        return self.submit(item).result()
+
+    def _ensure_worker(self):
+        # threads don't survive fork: a gunicorn worker starts its own
+        if self._worker is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is None or self._pid != os.getpid():
+                if self._pid != os.getpid():
+                    self._queue = queue.SimpleQueue()
+                self._pid = os.getpid()
+                self._worker = threading.Thread(target=self._run, name=f"batcher-{self.name}", daemon=True)
+                self._worker.start()
+
+    # ---------------------------
+    # WORKER
+    # ---------------------------
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = batch[0][0] + self.max_wait
+
+        while len(batch) < self.max_items:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            dispatched = time.perf_counter()
+
+            with self._lock:
+                self.batch_sizes.observe(len(batch))
+                for enqueued, _, _ in batch:
+                    self.queue_latency_ms.observe((dispatched - enqueued) * 1000)
+
+            try:
+                results = self.fn([item for _, item, _ in batch])
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_items": self.max_items,
+                "max_wait_ms": self.max_wait * 1000,
+                "errors": self.errors,
+                "batch_size": self.batch_sizes.snapshot(),
+                "queue_latency_ms": self.queue_latency_ms.snapshot(),
+            }
+
+
+BATCHERS = {}
+
+
+def stats() -> dict:
+    return {name: batcher.stats() for name, batcher in BATCHERS.items()}
@@ -0,0 +1,198 @@
+"""
+Versioned on-disk registry of per-user trained models.
+
+    <MODEL_REGISTRY_DIR>/<user_id>/v<version>/params.npy   (categories x params)
+                                             /meta.json    category names, trained_at
+    <MODEL_REGISTRY_DIR>/<user_id>/CURRENT                 active version number
+
+A version is written into a private temp directory and renamed into place, and
+CURRENT is swapped with os.replace, so readers in other workers see either the
+old version or the complete new one, never a half-written file. Two workers
+saving at once get different version numbers.
+
+Parameters are loaded with np.load(mmap_mode="r"): pages come from the OS page
+cache and are shared between workers. Loaded bundles are kept in an LRU that
+evicts by total array bytes.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+MODEL_REGISTRY_DIR = os.getenv(
+    "MODEL_REGISTRY_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "..", "instance", "models"),
+)
+MODEL_CACHE_BYTES = int(os.getenv("MODEL_CACHE_BYTES", str(64 * 1024 * 1024)))
+# versions kept per user after a save (the active one included)
+KEEP_VERSIONS = 3
+
+
+class ModelBundle:
+    """One user's models at one version: a row of params per category."""
+
+    __slots__ = ("user_id", "version", "rows", "params", "meta")
+
+    def __init__(self, user_id: int, version: int, categories, params: np.ndarray, meta: dict):
+        self.user_id = user_id
+        self.version = version
+        self.rows = {category: i for i, category in enumerate(categories)}
+        self.params = params
+        self.meta = meta
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.params.nbytes)
+
+    def get(self, category: str):
+        row = self.rows.get(category)
+        return None if row is None else self.params[row]
+
+
+class ModelRegistry:
+
+    def __init__(self, root: str = MODEL_REGISTRY_DIR, memory_budget: int = MODEL_CACHE_BYTES):
+        self.root = os.path.abspath(root)
+        self.memory_budget = memory_budget
+        self._resident = OrderedDict()      # (user_id, version) -> ModelBundle
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    # ---------------------------
+    # LAYOUT
+    # ---------------------------
+    def _user_dir(self, user_id: int) -> str:
+        return os.path.join(self.root, str(int(user_id)))
+
+    def versions(self, user_id: int) -> list:
+        try:
+            names = os.listdir(self._user_dir(user_id))
+        except FileNotFoundError:
+            return []
+        return sorted(int(name[1:]) for name in names if name.startswith("v") and name[1:].isdigit())
+
+    def current_version(self, user_id: int):
+        try:
+            with open(os.path.join(self._user_dir(user_id), "CURRENT")) as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    # ---------------------------
+    # WRITE
+    # ---------------------------
+    def save(self, user_id: int, categories, params: np.ndarray, **meta) -> int:
+        """Persist a new version and make it current. -> version number."""
+        user_dir = self._user_dir(user_id)
+        os.makedirs(user_dir, exist_ok=True)
+
+        staging = tempfile.mkdtemp(prefix=".tmp-", dir=user_dir)
+        try:
+            np.save(os.path.join(staging, "params.npy"), np.ascontiguousarray(params, dtype=np.float64))
+
+            while True:
+                version = (self.versions(user_id) or [0])[-1] + 1
+                with open(os.path.join(staging, "meta.json"), "w") as f:
+                    json.dump({
+                        "categories": list(categories),
+                        "version": version,
+                        "trained_at": datetime.utcnow().isoformat(),
+                        **meta,
+                    }, f)
+                try:
+                    # fails if another worker claimed this version first
+                    os.rename(staging, os.path.join(user_dir, f"v{version}"))
+                    break
+                except OSError:
+                    if not os.path.isdir(os.path.join(user_dir, f"v{version}")):
+                        raise
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self._set_current(user_id, version)
+        self.prune(user_id)
+        return version
+
+    def _set_current(self, user_id: int, version: int):
+        # a slower concurrent save of an older version must not win
+        current = self.current_version(user_id)
+        if current is not None and current > version:
+            return
+
+        user_dir = self._user_dir(user_id)
+        fd, path = tempfile.mkstemp(prefix=".current-", dir=user_dir)
+        with os.fdopen(fd, "w") as f:
+            f.write(str(version))
+        os.replace(path, os.path.join(user_dir, "CURRENT"))
+
+    def prune(self, user_id: int, keep: int = KEEP_VERSIONS):
+        current = self.current_version(user_id)
+        for version in self.versions(user_id)[:-keep]:
+            if version != current:
+                shutil.rmtree(os.path.join(self._user_dir(user_id), f"v{version}"), ignore_errors=True)
+
+    # ---------------------------
+    # READ
+    # ---------------------------
+    def load(self, user_id: int, version: int = None):
+        """The user's bundle (current version by default), or None if never trained."""
+        version = version if version is not None else self.current_version(user_id)
+        if version is None:
+            return None
+
+        key = (user_id, version)
+        with self._lock:
+            bundle = self._resident.get(key)
+            if bundle is not None:
+                self._resident.move_to_end(key)
+                return bundle
+
+        path = os.path.join(self._user_dir(user_id), f"v{version}")
+        try:
+            with open(os.path.join(path, "meta.json")) as f:
+                meta = json.load(f)
+            params = np.load(os.path.join(path, "params.npy"), mmap_mode="r")
+        except FileNotFoundError:
+            return None
+
+        bundle = ModelBundle(user_id, version, meta["categories"], params, meta)
+
+        with self._lock:
+            if key not in self._resident:
+                self._resident[key] = bundle
+                self._bytes += bundle.nbytes
+                self.loads += 1
+            self._evict()
+        return bundle
+
+    def get(self, user_id: int, category: str, version: int = None):
+        bundle = self.load(user_id, version)
+        return None if bundle is None else bundle.get(category)
+
+    def _evict(self):
+        # the newest entry always stays, even if it alone exceeds the budget
+        while len(self._resident) > 1 and self._bytes > self.memory_budget:
+            _, bundle = self._resident.popitem(last=False)
+            self._bytes -= bundle.nbytes
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "resident": len(self._resident),
+                "bytes": self._bytes,
+                "memory_budget": self.memory_budget,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,225 @@
+"""
+Spending personas: users clustered by how their spending splits across
+categories, for "people like you" comparisons.
+
+    python -m backend.api.services.personas build [--clusters K] [--chunk-users N]
+
+Features come from monthly_rollup: one float32 row per user holding the
+share of their lifetime spending in each of the MAX_CATEGORIES most common
+categories, the rest pooled under OTHER. Rows are built a chunk of users at
+a time (keyset on user id) and fed to MiniBatchKMeans.partial_fit, so memory
+is bounded by the chunk, not by the number of users.
+
+A final pass assigns every user to a cluster. persona_assignment (one row
+per user) and persona_centroid (one row per cluster and category) are
+replaced in one transaction. The advisor reads both by primary key.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.orm import Session
+
+from backend.api.models.vitya import MonthlyRollup, PersonaAssignment, PersonaCentroid
+from backend.api.services import rollups
+
+PERSONA_CLUSTERS = int(os.getenv("PERSONA_CLUSTERS", "8"))
+MAX_CATEGORIES = 64
+CHUNK_USERS = 4096
+EPOCHS = 3
+OTHER = "*other*"
+
+
+# ---------------------------
+# FEATURES
+# ---------------------------
+def vocabulary(db: Session, limit: int = MAX_CATEGORIES) -> list:
+    """Expense categories ordered by how many users have them."""
+    users = func.count(func.distinct(MonthlyRollup.user_id))
+    return list(db.execute(
+        select(MonthlyRollup.category)
+        .where(MonthlyRollup.kind == rollups.EXPENSE)
+        .group_by(MonthlyRollup.category)
+        .order_by(users.desc(), MonthlyRollup.category)
+        .limit(limit)
+    ).scalars())
+
+
+def share_chunks(db: Session, columns: list, chunk_users: int = CHUNK_USERS):
+    """Yield (user_ids, float32 share matrix) a chunk of users at a time."""
+    column_of = {name: i for i, name in enumerate(columns)}
+    other = column_of[OTHER]
+    after = 0
+
+    while True:
+        user_ids = list(db.execute(
+            select(MonthlyRollup.user_id)
+            .where(MonthlyRollup.kind == rollups.EXPENSE, MonthlyRollup.user_id > after)
+            .group_by(MonthlyRollup.user_id)
+            .order_by(MonthlyRollup.user_id)
+            .limit(chunk_users)
+        ).scalars())
+        if not user_ids:
+            return
+        after = user_ids[-1]
+
+        row_of = {uid: i for i, uid in enumerate(user_ids)}
+        X = np.zeros((len(user_ids), len(columns)), dtype=np.float32)
+
+        totals = db.execute(
+            select(MonthlyRollup.user_id, MonthlyRollup.category, func.sum(MonthlyRollup.total))
+            .where(
+                MonthlyRollup.kind == rollups.EXPENSE,
+                MonthlyRollup.user_id.between(user_ids[0], user_ids[-1]),
+            )
+            .group_by(MonthlyRollup.user_id, MonthlyRollup.category)
+        )
+        for uid, category, total in totals:
+            X[row_of[uid], column_of.get(category, other)] += max(float(total or 0), 0.0)
+
+        sums = X.sum(axis=1)
+        keep = sums > 0
+        X = X[keep] / sums[keep, None]
+        yield [uid for uid, kept in zip(user_ids, keep) if kept], X
+
+
+# ---------------------------
+# CLUSTERING
+# ---------------------------
+def build(db: Session, clusters: int = PERSONA_CLUSTERS, chunk_users: int = CHUNK_USERS,
+          epochs: int = EPOCHS, seed: int = 0) -> dict:
+    """Fit the clusters and replace the stored assignments / centroids."""
+    from sklearn.cluster import MiniBatchKMeans
+
+    started = time.perf_counter()
+    columns = vocabulary(db) + [OTHER]
+
+    users = db.execute(
+        select(func.count(func.distinct(MonthlyRollup.user_id))).where(MonthlyRollup.kind == rollups.EXPENSE)
+    ).scalar() or 0
+    k = min(clusters, users, chunk_users)
+    if k < 1:
+        return {"users": 0, "clusters": 0, "seconds": 0.0}
+
+    model = MiniBatchKMeans(n_clusters=k, random_state=seed, n_init=3, batch_size=min(chunk_users, 1024))
+    fitted = False
+    for _ in range(epochs):
+        for _, X in share_chunks(db, columns, chunk_users):
+            # the first call needs at least k rows; smaller leftovers join later epochs
+            if fitted or len(X) >= k:
+                model.partial_fit(X)
+                fitted = True
+    if not fitted:
+        return {"users": users, "clusters": 0, "seconds": round(time.perf_counter() - started, 3)}
+
+    db.execute(delete(PersonaAssignment))
+    db.execute(delete(PersonaCentroid))
+
+    sizes = np.zeros(k, dtype=np.int64)
+    for user_ids, X in share_chunks(db, columns, chunk_users):
+        labels = model.predict(X)
+        distance = np.linalg.norm(X - model.cluster_centers_[labels], axis=1)
+        sizes += np.bincount(labels, minlength=k)
+        db.execute(PersonaAssignment.__table__.insert(), [
+            {"user_id": uid, "cluster": int(label), "distance": float(d)}
+            for uid, label, d in zip(user_ids, labels, distance)
+        ])
+
+    db.execute(PersonaCentroid.__table__.insert(), [
+        {"cluster": c, "category": name, "share": float(model.cluster_centers_[c, i]), "users": int(sizes[c])}
+        for c in range(k)
+        for i, name in enumerate(columns)
+    ])
+
+    return {
+        "users": int(sizes.sum()),
+        "clusters": k,
+        "categories": len(columns),
+        "cluster_sizes": sizes.tolist(),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+# ---------------------------
+# READ PATH
+# ---------------------------
+def stamp_query(user_id: int):
+    return select(PersonaAssignment.built_at).where(PersonaAssignment.user_id == user_id)
+
+
+def build_stamp(db: Session, user_id: int) -> str:
+    """When the user's persona was last built ("0" before the first build)."""
+    # memoised on the session: the ETag check and the response cache both ask
+    seen = db.info.setdefault("persona_stamps", {})
+    if user_id not in seen:
+        built_at = db.execute(stamp_query(user_id)).scalar()
+        seen[user_id] = f"{built_at:%Y%m%d%H%M%S%f}" if built_at is not None else "0"
+    return seen[user_id]
+
+
+def centroid_query(user_id: int, category: str):
+    return select(
+        PersonaAssignment.cluster, PersonaCentroid.share, PersonaCentroid.users
+    ).join(
+        PersonaCentroid,
+        and_(PersonaCentroid.cluster == PersonaAssignment.cluster, PersonaCentroid.category == category),
+    ).where(PersonaAssignment.user_id == user_id)
+
+
+def compare(db: Session, user_id: int, category: str, category_total: float):
+    """The user's share of spending in `category` against their cluster's, or None."""
+    row = db.execute(centroid_query(user_id, category)).first()
+    if row is None:
+        return None
+
+    total = rollups.kind_total(db, user_id, rollups.EXPENSE)
+    share = category_total / total if total > 0 else 0.0
+    cluster_share = float(row.share)
+
+    if share > cluster_share * 1.2:
+        verdict = "You spend a larger share here than people like you."
+    elif share < cluster_share * 0.8:
+        verdict = "You spend a smaller share here than people like you."
+    else:
+        verdict = "In line with people like you."
+
+    return {
+        "cluster": row.cluster,
+        "cluster_users": row.users,
+        "your_share": round(share, 4),
+        "cluster_share": round(cluster_share, 4),
+        "comparison": verdict,
+    }
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def main(argv=None):
+    from backend.api.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Cluster users into spending personas")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--clusters", type=int, default=PERSONA_CLUSTERS)
+    parser.add_argument("--chunk-users", type=int, default=CHUNK_USERS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    db = SessionLocal()
+    try:
+        report = build(db, args.clusters, args.chunk_users)
+        db.commit()
+    finally:
+        db.close()
+
+    logging.info(f"Personas built: {report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
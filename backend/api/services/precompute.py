@@ -0,0 +1,315 @@
+"""
+Nightly batch precompute across all users.
+
+    python -m backend.api.services.precompute run [--workers N] [--chunk-size N]
+                                                  [--stages rollups,forecasts,anomalies] [--restart]
+    python -m backend.api.services.precompute status
+
+Users are streamed in id order, in chunks, to a process pool. For each user
+the stages run in order:
+
+    rollups    rebuild monthly_rollup, category_stats and quantile sketches
+    forecasts  /api/ai/forecast and /api/ai/insights
+    anomalies  /api/ai/anomalies (first page) and /api/ai/subscriptions
+
+Route stages call the route handler itself (undecorated) with its default
+arguments and store the response in precomputed_result, tagged with the
+user's data version. @cached routes read that table on a cache miss, so a
+result is served only while the user's data is unchanged since the job ran.
+
+After every chunk the checkpoint records the highest user id below which
+every chunk has finished; an interrupted run resumes from there. The
+population quantile sketch and the spending personas are rebuilt once all
+users are done.
+"""
+import argparse
+import inspect
+import json
+import logging
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.api.models.vitya import JobCheckpoint, PrecomputedResult, User
+from backend.api.services import data_version
+
+JOB_NAME = "nightly"
+STAGES = ("rollups", "forecasts", "anomalies")
+DEFAULT_CHUNK_SIZE = 200
+
+
+# ---------------------------
+# READ PATH
+# ---------------------------
+def lookup(db: Session, user_id: int, endpoint: str, params: str, version: int):
+    """Stored response for these route arguments, if computed at this data version."""
+    row = db.get(PrecomputedResult, (user_id, endpoint, params))
+    if row is None or row.version != version:
+        return None
+    return json.loads(row.payload)
+
+
+# ---------------------------
+# STAGES
+# ---------------------------
+def _stage_routes(stage: str):
+    # imported late: the routes import response_cache, which imports this module
+    from backend.api.routes import ai
+
+    return {
+        "forecasts": (ai.forecast_expenses, ai.category_insights),
+        "anomalies": (ai.list_anomalies, ai.list_subscriptions),
+    }.get(stage, ())
+
+
+def _default_params(route) -> dict:
+    params = {}
+    for name, parameter in inspect.signature(route.__wrapped__).parameters.items():
+        if name in ("current_user", "db"):
+            continue
+        params[name] = parameter.default
+    return params
+
+
+def _store_route(db: Session, user: User, route):
+    from backend.api.services.response_cache import response_cache
+
+    params = _default_params(route)
+    version = data_version.current(db, user.id)
+
+    try:
+        payload = route.__wrapped__(current_user=user, db=db, **params)
+    except HTTPException:
+        # "Not enough data" and friends: nothing to serve, the route answers quickly anyway
+        return
+
+    db.merge(PrecomputedResult(
+        user_id=user.id,
+        endpoint=route.cache_endpoint,
+        params=response_cache.encode_params(params),
+        version=version,
+        payload=json.dumps(jsonable_encoder(payload), separators=(",", ":")),
+        computed_at=datetime.utcnow(),
+    ))
+
+
+def _refresh_rollups(db: Session, user: User):
+    from backend.api.services import category_stats, rollups, sketches
+
+    rollups.rebuild(db, user.id)
+    category_stats.rebuild(db, user.id)
+    sketches.rebuild(db, user.id)
+
+
+def run_stage(db: Session, user: User, stage: str):
+    if stage == "rollups":
+        _refresh_rollups(db, user)
+    for route in _stage_routes(stage):
+        _store_route(db, user, route)
+
+
+# ---------------------------
+# WORKERS
+# ---------------------------
+def _init_worker():
+    # forked children must not reuse the parent's pooled connections
+    from backend.api.database import engine
+    engine.dispose(close=False)
+
+
+def process_chunk(user_ids, stages) -> dict:
+    """Run every stage for each user; -> per-stage {users, errors, seconds}."""
+    from backend.api.database import SessionLocal
+
+    report = {stage: {"users": 0, "errors": 0, "seconds": 0.0} for stage in stages}
+    db = SessionLocal()
+    try:
+        for user_id in user_ids:
+            user = db.get(User, user_id)
+            if user is None:
+                continue
+
+            for stage in stages:
+                started = time.perf_counter()
+                try:
+                    run_stage(db, user, stage)
+                    db.commit()
+                    report[stage]["users"] += 1
+                except Exception as e:
+                    db.rollback()
+                    report[stage]["errors"] += 1
+                    logging.error(f"Precompute {stage} failed for user {user_id}: {e}")
+                report[stage]["seconds"] += time.perf_counter() - started
+    finally:
+        db.close()
+
+    return report
+
+
+# ---------------------------
+# DRIVER
+# ---------------------------
+def _user_chunks(db: Session, after: int, chunk_size: int):
+    # keyset pages rather than one open cursor: the driver commits the
+    # checkpoint between chunks
+    while True:
+        chunk = db.execute(
+            select(User.id).where(User.id > after).order_by(User.id).limit(chunk_size)
+        ).scalars().all()
+        if not chunk:
+            return
+        yield chunk
+        after = chunk[-1]
+
+
+def _checkpoint(db: Session, restart: bool) -> JobCheckpoint:
+    checkpoint = db.get(JobCheckpoint, JOB_NAME)
+    now = datetime.utcnow()
+
+    if checkpoint is None:
+        checkpoint = JobCheckpoint(job=JOB_NAME, status="done", last_user_id=0)
+        db.add(checkpoint)
+
+    if restart or checkpoint.status != "running":
+        checkpoint.status = "running"
+        checkpoint.last_user_id = 0
+        checkpoint.started_at = now
+    else:
+        logging.info(f"Resuming {JOB_NAME} run after user {checkpoint.last_user_id}")
+
+    checkpoint.updated_at = now
+    db.commit()
+    return checkpoint
+
+
+def _merge(totals: dict, report: dict):
+    for stage, values in report.items():
+        for field, value in values.items():
+            totals[stage][field] += value
+
+
+def run(db: Session, workers: int = 4, chunk_size: int = DEFAULT_CHUNK_SIZE, stages=STAGES,
+        restart: bool = False) -> dict:
+    """Run (or resume) the job; -> per-stage throughput report."""
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}")
+    stages = [stage for stage in STAGES if stage in stages]
+
+    checkpoint = _checkpoint(db, restart)
+    totals = {stage: {"users": 0, "errors": 0, "seconds": 0.0} for stage in stages}
+    started = time.perf_counter()
+
+    # chunks can finish out of order; the checkpoint only moves past a
+    # chunk once every chunk before it is done
+    chunk_last, finished, next_seq = {}, set(), 0
+
+    def complete(seq, report):
+        nonlocal next_seq
+        _merge(totals, report)
+        finished.add(seq)
+        while next_seq in finished:
+            checkpoint.last_user_id = chunk_last.pop(next_seq)
+            finished.discard(next_seq)
+            next_seq += 1
+        checkpoint.updated_at = datetime.utcnow()
+        db.commit()
+
+    chunks = enumerate(_user_chunks(db, checkpoint.last_user_id, chunk_size))
+
+    if workers <= 0:
+        for seq, user_ids in chunks:
+            chunk_last[seq] = user_ids[-1]
+            complete(seq, process_chunk(user_ids, stages))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            pending = {}
+            for seq, user_ids in chunks:
+                chunk_last[seq] = user_ids[-1]
+                pending[pool.submit(process_chunk, user_ids, stages)] = seq
+
+                # bounded in-flight work: the user stream is never materialised
+                while len(pending) >= workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        complete(pending.pop(future), future.result())
+
+            for future in list(pending):
+                complete(pending.pop(future), future.result())
+
+    if "rollups" in stages:
+        from backend.api.services import sketches
+
+        population_started = time.perf_counter()
+        sketches.rebuild_population(db)
+        totals["population"] = {
+            "users": None, "errors": 0, "seconds": time.perf_counter() - population_started,
+        }
+
+        from backend.api.services import personas
+
+        persona_report = personas.build(db)
+        totals["personas"] = {"users": persona_report["users"], "errors": 0, "seconds": persona_report["seconds"]}
+
+    checkpoint.status = "done"
+    checkpoint.updated_at = datetime.utcnow()
+    db.commit()
+
+    wall = time.perf_counter() - started
+    report = {"wall_seconds": round(wall, 2), "workers": workers, "stages": {}}
+    for stage, values in totals.items():
+        users, seconds = values["users"], values["seconds"]
+        report["stages"][stage] = {
+            "users": users,
+            "errors": values["errors"],
+            "seconds": round(seconds, 2),
+            # per worker-second; the pool multiplies it by up to `workers`
+            "users_per_second": round(users / seconds, 1) if users and seconds else None,
+        }
+        logging.info(f"Precompute stage {stage}: {report['stages'][stage]}")
+    return report
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def main(argv=None):
+    from backend.api.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Nightly analytics precompute")
+    parser.add_argument("command", choices=["run", "status"])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--restart", action="store_true", help="ignore an unfinished run's checkpoint")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    db = SessionLocal()
+    try:
+        if args.command == "status":
+            checkpoint = db.get(JobCheckpoint, JOB_NAME)
+            if checkpoint is None:
+                print(f"{JOB_NAME}: never run")
+            else:
+                print(f"{JOB_NAME}: {checkpoint.status}, last user {checkpoint.last_user_id}, "
+                      f"started {checkpoint.started_at}, updated {checkpoint.updated_at}")
+            return 0
+
+        stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+        report = run(db, workers=args.workers, chunk_size=args.chunk_size, stages=stages, restart=args.restart)
+        print(json.dumps(report, indent=2))
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
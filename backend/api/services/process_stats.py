@@ -0,0 +1,53 @@
+import os
+import sys
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def peak_rss_mb():
+    """High-water mark of this process' resident memory in MB (None on Windows)."""
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def current_rss_mb():
+    """Resident memory right now in MB (None where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * _PAGE_SIZE / (1024 * 1024), 1)
+
+
+class RssHighWater:
+    """
+    Peak resident memory of one unit of work, above a baseline taken when
+    it starts. ru_maxrss is the process-lifetime peak, so a long-lived
+    worker would report whichever earlier request peaked highest; this
+    samples current_rss_mb() wherever sample() is called instead.
+    """
+
+    def __init__(self):
+        self.baseline = current_rss_mb()
+        self.peak = self.baseline
+
+    def sample(self):
+        rss = current_rss_mb()
+        if rss is not None and self.peak is not None and rss > self.peak:
+            self.peak = rss
+
+    def growth_mb(self):
+        if self.baseline is None:
+            return None
+        self.sample()
+        return round(self.peak - self.baseline, 1)
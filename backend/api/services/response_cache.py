@@ -0,0 +1,307 @@
+import functools
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi.encoders import jsonable_encoder
+
+from backend.api.services import data_version, precompute
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+# "memory" keeps entries per worker; "sqlite" shares them between the
+# gunicorn workers on one host; "off" disables caching.
+AI_CACHE_BACKEND = os.getenv("AI_CACHE_BACKEND", "memory").lower()
+AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", "2048"))
+AI_CACHE_MAX_BYTES = int(os.getenv("AI_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+AI_CACHE_PATH = os.getenv(
+    "AI_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "..", "instance", "ai_cache.db"),
+)
+
+
+# ---------------------------
+# BACKENDS
+# ---------------------------
+# Both store serialized JSON bytes keyed by a string, tagged with the user id
+# so a write can drop everything that user has cached.
+
+
+class MemoryBackend:
+    """In-process LRU bounded by entry count and total payload bytes."""
+
+    name = "memory"
+
+    def __init__(self, maxsize: int = AI_CACHE_SIZE, max_bytes: int = AI_CACHE_MAX_BYTES):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # key -> (user_id, payload)
+        self._by_user = {}              # user_id -> set of keys
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, user_id: int, key: str, payload: bytes):
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (user_id, payload)
+            self._by_user.setdefault(user_id, set()).add(key)
+            self._bytes += len(payload)
+
+            while self._entries and (len(self._entries) > self.maxsize or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxsize": self.maxsize,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id, payload = entry
+        self._bytes -= len(payload)
+        keys = self._by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user_id]
+
+
+class SQLiteBackend:
+    """
+    Host-local cache file shared by every worker process. WAL mode lets
+    readers proceed while one worker writes; least recently used rows are
+    trimmed once the table grows past maxsize.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = AI_CACHE_PATH, maxsize: int = AI_CACHE_SIZE):
+        self.path = os.path.abspath(path)
+        self.maxsize = maxsize
+        self._local = threading.local()
+        self.evictions = 0
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                " key TEXT PRIMARY KEY,"
+                " user_id INTEGER NOT NULL,"
+                " payload BLOB NOT NULL,"
+                " accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_response_cache_user ON response_cache (user_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_response_cache_accessed ON response_cache (accessed)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        conn = self._conn()
+        row = conn.execute("SELECT payload FROM response_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE response_cache SET accessed = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, user_id: int, key: str, payload: bytes):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO response_cache (key, user_id, payload, accessed) VALUES (?, ?, ?, ?)",
+            (key, user_id, payload, time.time()),
+        )
+
+        overflow = conn.execute("SELECT count(*) FROM response_cache").fetchone()[0] - self.maxsize
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM response_cache WHERE key IN "
+                "(SELECT key FROM response_cache ORDER BY accessed LIMIT ?)",
+                (overflow,),
+            )
+            self.evictions += overflow
+
+    def invalidate_user(self, user_id: int):
+        self._conn().execute("DELETE FROM response_cache WHERE user_id = ?", (user_id,))
+
+    def clear(self):
+        self._conn().execute("DELETE FROM response_cache")
+
+    def stats(self) -> dict:
+        entries, size = self._conn().execute(
+            "SELECT count(*), coalesce(sum(length(payload)), 0) FROM response_cache"
+        ).fetchone()
+        return {
+            "entries": entries,
+            "bytes": size,
+            "maxsize": self.maxsize,
+            "path": self.path,
+            "evictions": self.evictions,
+        }
+
+
+# ---------------------------
+# CACHE FRONT
+# ---------------------------
+class ResponseCache:
+    """
+    Keys are (user, endpoint, params, data version). Because the data version
+    is part of the key a stale entry can never be served; invalidate_user only
+    frees the space early.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.precomputed_hits = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def encode_params(params: dict) -> str:
+        return json.dumps(jsonable_encoder(params), sort_keys=True, separators=(",", ":"))
+
+    @classmethod
+    def key(cls, user_id: int, endpoint: str, params: dict, version: int) -> str:
+        return f"{user_id}:{endpoint}:{version}:{cls.encode_params(params)}"
+
+    def get(self, key: str):
+        payload = self.backend.get(key) if self.backend else None
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(payload)
+
+    def put(self, user_id: int, key: str, value):
+        if self.backend:
+            payload = json.dumps(jsonable_encoder(value), separators=(",", ":")).encode("utf-8")
+            self.backend.put(user_id, key, payload)
+
+    def count_precomputed(self):
+        with self._lock:
+            self.precomputed_hits += 1
+
+    def invalidate_user(self, user_id: int):
+        if self.backend:
+            self.backend.invalidate_user(user_id)
+            with self._lock:
+                self.invalidations += 1
+
+    def clear(self):
+        if self.backend:
+            self.backend.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "backend": self.backend.name if self.backend else "off",
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "precomputed_hits": self.precomputed_hits,
+            }
+        if self.backend:
+            stats.update(self.backend.stats())
+        return stats
+
+
+def _make_backend(name: str):
+    if name == "sqlite":
+        return SQLiteBackend()
+    if name == "memory":
+        return MemoryBackend()
+    return None
+
+
+response_cache = ResponseCache(_make_backend(AI_CACHE_BACKEND))
+
+
+def cached(endpoint: str, stamp=None):
+    """
+    Route decorator. The wrapped handler must take `current_user` and `db`;
+    every other argument becomes part of the key. Raised HTTPExceptions are
+    not cached. On a miss, a result precomputed for the current data version
+    is served before falling back to the handler.
+
+    `stamp(db, user_id)` is for responses that also embed something built
+    offline (the advisor's persona): it joins the data version in the key,
+    and such routes are never served from the precomputed results.
+    """
+    def decorate(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+
+            user = arguments.pop("current_user")
+            db = arguments.pop("db")
+
+            version = data_version.current(db, user.id)
+            keyed = version if stamp is None else f"{version}-{stamp(db, user.id)}"
+            key = response_cache.key(user.id, endpoint, arguments, keyed)
+
+            hit = response_cache.get(key)
+            if hit is not None:
+                return hit
+
+            # written by the nightly job for the routes' default arguments
+            result = None
+            if stamp is None:
+                result = precompute.lookup(db, user.id, endpoint, response_cache.encode_params(arguments), version)
+            if result is None:
+                result = fn(*args, **kwargs)
+            else:
+                response_cache.count_precomputed()
+            response_cache.put(user.id, key, result)
+            return result
+
+        # the nightly job stores results under this name (see services/precompute.py)
+        wrapper.cache_endpoint = endpoint
+        return wrapper
+    return decorate
@@ -0,0 +1,192 @@
+import argparse
+import logging
+import sys
+from collections import defaultdict
+
+from sqlalchemy import delete, func, literal, select
+from sqlalchemy.orm import Session
+
+from backend.api.models.vitya import Expense, Income, MonthlyRollup
+from backend.api.time_buckets import (
+    dialect_name, month_label, month_label_bucket, time_bucket
+)
+
+EXPENSE = "expense"
+INCOME = "income"
+
+# rollup keys can't be NULL; legacy rows without a category land here
+UNCATEGORIZED = "Uncategorized"
+
+
+# ---------------------------
+# WRITE PATH
+# ---------------------------
+def _upsert(db: Session):
+    if dialect_name(db) == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    stmt = insert(MonthlyRollup)
+    return stmt.on_conflict_do_update(
+        index_elements=[
+            MonthlyRollup.user_id,
+            MonthlyRollup.kind,
+            MonthlyRollup.month,
+            MonthlyRollup.category,
+        ],
+        set_={
+            "total": MonthlyRollup.total + stmt.excluded.total,
+            "count": MonthlyRollup.count + stmt.excluded.count,
+        },
+    )
+
+
+def apply(db: Session, user_id: int, kind: str, entries, sign: int = 1):
+    """
+    Fold (date, category, amount) entries into the rollup inside the caller's
+    transaction. sign=-1 removes them again (used when a row is deleted).
+    """
+    buckets = defaultdict(lambda: [0.0, 0])
+
+    for date_value, category, amount in entries:
+        bucket = buckets[(month_label(date_value), category or UNCATEGORIZED)]
+        bucket[0] += sign * float(amount or 0)
+        bucket[1] += sign
+
+    if not buckets:
+        return
+
+    db.execute(_upsert(db), [
+        {
+            "user_id": user_id,
+            "kind": kind,
+            "month": month,
+            "category": category,
+            "total": total,
+            "count": count,
+        }
+        for (month, category), (total, count) in buckets.items()
+    ])
+
+    if sign < 0:
+        db.execute(delete(MonthlyRollup).where(
+            MonthlyRollup.user_id == user_id,
+            MonthlyRollup.kind == kind,
+            MonthlyRollup.count <= 0,
+        ))
+
+
+# ---------------------------
+# READ PATH
+# ---------------------------
+def category_totals(db: Session, user_id: int, kind: str = EXPENSE):
+    return db.query(
+        MonthlyRollup.category,
+        func.sum(MonthlyRollup.total).label("total")
+    ).filter(
+        MonthlyRollup.user_id == user_id,
+        MonthlyRollup.kind == kind
+    ).group_by(MonthlyRollup.category).all()
+
+
+def kind_total(db: Session, user_id: int, kind: str) -> float:
+    total = db.query(func.sum(MonthlyRollup.total)).filter(
+        MonthlyRollup.user_id == user_id,
+        MonthlyRollup.kind == kind
+    ).scalar()
+    return float(total or 0)
+
+
+def bucket_totals(db: Session, user_id: int, kind: str, granularity: str = "month"):
+    bucket = month_label_bucket(MonthlyRollup.month, granularity).label("month")
+
+    return db.query(
+        bucket,
+        func.sum(MonthlyRollup.total).label("total")
+    ).filter(
+        MonthlyRollup.user_id == user_id,
+        MonthlyRollup.kind == kind
+    ).group_by(bucket).order_by(bucket).all()
+
+
+# ---------------------------
+# REBUILD / BACKFILL
+# ---------------------------
+def _source_select(model, category_column, kind: str, dialect: str, user_id: int = None):
+    month = time_bucket(model.date, "month", dialect)
+    category = func.coalesce(category_column, UNCATEGORIZED)
+
+    query = select(
+        model.user_id,
+        literal(kind),
+        month,
+        category,
+        func.sum(model.amount),
+        func.count(model.id),
+    ).where(
+        model.user_id.isnot(None),
+        model.date.isnot(None),
+    ).group_by(model.user_id, month, category)
+
+    if user_id is not None:
+        query = query.where(model.user_id == user_id)
+
+    return query
+
+
+def rebuild(db: Session, user_id: int = None):
+    """Recompute rollups from the raw tables (all users, or one user)."""
+    dialect = dialect_name(db)
+
+    wipe = delete(MonthlyRollup)
+    if user_id is not None:
+        wipe = wipe.where(MonthlyRollup.user_id == user_id)
+    db.execute(wipe)
+
+    columns = [
+        MonthlyRollup.user_id,
+        MonthlyRollup.kind,
+        MonthlyRollup.month,
+        MonthlyRollup.category,
+        MonthlyRollup.total,
+        MonthlyRollup.count,
+    ]
+    for model, category_column, kind in (
+        (Expense, Expense.category, EXPENSE),
+        (Income, Income.source, INCOME),
+    ):
+        db.execute(
+            MonthlyRollup.__table__.insert().from_select(
+                columns, _source_select(model, category_column, kind, dialect, user_id)
+            )
+        )
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def main(argv=None):
+    from backend.api.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Rebuild per-user monthly rollups")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    db = SessionLocal()
+    try:
+        rebuild(db, args.user_id)
+        db.commit()
+    finally:
+        db.close()
+
+    scope = f"user {args.user_id}" if args.user_id is not None else "all users"
+    logging.info(f"Monthly rollups rebuilt for {scope}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,421 @@
+"""
+Mergeable quantile sketches (t-digest) for percentile thresholds.
+
+    quantile_sketch    one digest of expense amounts per (user, category, month),
+                       folded in by the ledger on every insert
+    population_sketch  one digest of per-user monthly totals per (category, month),
+                       rebuilt offline from monthly_rollup
+
+    python -m backend.api.services.sketches rebuild [--user-id N]
+    python -m backend.api.services.sketches rebuild-population
+
+A digest is at most ~COMPRESSION centroids whatever the number of values it
+summarises, so merging months or users and reading a quantile costs the same
+for a user with 100 rows and one with 100k. Digests can't forget a value: a
+delete rebuilds the affected (category, month) digests from their rows.
+"""
+import argparse
+import logging
+import math
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from backend.api.models.vitya import Expense, MonthlyRollup, PopulationSketch, QuantileSketch
+from backend.api.services import rollups
+from backend.api.time_buckets import dialect_name, month_label
+
+# t-digest compression (delta): about delta / 2 centroids per digest, ~1.6 KB stored
+COMPRESSION = 200
+
+
+# ---------------------------
+# T-DIGEST
+# ---------------------------
+def _scale(q: float, compression: int) -> float:
+    """k1 scale function: small centroids at the tails, large ones at the median."""
+    return compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+
+def _scale_inverse(k: float, compression: int) -> float:
+    k = min(max(k, -compression / 4), compression / 4)
+    return (math.sin(k * 2 * math.pi / compression) + 1) / 2
+
+
+class TDigest:
+    """
+    Merging t-digest with the k1 (arcsine) scale function, centroids kept as
+    two NumPy arrays. Digests are immutable: add / merge return a new one.
+    """
+
+    __slots__ = ("means", "weights", "min", "max")
+
+    def __init__(self, means=None, weights=None, lo=np.inf, hi=-np.inf):
+        self.means = np.asarray(means if means is not None else [], dtype=np.float64)
+        self.weights = np.asarray(weights if weights is not None else [], dtype=np.float64)
+        self.min = float(lo)
+        self.max = float(hi)
+
+    @classmethod
+    def from_values(cls, values, compression: int = COMPRESSION):
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return cls()
+        digest = cls(values, np.ones(len(values)), values.min(), values.max())
+        return digest.compress(compression)
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def merge(self, other, compression: int = COMPRESSION):
+        merged = TDigest(
+            np.concatenate([self.means, other.means]),
+            np.concatenate([self.weights, other.weights]),
+            min(self.min, other.min),
+            max(self.max, other.max),
+        )
+        return merged.compress(compression)
+
+    def add(self, values, compression: int = COMPRESSION):
+        return self.merge(TDigest.from_values(values, compression), compression)
+
+    def compress(self, compression: int = COMPRESSION):
+        if len(self.means) <= 1:
+            return self
+
+        order = np.argsort(self.means, kind="stable")
+        means, weights = self.means[order], self.weights[order]
+
+        # bulk loads: one vectorised pass groups raw values by scale unit first,
+        # so the exact pass below only walks a few hundred centroids
+        if len(means) > 4 * compression:
+            centre = (np.cumsum(weights) - weights / 2) / weights.sum()
+            scale = compression / (2 * np.pi) * np.arcsin(2 * centre - 1)
+            cluster = np.floor(scale).astype(np.int64)
+            cluster = np.unique(cluster, return_inverse=True)[1]
+            merged_weights = np.bincount(cluster, weights=weights)
+            means = np.bincount(cluster, weights=means * weights) / merged_weights
+            weights = merged_weights
+
+        # exact merge: a centroid may span at most one unit of the scale function
+        means, weights = means.tolist(), weights.tolist()
+        total = sum(weights)
+        out_means, out_weights = [means[0]], [weights[0]]
+        seen = weights[0]
+        limit = _scale_inverse(_scale(0.0, compression) + 1, compression) * total
+        for mean, weight in zip(means[1:], weights[1:]):
+            if seen + weight <= limit:
+                out_weights[-1] += weight
+                out_means[-1] += (mean - out_means[-1]) * weight / out_weights[-1]
+            else:
+                limit = _scale_inverse(_scale(seen / total, compression) + 1, compression) * total
+                out_means.append(mean)
+                out_weights.append(weight)
+            seen += weight
+
+        return TDigest(out_means, out_weights, self.min, self.max)
+
+    def _ranks(self):
+        # centroid i covers ranks around cumsum - w/2; singletons land on i + 0.5
+        total = self.weights.sum()
+        centres = np.cumsum(self.weights) - self.weights / 2
+        return total, np.concatenate([[0.0], centres, [total]])
+
+    def quantile(self, q: float) -> float:
+        """Same convention as np.quantile's default while centroids are singletons."""
+        if not len(self.means):
+            return None
+
+        total, ranks = self._ranks()
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        return float(np.interp(0.5 + np.clip(q, 0, 1) * (total - 1), ranks, values))
+
+    def cdf(self, x: float) -> float:
+        """Fraction of the summarised values at or below x (inverse of quantile)."""
+        if not len(self.means):
+            return None
+        if x < self.min:
+            return 0.0
+        if x >= self.max:
+            return 1.0
+
+        total, ranks = self._ranks()
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        rank = np.interp(x, values, ranks)
+        return float(np.clip((rank - 0.5) / (total - 1), 0, 1))
+
+    def to_bytes(self) -> bytes:
+        return np.concatenate([[self.min, self.max], self.means, self.weights]).astype("<f8").tobytes()
+
+    @classmethod
+    def from_bytes(cls, raw: bytes):
+        values = np.frombuffer(raw, dtype="<f8")
+        n = (len(values) - 2) // 2
+        return cls(values[2:2 + n], values[2 + n:], values[0], values[1])
+
+
+def merge_all(digests):
+    result = TDigest()
+    for digest in digests:
+        result = result.merge(digest)
+    return result
+
+
+# ---------------------------
+# WRITE PATH
+# ---------------------------
+def _group(entries):
+    groups = defaultdict(list)
+    for date_value, category, amount in entries:
+        groups[(category or rollups.UNCATEGORIZED, month_label(date_value))].append(float(amount or 0))
+    return groups
+
+
+def _insert(db: Session):
+    if dialect_name(db) == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    return insert(QuantileSketch.__table__)
+
+
+_KEY = [QuantileSketch.__table__.c.user_id, QuantileSketch.__table__.c.category, QuantileSketch.__table__.c.month]
+
+
+def apply(db: Session, user_id: int, entries):
+    """Fold (date, category, amount) expense entries into the user's monthly digests."""
+    groups = _group(entries)
+    if not groups:
+        return
+
+    # FOR UPDATE can't lock a row that doesn't exist yet, so create missing
+    # rows empty first; concurrent first writers then queue on the same row.
+    # Keys are locked in sorted order so two writers can't deadlock.
+    keys = sorted(groups)
+    empty = TDigest().to_bytes()
+    db.execute(
+        _insert(db).on_conflict_do_nothing(index_elements=_KEY),
+        [{"user_id": user_id, "category": c, "month": m, "count": 0, "digest": empty} for c, m in keys],
+    )
+
+    for category, month in keys:
+        amounts = groups[(category, month)]
+        row = db.get(QuantileSketch, (user_id, category, month), with_for_update=True)
+        row.digest = TDigest.from_bytes(row.digest).add(amounts).to_bytes()
+        row.count += len(amounts)
+
+    db.flush()
+
+
+def refresh(db: Session, user_id: int, entries):
+    """Rebuild the digests touched by deleted entries from the remaining rows."""
+    for category, month in _group(entries):
+        rebuild(db, user_id, category=category, month=month)
+
+
+# ---------------------------
+# READ PATH
+# ---------------------------
+def user_digest(db: Session, user_id: int, category: str, months=None) -> TDigest:
+    query = select(QuantileSketch.digest).where(
+        QuantileSketch.user_id == user_id,
+        QuantileSketch.category == category,
+    )
+    if months is not None:
+        query = query.where(QuantileSketch.month.in_(list(months)))
+
+    return merge_all(TDigest.from_bytes(raw) for raw in db.execute(query).scalars())
+
+
+def population(db: Session, category: str, month: str):
+    row = db.get(PopulationSketch, (category, month))
+    if row is None:
+        return None, 0
+    return TDigest.from_bytes(row.digest), row.users
+
+
+def latest_population_month(db: Session, category: str):
+    return db.execute(
+        select(PopulationSketch.month)
+        .where(PopulationSketch.category == category)
+        .order_by(PopulationSketch.month.desc())
+        .limit(1)
+    ).scalar()
+
+
+def _check_q(q: float):
+    if not 0 <= q <= 1:
+        raise ValueError("q must be between 0 and 1")
+
+
+def percentile(db: Session, user_id: int, category: str, q: float = 0.9, months=None) -> dict:
+    """q-quantile of the user's single expenses in a category (all months, or the given ones)."""
+    _check_q(q)
+    digest = user_digest(db, user_id, category, months)
+    if not len(digest.means):
+        return None
+
+    return {
+        "category": category,
+        "q": q,
+        "value": round(digest.quantile(q), 2),
+        "transactions": int(digest.count),
+        "months": sorted(months) if months is not None else None,
+    }
+
+
+def peer_compare(db: Session, user_id: int, category: str, q: float = 0.95, month: str = None) -> dict:
+    """The user's monthly total in a category against the q-quantile of all users' totals."""
+    _check_q(q)
+    month = month or latest_population_month(db, category)
+    if month is None:
+        return None
+
+    digest, users = population(db, category, month)
+    if digest is None:
+        return None
+
+    rollup = db.get(MonthlyRollup, (user_id, rollups.EXPENSE, month, category))
+    total = float(rollup.total) if rollup is not None else 0.0
+    threshold = digest.quantile(q)
+
+    return {
+        "category": category,
+        "month": month,
+        "q": q,
+        "your_total": round(total, 2),
+        "peer_threshold": round(threshold, 2),
+        "above": total > threshold,
+        "percentile_rank": round(digest.cdf(total) * 100, 1),
+        "peers": users,
+    }
+
+
+# ---------------------------
+# REBUILD / BACKFILL
+# ---------------------------
+def rebuild(db: Session, user_id: int = None, category: str = None, month: str = None,
+            batch_size: int = 10_000):
+    """Recompute per-user digests from the expense table."""
+    wipe = delete(QuantileSketch)
+    if user_id is not None:
+        wipe = wipe.where(QuantileSketch.user_id == user_id)
+    if category is not None:
+        wipe = wipe.where(QuantileSketch.category == category)
+    if month is not None:
+        wipe = wipe.where(QuantileSketch.month == month)
+    db.execute(wipe)
+
+    query = select(Expense.user_id, Expense.category, Expense.date, Expense.amount).where(
+        Expense.user_id.isnot(None),
+        Expense.date.isnot(None),
+    )
+    if user_id is not None:
+        query = query.where(Expense.user_id == user_id)
+    if category is not None:
+        query = query.where(
+            Expense.category.is_(None) if category == rollups.UNCATEGORIZED else Expense.category == category
+        )
+    if month is not None:
+        year, mon = (int(part) for part in month.split("-"))
+        query = query.where(
+            Expense.date >= datetime(year, mon, 1),
+            Expense.date < datetime(year + mon // 12, mon % 12 + 1, 1),
+        )
+    query = query.order_by(Expense.user_id, Expense.category, Expense.date)
+
+    groups = defaultdict(list)
+    current_user = None
+
+    def flush_user():
+        rows = [
+            {
+                "user_id": uid, "category": cat, "month": mon,
+                "count": len(amounts), "digest": TDigest.from_values(amounts).to_bytes(),
+            }
+            for (uid, cat, mon), amounts in groups.items()
+        ]
+        if rows:
+            # a live write may have recreated a wiped row meanwhile; the
+            # rebuilt digest (which saw the committed rows) replaces it
+            stmt = _insert(db)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=_KEY,
+                set_={"count": stmt.excluded.count, "digest": stmt.excluded.digest},
+            ), rows)
+        groups.clear()
+
+    for uid, cat, when, amount in db.execute(query.execution_options(yield_per=batch_size)):
+        if uid != current_user:
+            flush_user()
+            current_user = uid
+        groups[(uid, cat or rollups.UNCATEGORIZED, month_label(when))].append(float(amount or 0))
+
+    flush_user()
+
+
+def rebuild_population(db: Session, batch_size: int = 10_000):
+    """Digest of per-user monthly totals for every (category, month) in the rollup."""
+    db.execute(delete(PopulationSketch))
+
+    query = select(MonthlyRollup.category, MonthlyRollup.month, MonthlyRollup.total).where(
+        MonthlyRollup.kind == rollups.EXPENSE,
+        MonthlyRollup.count > 0,
+    ).order_by(MonthlyRollup.category, MonthlyRollup.month)
+
+    key, totals, pending = None, [], []
+
+    def close_group():
+        pending.append({
+            "category": key[0], "month": key[1], "users": len(totals),
+            "digest": TDigest.from_values(totals).to_bytes(),
+        })
+
+    for category, month, total in db.execute(query.execution_options(yield_per=batch_size)):
+        if (category, month) != key:
+            if key is not None:
+                close_group()
+            key, totals = (category, month), []
+        totals.append(float(total or 0))
+
+    if key is not None:
+        close_group()
+    if pending:
+        db.execute(PopulationSketch.__table__.insert(), pending)
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def main(argv=None):
+    from backend.api.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Rebuild quantile sketches")
+    parser.add_argument("command", choices=["rebuild", "rebuild-population"])
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            rebuild(db, args.user_id)
+        else:
+            rebuild_population(db)
+        db.commit()
+    finally:
+        db.close()
+
+    logging.info(f"Quantile sketches: {args.command} done")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
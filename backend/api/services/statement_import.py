@@ -0,0 +1,225 @@
+import csv
+import io
+import os
+import re
+import time
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from backend.api.models.vitya import Expense, Income
+from backend.api.services import ledger
+from backend.api.services.process_stats import RssHighWater
+from backend.chats.handlers.transaction_handler import detect_categories, normalize
+
+# rows parsed, deduplicated and inserted per round trip
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+# cap on how many bad lines are echoed back
+MAX_REPORTED_ERRORS = 20
+
+# ---------------------------
+# HEADER DETECTION
+# ---------------------------
+COLUMN_ALIASES = {
+    "date": ("date", "txn date", "transaction date", "value date", "posting date", "tran date"),
+    "description": ("description", "narration", "particulars", "details", "remarks", "memo", "transaction details"),
+    "amount": ("amount", "amount (inr)", "transaction amount"),
+    "debit": ("debit", "withdrawal", "withdrawal amt", "withdrawal amount", "debit amount", "dr"),
+    "credit": ("credit", "deposit", "deposit amt", "deposit amount", "credit amount", "cr"),
+    "type": ("type", "cr/dr", "dr/cr", "transaction type"),
+}
+
+DATE_FORMATS = (
+    "%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y", "%d-%m-%y",
+    "%d-%b-%Y", "%d %b %Y", "%d-%b-%y", "%d %b %y", "%Y/%m/%d",
+)
+
+
+CURRENCY_RE = re.compile(r"(?i)\b(?:rs|inr)\b\.?|₹")
+
+
+class StatementFormatError(ValueError):
+    pass
+
+
+def _map_columns(header) -> dict:
+    normalized = [re.sub(r"\s+", " ", (h or "").strip().lower().replace(".", "")) for h in header]
+    columns = {}
+
+    for field, aliases in COLUMN_ALIASES.items():
+        for index, name in enumerate(normalized):
+            if name in aliases:
+                columns[field] = index
+                break
+
+    if "date" not in columns:
+        raise StatementFormatError("Statement has no date column")
+    if "amount" not in columns and not ({"debit", "credit"} & columns.keys()):
+        raise StatementFormatError("Statement needs an amount column or debit/credit columns")
+
+    return columns
+
+
+# ---------------------------
+# FIELD PARSING
+# ---------------------------
+def _parse_amount(value):
+    value = (value or "").strip()
+    if not value:
+        return None
+
+    negative = value.startswith("(") and value.endswith(")")
+    cleaned = re.sub(r"[^\d.\-]", "", CURRENCY_RE.sub("", value))
+    if cleaned in ("", "-", "."):
+        return None
+
+    amount = float(cleaned)
+    return -abs(amount) if negative else amount
+
+
+class _DateParser:
+    # remembers the last format that worked; statements use one format throughout
+    def __init__(self):
+        self.formats = list(DATE_FORMATS)
+
+    def __call__(self, value: str) -> datetime:
+        value = (value or "").strip()
+        for i, fmt in enumerate(self.formats):
+            try:
+                parsed = datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+            if i:
+                self.formats.insert(0, self.formats.pop(i))
+            return parsed
+        raise ValueError(f"Unrecognised date '{value}'")
+
+
+def _parse_line(line, columns, parse_date):
+    """-> (kind, date, amount, description) with amount > 0."""
+    def cell(field):
+        index = columns.get(field)
+        return line[index] if index is not None and index < len(line) else ""
+
+    when = parse_date(cell("date"))
+    description = cell("description").strip()
+
+    debit = _parse_amount(cell("debit"))
+    credit = _parse_amount(cell("credit"))
+
+    if debit:
+        return "expense", when, abs(debit), description
+    if credit:
+        return "income", when, abs(credit), description
+
+    amount = _parse_amount(cell("amount"))
+    if not amount:
+        raise ValueError("Missing amount")
+
+    marker = cell("type").strip().lower()
+    if marker in ("dr", "debit", "d", "withdrawal"):
+        return "expense", when, abs(amount), description
+    if marker in ("cr", "credit", "c", "deposit"):
+        return "income", when, abs(amount), description
+
+    # single signed column: outflows are negative
+    return ("expense" if amount < 0 else "income"), when, abs(amount), description
+
+
+# ---------------------------
+# PIPELINE
+# ---------------------------
+def _flush(db: Session, user_id: int, batch, report):
+    expenses, incomes = [], []
+    seen = set()
+
+    # one matcher pass for the batch; repeated descriptions are scored once
+    categories = detect_categories([normalize(description) for _, _, _, description in batch])
+
+    for (kind, when, amount, description), category in zip(batch, categories):
+        if kind == "expense":
+            digest = ledger.fingerprint(when, amount, description)
+            expenses.append((digest, {
+                "amount": amount, "category": category, "description": description, "date": when,
+            }))
+        else:
+            source = category if category != "other" else (description[:60] or "statement")
+            digest = ledger.fingerprint(when, amount, source)
+            incomes.append((digest, {"amount": amount, "source": source, "date": when}))
+
+    for model, pending, record in (
+        (Expense, expenses, ledger.record_expenses),
+        (Income, incomes, ledger.record_incomes),
+    ):
+        known = ledger.existing_fingerprints(db, user_id, model, {d for d, _ in pending})
+        fresh = []
+        for digest, item in pending:
+            if digest in known or digest in seen:
+                report["duplicates"] += 1
+                continue
+            seen.add(digest)
+            fresh.append(item)
+
+        record(db, user_id, fresh)
+        report["expenses_added" if model is Expense else "incomes_added"] += len(fresh)
+
+
+def import_statement(db: Session, user_id: int, binary_file, batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """
+    Stream a bank-statement CSV into the ledger.
+
+    The file is read line by line; only `batch_size` parsed rows are held at
+    once. Rows whose (date, amount, description) fingerprint already exists
+    for the user are skipped. Caller commits.
+    """
+    started = time.perf_counter()
+    memory = RssHighWater()
+    report = {
+        "rows": 0,
+        "expenses_added": 0,
+        "incomes_added": 0,
+        "duplicates": 0,
+        "skipped": 0,
+        "errors": [],
+    }
+
+    stream = io.TextIOWrapper(binary_file, encoding="utf-8-sig", errors="replace", newline="")
+    reader = csv.reader(stream)
+
+    try:
+        columns = _map_columns(next(reader))
+    except StopIteration:
+        raise StatementFormatError("Statement is empty")
+
+    parse_date = _DateParser()
+    batch = []
+
+    for line in reader:
+        if not any(cell.strip() for cell in line):
+            continue
+
+        report["rows"] += 1
+        try:
+            batch.append(_parse_line(line, columns, parse_date))
+        except ValueError as e:
+            report["skipped"] += 1
+            if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                report["errors"].append({"line": reader.line_num, "error": str(e)})
+            continue
+
+        if len(batch) >= batch_size:
+            _flush(db, user_id, batch, report)
+            memory.sample()
+            batch = []
+
+    if batch:
+        _flush(db, user_id, batch, report)
+
+    stream.detach()
+
+    elapsed = time.perf_counter() - started
+    report["elapsed_seconds"] = round(elapsed, 3)
+    report["rows_per_second"] = round(report["rows"] / elapsed, 1) if elapsed else None
+    # memory this import added at its peak, not the worker's lifetime ru_maxrss
+    report["rss_growth_mb"] = memory.growth_mb()
+    return report
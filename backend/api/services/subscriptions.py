@@ -0,0 +1,262 @@
+"""
+Recurring payments (rent, OTT, EMI, recharges) found from the expense history.
+
+Expenses are grouped by normalised description (lowercased, digits, month
+names and punctuation dropped; the category when nothing is left) and then
+by amount band: within a description, amounts sorted ascending start a new
+band wherever one is more than AMOUNT_TOLERANCE above the previous one.
+
+Each (description, band) group is sorted by date and its inter-arrival gaps
+reduced with NumPy in one pass over all groups: median gap, mean and
+variance of the gaps. A group is recurring when its median gap is within
+tolerance of a weekly, monthly or yearly period, the gaps are regular
+(coefficient of variation <= MAX_GAP_CV) and it has enough charges.
+
+Everything is relative to the user's latest expense ("as_of"), not today,
+so a result depends only on the data and is cached per data version.
+"""
+import calendar
+import os
+import re
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from backend.api.models.vitya import Expense
+from backend.api.services import rollups
+from backend.api.time_buckets import day_ordinal, dialect_name
+
+# history scanned, counted back from the latest expense; 0 = everything
+LOOKBACK_DAYS = int(os.getenv("SUBSCRIPTION_LOOKBACK_DAYS", "1096"))
+AMOUNT_TOLERANCE = 0.15
+MAX_GAP_CV = 0.35
+DAYS_PER_MONTH = 365.25 / 12
+
+# name, period in days, max relative error of the median gap, min charges
+PERIODS = (
+    ("weekly", 7.0, 0.15, 4),
+    ("monthly", DAYS_PER_MONTH, 0.12, 3),
+    ("yearly", 365.25, 0.05, 2),
+)
+_PERIOD_DAYS = np.array([p[1] for p in PERIODS])
+_PERIOD_TOLERANCE = np.array([p[2] for p in PERIODS])
+_MIN_CHARGES = np.array([p[3] for p in PERIODS])
+
+_NOT_WORDS = re.compile(r"[^a-z]+")
+_DIGITS = str.maketrans("", "", "0123456789")
+_MONTH_WORDS = frozenset(
+    [m.lower() for m in calendar.month_name[1:]] + [m.lower() for m in calendar.month_abbr[1:]] + ["sept"]
+)
+
+
+# ---------------------------
+# KEYS
+# ---------------------------
+def normalize(description: str, category: str = None) -> str:
+    """'Netflix  Jan-2025 #8812' -> 'netflix'; blank descriptions fall back to the category."""
+    words = [
+        w for w in _NOT_WORDS.sub(" ", (description or "").lower()).split()
+        if len(w) > 1 and w not in _MONTH_WORDS
+    ]
+    return " ".join(words) or f"[{category or rollups.UNCATEGORIZED}]"
+
+
+def _codes(descriptions, categories) -> np.ndarray:
+    # normalise each distinct (description, category) once; dropping digits
+    # first folds "Order #8812" / "Order #8813" into one entry
+    key_code, raw_code = {}, {}
+    codes = np.empty(len(descriptions), dtype=np.int64)
+    for i, (description, category) in enumerate(zip(descriptions, categories)):
+        raw = (description.translate(_DIGITS) if description else None, category)
+        code = raw_code.get(raw)
+        if code is None:
+            code = raw_code[raw] = key_code.setdefault(normalize(*raw), len(key_code))
+        codes[i] = code
+    return codes
+
+
+# ---------------------------
+# PERIODICITY
+# ---------------------------
+def _group_median(values: np.ndarray, starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Median of each run values[starts[g]:starts[g] + counts[g]] (runs sorted ascending)."""
+    median = np.full(len(counts), np.nan)
+    has = counts > 0
+    lo = starts[has] + (counts[has] - 1) // 2
+    hi = starts[has] + counts[has] // 2
+    median[has] = (values[lo] + values[hi]) / 2
+    return median
+
+
+def find_recurring(days: np.ndarray, amounts: np.ndarray, codes: np.ndarray) -> dict:
+    """
+    Recurring groups among the rows (day ordinal, amount, description code).
+
+    -> dict of per-group arrays: last (row index of the latest charge),
+       first_day, charges, period (index into PERIODS), median_gap, gap_cv,
+       amount (median)
+    """
+    empty = {name: np.zeros(0, dtype=np.int64) for name in ("last", "first_day", "charges", "period")}
+    empty.update({name: np.zeros(0) for name in ("median_gap", "gap_cv", "amount")})
+    if len(days) == 0:
+        return empty
+
+    # amount bands: sorted by (code, amount), a new group on a new code or a jump in amount
+    by_amount = np.lexsort((amounts, codes))
+    sorted_codes, sorted_amounts = codes[by_amount], amounts[by_amount]
+    breaks = np.ones(len(days), dtype=bool)
+    breaks[1:] = (sorted_codes[1:] != sorted_codes[:-1]) | (
+        sorted_amounts[1:] > sorted_amounts[:-1] * (1 + AMOUNT_TOLERANCE)
+    )
+    group_of_sorted = np.cumsum(breaks) - 1
+    groups = int(group_of_sorted[-1]) + 1
+
+    group = np.empty(len(days), dtype=np.int64)
+    group[by_amount] = group_of_sorted
+    band_starts = np.flatnonzero(breaks)
+    amount = _group_median(sorted_amounts, band_starts, np.diff(np.append(band_starts, len(days))))
+
+    # date order within each group; two charges on one day count once
+    by_date = np.lexsort((days, group))
+    g, d = group[by_date], days[by_date]
+    keep = np.ones(len(g), dtype=bool)
+    keep[1:] = (g[1:] != g[:-1]) | (d[1:] != d[:-1])
+    by_date, g, d = by_date[keep], g[keep], d[keep]
+
+    charges = np.bincount(g, minlength=groups)
+    ends = np.cumsum(charges) - 1
+    last = by_date[ends]
+    first_day = d[ends - charges + 1]
+
+    # inter-arrival gaps, then per-group median / mean / variance
+    same = g[1:] == g[:-1]
+    gap = (d[1:] - d[:-1])[same].astype(np.float64)
+    gap_group = g[1:][same]
+
+    gap_counts = np.bincount(gap_group, minlength=groups)
+    by_gap = np.lexsort((gap, gap_group))
+    gap_starts = np.cumsum(gap_counts) - gap_counts
+    median_gap = _group_median(gap[by_gap], gap_starts, gap_counts)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(gap_group, weights=gap, minlength=groups) / gap_counts
+        mean_sq = np.bincount(gap_group, weights=gap * gap, minlength=groups) / gap_counts
+        gap_cv = np.sqrt(np.maximum(mean_sq - mean * mean, 0)) / mean
+        error = np.abs(median_gap[:, None] / _PERIOD_DAYS - 1)
+
+    period = np.argmin(np.nan_to_num(error, nan=np.inf), axis=1)
+    fit = error[np.arange(groups), period]
+
+    recurring = (
+        (gap_counts > 0)
+        & (fit <= _PERIOD_TOLERANCE[period])
+        & (np.nan_to_num(gap_cv, nan=np.inf) <= MAX_GAP_CV)
+        & (charges >= _MIN_CHARGES[period])
+    )
+
+    return {
+        "last": last[recurring],
+        "first_day": first_day[recurring],
+        "charges": charges[recurring],
+        "period": period[recurring],
+        "median_gap": median_gap[recurring],
+        "gap_cv": gap_cv[recurring],
+        "amount": amount[recurring],
+    }
+
+
+# ---------------------------
+# DATES
+# ---------------------------
+def _add_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(index, 12)
+    month += 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def next_charge(last: date, period: str) -> date:
+    if period == "weekly":
+        return last + timedelta(days=7)
+    return _add_months(last, 1 if period == "monthly" else 12)
+
+
+# ---------------------------
+# QUERY
+# ---------------------------
+def history_query(dialect: str, user_id: int, start=None):
+    # served by ix_expense_user_date; days come back as integers, parsing
+    # datetimes row by row is most of the cost on SQLite
+    query = select(
+        day_ordinal(Expense.date, dialect), Expense.amount, Expense.description, Expense.category
+    ).where(
+        Expense.user_id == user_id,
+        Expense.date.isnot(None),
+        Expense.amount > 0,
+    )
+    if start is not None:
+        query = query.where(Expense.date >= start)
+    return query.order_by(Expense.date, Expense.id)
+
+
+def detect(db: Session, user_id: int, lookback_days: int = LOOKBACK_DAYS) -> dict:
+    if lookback_days < 0:
+        raise ValueError("lookback_days must be >= 0")
+
+    latest = db.execute(
+        select(func.max(Expense.date)).where(Expense.user_id == user_id, Expense.amount > 0)
+    ).scalar()
+    if latest is None:
+        return {"as_of": None, "count": 0, "monthly_total": 0.0, "subscriptions": []}
+
+    as_of = latest.date()
+    start = latest - timedelta(days=lookback_days) if lookback_days else None
+
+    rows = db.execute(history_query(dialect_name(db), user_id, start)).all()
+    days, amounts, descriptions, categories = zip(*rows)
+
+    days = np.array(days, dtype=np.int64)
+    found = find_recurring(days, np.array(amounts, dtype=np.float64), _codes(descriptions, categories))
+
+    subscriptions = []
+    monthly_total = 0.0
+
+    for i in range(len(found["last"])):
+        row = int(found["last"][i])
+        name, period_days, tolerance, _ = PERIODS[found["period"][i]]
+        last = date.fromordinal(int(days[row]))
+        expected = next_charge(last, name)
+        # a charge counts as missed once it is late by more than the period's tolerance
+        active = as_of <= expected + timedelta(days=max(3, round(period_days * tolerance)))
+        amount = float(found["amount"][i])
+        monthly_cost = amount * DAYS_PER_MONTH / period_days
+
+        if active:
+            monthly_total += monthly_cost
+
+        subscriptions.append({
+            "description": descriptions[row] or normalize(None, categories[row]),
+            "category": categories[row],
+            "period": name,
+            "amount": round(amount, 2),
+            "last_amount": round(float(amounts[row]), 2),
+            "monthly_cost": round(monthly_cost, 2),
+            "charges": int(found["charges"][i]),
+            "median_gap_days": round(float(found["median_gap"][i]), 1),
+            "regularity": round(max(0.0, 1 - float(found["gap_cv"][i])), 3),
+            "first_charge": date.fromordinal(int(found["first_day"][i])).isoformat(),
+            "last_charge": last.isoformat(),
+            "next_charge": expected.isoformat(),
+            "active": active,
+        })
+
+    subscriptions.sort(key=lambda s: (not s["active"], -s["monthly_cost"]))
+
+    return {
+        "as_of": as_of.isoformat(),
+        "count": len(subscriptions),
+        "monthly_total": round(monthly_total, 2),
+        "subscriptions": subscriptions,
+    }
@@ -0,0 +1,176 @@
+"""
+Streaming trainer for the ai_service trend models.
+
+    python -m backend.api.services.training [--user-id N] [--batch-size N]
+
+Expenses are read once with yield_per in (user, category, date) order, the
+order of the ix_expense_user_category_date index. Each row is added to the
+running month bucket of its (user, category); a finished month is folded
+into that category's normal-equation accumulators (n, sum x, sum x^2,
+sum y, sum xy) and dropped. Once a category ends, its line is solved in
+closed form. Once a user ends, their models are saved to the model registry.
+
+Memory holds the current month's sum, the current category's accumulators
+and the current user's finished (slope, intercept) rows, whatever the size
+of the table. The models are the same least-squares lines
+ai_service.train_model fits: x numbers the category's months that have
+spending, in order, which is also the index ai_service.predict evaluates.
+"""
+import argparse
+import logging
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from backend.api.models.vitya import Expense
+from backend.api.services import ai_service, rollups
+from backend.api.services.model_registry import model_registry
+from backend.api.services.process_stats import peak_rss_mb
+
+DEFAULT_BATCH_SIZE = 10_000
+
+
+class NormalEquations:
+    """Running sums for a one-feature least-squares line."""
+
+    __slots__ = ("n", "sx", "sxx", "sy", "sxy")
+
+    def __init__(self):
+        self.n = self.sx = self.sxx = self.sy = self.sxy = 0.0
+
+    def add(self, x: float, y: float):
+        self.n += 1
+        self.sx += x
+        self.sxx += x * x
+        self.sy += y
+        self.sxy += x * y
+
+    def solve(self):
+        """-> (slope, intercept); flat line through the mean when x has no spread."""
+        denom = self.n * self.sxx - self.sx * self.sx
+        slope = (self.n * self.sxy - self.sx * self.sy) / denom if denom > 0 else 0.0
+        intercept = (self.sy - slope * self.sx) / self.n if self.n else 0.0
+        return slope, intercept
+
+
+class _CategoryFit:
+    """Month buckets of one (user, category), folded into the accumulators as they close."""
+
+    __slots__ = ("month", "total", "equations")
+
+    def __init__(self, month: int):
+        self.month = month
+        self.total = 0.0
+        self.equations = NormalEquations()
+
+    def add(self, month: int, amount: float):
+        if month != self.month:
+            self._close()
+            self.month, self.total = month, 0.0
+        self.total += amount
+
+    def _close(self):
+        # x is the ordinal of the month among the category's months with spending
+        self.equations.add(self.equations.n, self.total)
+
+    def finish(self):
+        self._close()
+        return self.equations
+
+
+def _query(user_id: int = None):
+    category = func.coalesce(Expense.category, rollups.UNCATEGORIZED)
+    query = select(Expense.user_id, category, Expense.date, Expense.amount).where(
+        Expense.user_id.isnot(None),
+        Expense.date.isnot(None),
+    )
+    if user_id is not None:
+        query = query.where(Expense.user_id == user_id)
+    return query.order_by(Expense.user_id, category, Expense.date)
+
+
+def train(db: Session, user_id: int = None, batch_size: int = DEFAULT_BATCH_SIZE, registry=None) -> dict:
+    """Train every user's models (or one user's) in one streaming pass. -> report"""
+    registry = registry or model_registry
+    started = time.perf_counter()
+
+    rows = users = models = 0
+    current_user, current_category, fit = None, None, None
+    categories, params = [], []
+
+    def close_category():
+        nonlocal fit
+        if fit is not None:
+            equations = fit.finish()
+            if equations.n >= ai_service.MIN_MONTHS:
+                categories.append(current_category)
+                params.append(equations.solve())
+            fit = None
+
+    def close_user():
+        nonlocal users, models
+        close_category()
+        if current_user is not None:
+            registry.save(current_user, categories, np.array(params, dtype=np.float64).reshape(-1, 2),
+                          source="training.train")
+            users += 1
+            models += len(categories)
+        categories.clear()
+        params.clear()
+
+    for uid, category, when, amount in db.execute(_query(user_id).execution_options(yield_per=batch_size)):
+        rows += 1
+        month = when.year * 12 + when.month - 1
+
+        if uid != current_user:
+            close_user()
+            current_user, current_category = uid, category
+        elif category != current_category:
+            close_category()
+            current_category = category
+
+        if fit is None:
+            fit = _CategoryFit(month)
+        fit.add(month, float(amount or 0))
+
+    close_user()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": rows,
+        "users": users,
+        "models": models,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed, 1) if elapsed > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def main(argv=None):
+    from backend.api.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Train ai_service trend models from the expense table")
+    parser.add_argument("--user-id", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    db = SessionLocal()
+    try:
+        report = train(db, args.user_id, args.batch_size)
+    finally:
+        db.close()
+
+    logging.info(f"Training done: {report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import literal, null, select, tuple_, union_all
+from sqlalchemy.orm import Session
+
+from backend.api.models.vitya import Expense, Income
+
+EXPENSE = "expense"
+INCOME = "income"
+TYPES = (EXPENSE, INCOME)
+
+# ---------------------------
+# KEYSET FEED
+# ---------------------------
+# Rows are ordered by (date DESC, type DESC, id DESC). Each branch of the
+# UNION ALL is limited on its own so both walk their (user_id, date) index
+# and only 2 * (limit + 1) rows ever reach the outer sort.
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(row) -> str:
+    raw = json.dumps([row.date.isoformat(), row.type, row.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        when, kind, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if kind not in TYPES:
+            raise ValueError(kind)
+        return datetime.fromisoformat(when), kind, int(row_id)
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def _after_cursor(model, kind: str, cursor):
+    when, cursor_kind, cursor_id = cursor
+
+    if kind == cursor_kind:
+        return tuple_(model.date, model.id) < tuple_(when, cursor_id)
+    if kind < cursor_kind:
+        return model.date <= when
+    return model.date < when
+
+
+def _branch(model, kind, category_column, description_column, user_id, limit,
+            cursor=None, category=None, start=None, end=None):
+    query = select(
+        model.id.label("id"),
+        literal(kind).label("type"),
+        model.amount.label("amount"),
+        model.date.label("date"),
+        category_column.label("category"),
+        description_column.label("description"),
+    ).where(
+        model.user_id == user_id,
+        model.date.isnot(None),
+    )
+
+    if category is not None:
+        query = query.where(category_column == category)
+    if start is not None:
+        query = query.where(model.date >= datetime.combine(start, time.min))
+    if end is not None:
+        query = query.where(model.date < datetime.combine(end + timedelta(days=1), time.min))
+    if cursor is not None:
+        query = query.where(_after_cursor(model, kind, cursor))
+
+    query = query.order_by(model.date.desc(), model.id.desc()).limit(limit)
+    return select(query.subquery())
+
+
+def feed_query(user_id: int, fetch: int, position=None, type: str = None,
+               category: str = None, start: date = None, end: date = None):
+    filters = dict(cursor=position, category=category, start=start, end=end)
+
+    branches = []
+    if type in (None, EXPENSE):
+        branches.append(_branch(
+            Expense, EXPENSE, Expense.category, Expense.description, user_id, fetch, **filters
+        ))
+    if type in (None, INCOME):
+        branches.append(_branch(
+            Income, INCOME, Income.source, null(), user_id, fetch, **filters
+        ))
+
+    combined = union_all(*branches).subquery() if len(branches) > 1 else branches[0].subquery()
+
+    return select(combined).order_by(
+        combined.c.date.desc(),
+        combined.c.type.desc(),
+        combined.c.id.desc(),
+    ).limit(fetch)
+
+
+def feed(
+    db: Session,
+    user_id: int,
+    limit: int = 20,
+    cursor: str = None,
+    type: str = None,
+    category: str = None,
+    start: date = None,
+    end: date = None,
+):
+    """One page of the user's combined ledger plus the cursor for the next page."""
+    position = decode_cursor(cursor) if cursor else None
+
+    rows = db.execute(
+        feed_query(user_id, limit + 1, position, type, category, start, end)
+    ).all()
+
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1]) if len(rows) > limit else None
+    return page, next_cursor
+
+
+def serialize(row) -> dict:
+    item = {
+        "_id": row.id,
+        "type": row.type,
+        "amount": float(row.amount),
+        "date": row.date.isoformat(),
+        "category": row.category,
+    }
+    if row.type == EXPENSE:
+        item["description"] = row.description
+    return item
@@ -0,0 +1,117 @@
+from sqlalchemy import Date, Integer, String, cast, func, literal
+from sqlalchemy.orm import Session
+
+# ---------------------------
+# TIME BUCKETING
+# ---------------------------
+# Every bucket is rendered as a sortable label so GROUP BY / ORDER BY stay in SQL:
+#   day     -> 2025-03-14
+#   week    -> 2025-03-10   (Monday the week starts on)
+#   month   -> 2025-03
+#   quarter -> 2025-Q1
+#   year    -> 2025
+GRANULARITIES = ("day", "week", "month", "quarter", "year")
+
+_PG_FORMATS = {
+    "day": "YYYY-MM-DD",
+    "week": "YYYY-MM-DD",
+    "month": "YYYY-MM",
+    "quarter": 'YYYY-"Q"Q',
+    "year": "YYYY",
+}
+
+_SQLITE_FORMATS = {
+    "day": "%Y-%m-%d",
+    "week": "%Y-%m-%d",
+    "month": "%Y-%m",
+    "year": "%Y",
+}
+
+
+def dialect_name(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def validate_granularity(granularity: str) -> str:
+    granularity = (granularity or "month").lower()
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unsupported granularity '{granularity}', use one of {', '.join(GRANULARITIES)}")
+    return granularity
+
+
+def time_bucket(column, granularity: str, dialect: str):
+    """
+    SQL expression that truncates `column` to `granularity` and renders the
+    bucket label, using date_trunc on Postgres and strftime on SQLite.
+    """
+    granularity = validate_granularity(granularity)
+
+    if dialect == "postgresql":
+        return func.to_char(func.date_trunc(granularity, column), _PG_FORMATS[granularity])
+
+    if dialect == "sqlite":
+        if granularity == "week":
+            # 'weekday 0' jumps forward to Sunday, -6 days lands on that week's Monday
+            return func.strftime(_SQLITE_FORMATS["week"], column, "weekday 0", "-6 days")
+
+        if granularity == "quarter":
+            quarter = (cast(func.strftime("%m", column), Integer) + 2) // 3
+            return func.strftime("%Y", column).concat("-Q").concat(cast(quarter, String))
+
+        return func.strftime(_SQLITE_FORMATS[granularity], column)
+
+    raise ValueError(f"Time bucketing is not supported on '{dialect}'")
+
+
+def weekday(column, dialect: str):
+    """Day of week as an integer, 0 = Sunday ... 6 = Saturday, on both dialects."""
+    if dialect == "postgresql":
+        return cast(func.extract("dow", column), Integer)
+
+    if dialect == "sqlite":
+        return cast(func.strftime("%w", column), Integer)
+
+    raise ValueError(f"Weekday extraction is not supported on '{dialect}'")
+
+
+def day_ordinal(column, dialect: str):
+    """Calendar day as an integer equal to date.toordinal(), on both dialects."""
+    if dialect == "postgresql":
+        return cast(column, Date) - cast(literal("0001-01-01"), Date) + 1
+
+    if dialect == "sqlite":
+        # julianday of a bare date always ends in .5; 1721424.5 is the julian day of 0000-12-31
+        return cast(func.julianday(func.date(column)) - 1721424.5, Integer)
+
+    raise ValueError(f"Day extraction is not supported on '{dialect}'")
+
+
+# ---------------------------
+# MONTH LABEL ROLL-UP
+# ---------------------------
+# Granularities that can be derived from a "YYYY-MM" label (e.g. monthly_rollup.month)
+MONTH_DERIVED = ("month", "quarter", "year")
+
+
+def month_label(value) -> str:
+    """Python twin of time_bucket(..., "month", ...) for a date / datetime."""
+    return value.strftime("%Y-%m")
+
+
+def month_label_bucket(month_column, granularity: str):
+    """Re-bucket a "YYYY-MM" label column into month, quarter or year labels."""
+    granularity = validate_granularity(granularity)
+
+    if granularity == "month":
+        return month_column
+
+    year = func.substr(month_column, 1, 4)
+
+    if granularity == "year":
+        return year
+
+    if granularity == "quarter":
+        quarter = (cast(func.substr(month_column, 6, 2), Integer) + 2) // 3
+        return year.concat("-Q").concat(cast(quarter, String))
+
+    raise ValueError(f"'{granularity}' buckets cannot be derived from month labels")
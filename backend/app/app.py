@@ -5,10 +5,14 @@ import os
 import logging
 
 from backend.api.database import engine
-from backend.api.models.vitya import Base
+from backend.api import migrations
 
 from backend.api.routes import users, income, expense, vitya, ai
+from backend.api.services import micro_batcher
+from backend.api.services.principal_cache import principal_cache
+from backend.api.services.response_cache import response_cache
 from backend.chats import chat
+from backend.chats import router as chat_router
 
 # ---------------------------
 # LOGGING
@@ -29,13 +33,22 @@ app = FastAPI(
 )
 
 # ---------------------------
-# STARTUP EVENT (DB INIT)
+# STARTUP EVENT (DB CHECK)
 # ---------------------------
+# Schema changes run once per deploy via `python -m backend.api.migrations upgrade`.
+# AUTO_MIGRATE=1 applies them at boot instead (single-process dev only).
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "").lower() in ("1", "true", "yes")
+
 @app.on_event("startup")
 def on_startup():
     try:
-        Base.metadata.create_all(bind=engine)
-        logging.info("✅ Database connected & tables created")
+        if AUTO_MIGRATE:
+            migrations.upgrade(engine)
+
+        if migrations.is_current(engine):
+            logging.info("✅ Database connected & schema up to date")
+        else:
+            logging.warning("⚠️ Database schema is behind; run `python -m backend.api.migrations upgrade`")
     except Exception as e:
         logging.error(f"❌ DB connection failed: {e}")
         raise
@@ -76,6 +89,15 @@ def root():
 def health_check():
     return {"status": "ok"}
 
+@app.get("/health/stats")
+def health_stats():
+    return {
+        "principal_cache": principal_cache.stats(),
+        "ai_response_cache": response_cache.stats(),
+        "micro_batchers": micro_batcher.stats(),
+        "chat_router": chat_router.stats()
+    }
+
 # ---------------------------
 # ROUTERS
 # ---------------------------
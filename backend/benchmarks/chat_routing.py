@@ -0,0 +1,156 @@
+"""
+Chat routing benchmark: the old handler-by-handler trigger checks vs the
+single-pass router.
+
+    python -m backend.benchmarks.chat_routing --messages 20000 [--corpus FILE]
+
+The corpus is a mix of generated chat messages (English and Hinglish
+transactions, chart / report / utility requests, small talk) or one message
+per line from --corpus. For each message it times
+
+    legacy  the checks the chain used to make before a handler answered:
+            build_intent for files, substring tests for news / wiki, the
+            transaction parse, chart data extraction, utility keywords
+    router  router.route on the lowercased message
+
+and checks that every stage whose old check passes is among the router's
+candidates, i.e. that routing never skips a handler that would answer.
+No handler is actually run, so nothing touches the network or a database.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# the handlers import the API modules, which need a database URL to load
+if not os.getenv("DATABASE_URL"):
+    _db_path = os.path.join(tempfile.mkdtemp(prefix="vitya-bench-"), "chat.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+
+from backend.chats import router
+from backend.chats.handlers.chart_handler import CHART_WORDS, contains_any, extract_chart_data
+from backend.chats.handlers.file_handler import build_intent
+from backend.chats.handlers.news_handler import NEWS_TRIGGERS
+from backend.chats.handlers.transaction_handler import (
+    detect_category, detect_txn_type, extract_amount, normalize
+)
+from backend.chats.handlers.wiki_handler import WIKI_TRIGGERS
+
+TEMPLATES = [
+    "I spent {n} on {thing}",
+    "paid {n} for {thing} today",
+    "{thing} kharida {n} ka",
+    "{n} rs ka {thing} liya",
+    "salary credited {n}",
+    "got {n} income from freelance",
+    "papa ne {n} diya",
+    "{n} rupees aaya",
+    "show me a pie chart",
+    "expense graph please",
+    "compare income vs expense",
+    "food {n} rent {m} travel {k}",
+    "monthly trend report",
+    "what is my total expense",
+    "total income",
+    "make a qr code for {thing}",
+    "barcode {n}",
+    "plan my budget",
+    "download expenses csv",
+    "export income excel sheet",
+    "create a presentation on {thing} with ai theme",
+    "pdf notes on {thing}",
+    "latest business news",
+    "tech news about {thing}",
+    "who is the RBI governor",
+    "tell me about {thing}",
+    "hello",
+    "thanks a lot",
+    "can you give me some advice",
+    "tell a joke",
+    "bye",
+    "I want to learn something new",
+    "how do categories work",
+    "ok",
+]
+THINGS = ["pizza", "petrol", "netflix", "groceries", "medicine", "movie tickets", "electricity bill", "chai"]
+
+
+def corpus(messages: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [
+        rng.choice(TEMPLATES).format(
+            n=rng.randint(10, 50_000), m=rng.randint(10, 5000), k=rng.randint(10, 5000), thing=rng.choice(THINGS)
+        )
+        for _ in range(messages)
+    ]
+
+
+# ---------------------------
+# OLD CHECKS
+# ---------------------------
+def legacy_checks(message: str):
+    """Yield (stage, would the handler answer) in the old order."""
+    msg = message.lower().strip()
+
+    yield "file", build_intent(msg, message).file_type != "unknown"
+    yield "news", any(word in msg for word in NEWS_TRIGGERS)
+    yield "wiki", any(word in msg for word in WIKI_TRIGGERS)
+
+    text = normalize(message)
+    amount, txn_type = extract_amount(text), detect_txn_type(text)
+    detect_category(text)
+    yield "transaction", amount is not None and txn_type is not None
+
+    yield "chart", len(extract_chart_data(msg)) >= 2 or contains_any(msg, CHART_WORDS)
+    yield "utility", (
+        contains_any(msg, ["qr", "barcode", "total expense", "total income", "budget"])
+        or ("monthly" in msg and ("report" in msg or "trend" in msg))
+    )
+    yield "info", True
+
+
+def legacy_winner(message: str) -> str:
+    return next(stage for stage, answers in legacy_checks(message) if answers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chat routing benchmark")
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--corpus", default=None, help="file with one message per line")
+    args = parser.parse_args(argv)
+
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as f:
+            messages = [line.strip() for line in f if line.strip()]
+    else:
+        messages = corpus(args.messages)
+
+    started = time.perf_counter()
+    winners = [legacy_winner(m) for m in messages]
+    legacy = time.perf_counter() - started
+
+    started = time.perf_counter()
+    routes = [router.route(m.lower().strip()) for m in messages]
+    routed = time.perf_counter() - started
+
+    missed, extra_tries = 0, 0
+    for message, winner, candidates in zip(messages, winners, routes):
+        answering = [stage for stage, answers in legacy_checks(message) if answers]
+        if not set(answering) <= set(candidates):
+            missed += 1
+            print(f"  missed {sorted(set(answering) - set(candidates))}: {message!r}")
+        extra_tries += candidates.index(winner)
+
+    n = len(messages)
+    print(f"{n:,} messages")
+    print(f"  legacy  {legacy / n * 1e6:8.1f} us/message")
+    print(f"  router  {routed / n * 1e6:8.1f} us/message  ({legacy / routed:,.0f}x)")
+    print(f"  handlers tried before the answering one: {extra_tries / n:.3f} per message")
+    print(f"  messages where routing would skip an answering handler: {missed}")
+    return 1 if missed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Memory profile of the streaming CSV export.
+
+    python -m backend.benchmarks.export_memory --rows 1000000
+
+Seeds a throwaway SQLite database (unless DATABASE_URL is already set),
+drains exports.csv_chunks for one user and samples the Python heap peak
+(tracemalloc) and process RSS as the row count grows. A flat profile means
+memory no longer scales with ledger size. --legacy runs the old
+relationship + StringIO implementation for comparison.
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+if not os.getenv("DATABASE_URL"):
+    _db_path = os.path.join(tempfile.mkdtemp(prefix="vitya-bench-"), "export.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+
+from backend.api.database import SessionLocal, engine
+from backend.api.models.vitya import Base, Expense, User
+from backend.api.services import exports
+from backend.api.services.process_stats import peak_rss_mb
+
+CATEGORIES = ["Food", "Transport", "Housing", "Shopping", "Utilities", "Health"]
+
+
+def seed(rows: int, batch: int = 50_000) -> int:
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        user_id = conn.execute(
+            User.__table__.insert().values(username=f"bench-{time.time_ns()}", email=None, password="x")
+        ).inserted_primary_key[0]
+
+        start = datetime(2015, 1, 1)
+        for offset in range(0, rows, batch):
+            conn.execute(Expense.__table__.insert(), [
+                {
+                    "user_id": user_id,
+                    "amount": float((i * 37) % 5000) + 0.5,
+                    "category": CATEGORIES[i % len(CATEGORIES)],
+                    "description": f"benchmark row {i}",
+                    "date": start + timedelta(minutes=5 * i),
+                }
+                for i in range(offset, min(offset + batch, rows))
+            ])
+
+    return user_id
+
+
+def run_streaming(user_id: int, checkpoints):
+    samples = []
+    rows = 0
+    size = 0
+
+    for chunk in exports.csv_chunks("expenses", user_id):
+        rows += chunk.count("\n")
+        size += len(chunk)
+        if checkpoints and rows >= checkpoints[0]:
+            checkpoints.pop(0)
+            samples.append((rows, tracemalloc.get_traced_memory()[1], peak_rss_mb()))
+
+    return rows, size, samples
+
+
+def run_legacy(user_id: int):
+    db = SessionLocal()
+    try:
+        user = db.get(User, user_id)
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(["ID", "Amount", "Category", "Description", "Date"])
+        for e in user.expenses:
+            writer.writerow([e.id, float(e.amount), e.category, e.description or "", e.date.strftime("%Y-%m-%d") if e.date else ""])
+        body = output.getvalue()
+        return body.count("\n"), len(body), [(body.count("\n"), tracemalloc.get_traced_memory()[1], peak_rss_mb())]
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streaming CSV export memory benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--user-id", type=int, default=None, help="export an existing user instead of seeding")
+    parser.add_argument("--legacy", action="store_true", help="measure the old buffered export")
+    args = parser.parse_args(argv)
+
+    user_id = args.user_id
+    if user_id is None:
+        started = time.perf_counter()
+        user_id = seed(args.rows)
+        print(f"seeded {args.rows:,} rows in {time.perf_counter() - started:.1f}s")
+
+    checkpoints = sorted({max(1, args.rows * p // 10) for p in range(1, 11)})
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    if args.legacy:
+        rows, size, samples = run_legacy(user_id)
+    else:
+        rows, size, samples = run_streaming(user_id, checkpoints)
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+
+    mode = "legacy" if args.legacy else "streaming"
+    print(f"{mode}: {rows:,} lines, {size / 1e6:.1f} MB in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s)")
+    print(f"{'rows':>12} {'heap peak MB':>14} {'peak RSS MB':>12}")
+    for rows_seen, heap_peak, rss in samples:
+        print(f"{rows_seen:>12,} {heap_peak / 1e6:>14.1f} {rss if rss is not None else '-':>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
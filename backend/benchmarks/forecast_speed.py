@@ -0,0 +1,137 @@
+"""
+Forecasting micro-benchmark: per-request sklearn fit vs vectorised NumPy.
+
+    python -m backend.benchmarks.forecast_speed --rows 200000 --repeat 20
+
+Seeds a throwaway SQLite database (unless DATABASE_URL is already set) with
+one user's expenses spread over several years and categories, then times
+answering "next month" for every category:
+
+    legacy  the old predict_expense: load Expense rows per category, fit a
+            fresh sklearn LinearRegression on transaction indices
+    ols     forecasting.forecast(method="ols"), one rollup query
+    holt    forecasting.forecast(method="holt"), one rollup query
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+if not os.getenv("DATABASE_URL"):
+    _db_path = os.path.join(tempfile.mkdtemp(prefix="vitya-bench-"), "forecast.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+
+import numpy as np
+
+from backend.api import migrations
+from backend.api.database import SessionLocal, engine
+from backend.api.models.vitya import Expense, User
+from backend.api.services import forecasting, rollups
+
+CATEGORIES = ["Food", "Transport", "Housing", "Shopping", "Utilities", "Health", "Travel", "Bills"]
+
+
+def seed(rows: int, batch: int = 50_000) -> int:
+    migrations.upgrade(engine)
+
+    with engine.begin() as conn:
+        user_id = conn.execute(
+            User.__table__.insert().values(username=f"bench-{time.time_ns()}", email=None, password="x")
+        ).inserted_primary_key[0]
+
+        start = datetime(2019, 1, 1)
+        step = timedelta(days=5 * 365) / rows
+        for offset in range(0, rows, batch):
+            conn.execute(Expense.__table__.insert(), [
+                {
+                    "user_id": user_id,
+                    "amount": float((i * 37) % 5000) + 0.5,
+                    "category": CATEGORIES[i % len(CATEGORIES)],
+                    "description": f"benchmark row {i}",
+                    "date": start + step * i,
+                }
+                for i in range(offset, min(offset + batch, rows))
+            ])
+
+    db = SessionLocal()
+    try:
+        rollups.rebuild(db, user_id)
+        db.commit()
+    finally:
+        db.close()
+
+    return user_id
+
+
+def run_legacy(db, user_id: int) -> dict:
+    from sklearn.linear_model import LinearRegression
+
+    result = {}
+    for category in CATEGORIES:
+        expenses = db.query(Expense).filter(
+            Expense.user_id == user_id,
+            Expense.category == category
+        ).order_by(Expense.date).all()
+
+        amounts = [float(e.amount) for e in expenses]
+        X = np.arange(len(amounts)).reshape(-1, 1)
+        model = LinearRegression()
+        model.fit(X, np.array(amounts))
+        result[category] = float(model.predict([[len(amounts)]])[0])
+    return result
+
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            fn(db)
+            samples.append(time.perf_counter() - started)
+        finally:
+            db.close()
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Forecasting micro-benchmark")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--user-id", type=int, default=None, help="benchmark an existing user instead of seeding")
+    args = parser.parse_args(argv)
+
+    user_id = args.user_id
+    if user_id is None:
+        started = time.perf_counter()
+        user_id = seed(args.rows)
+        print(f"seeded {args.rows:,} rows in {time.perf_counter() - started:.1f}s")
+
+    # first sklearn import is paid once per worker; keep it out of the samples
+    started = time.perf_counter()
+    import sklearn.linear_model  # noqa: F401
+    print(f"sklearn import: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    runs = {
+        "legacy": lambda db: run_legacy(db, user_id),
+        "ols": lambda db: forecasting.forecast(db, user_id, method="ols"),
+        "holt": lambda db: forecasting.forecast(db, user_id, method="holt"),
+    }
+    repeats = {"legacy": max(1, args.repeat // 5), "ols": args.repeat, "holt": args.repeat}
+
+    print(f"{'method':>8} {'median ms':>10} {'min ms':>8} {'runs':>5}")
+    medians = {}
+    for name, fn in runs.items():
+        samples = timed(fn, repeats[name])
+        medians[name] = statistics.median(samples)
+        print(f"{name:>8} {medians[name] * 1000:>10.2f} {min(samples) * 1000:>8.2f} {len(samples):>5}")
+
+    print(f"speed-up ols vs legacy: {medians['legacy'] / medians['ols']:,.0f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
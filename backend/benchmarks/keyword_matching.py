@@ -0,0 +1,108 @@
+"""
+Keyword categorisation benchmark: one compiled regex per keyword vs the
+shared KeywordMatcher.
+
+    python -m backend.benchmarks.keyword_matching --rows 1000000
+
+Generates bank-statement style descriptions (merchant names, UPI / card
+prefixes, Hinglish notes, reference numbers on some rows) and times
+categorising all of them
+
+    legacy  detect_category as it was: a \\b...\\b regex search per keyword
+    single  detect_category on each row (KeywordMatcher.best)
+    batch   detect_categories over the whole list, as statement imports do
+
+and checks that all three agree on every row.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+# the handlers import the API modules, which need a database URL to load
+if not os.getenv("DATABASE_URL"):
+    _db_path = os.path.join(tempfile.mkdtemp(prefix="vitya-bench-"), "keywords.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+
+from backend.chats.handlers.transaction_handler import detect_categories, detect_category, normalize
+from backend.chats.utils.categories import CATEGORY_KEYWORDS
+
+PREFIXES = ["UPI/", "POS ", "NEFT-", "ACH D- ", "card purchase ", ""]
+MERCHANTS = [
+    "swiggy order", "zomato", "uber trip", "ola cab", "hp petrol pump", "netflix", "spotify premium",
+    "electricity bill", "airtel recharge", "apollo pharmacy medicine", "big bazaar groceries",
+    "amazon shopping", "flipkart", "rent transfer", "salary credit", "irctc train ticket",
+    "cafe coffee day", "pvr cinema movie", "jio broadband", "gym membership", "school fees",
+    "khana kharida", "dawai liya", "chai nashta", "transfer to friend", "atm withdrawal",
+]
+
+
+def descriptions(rows: int, seed: int = 0):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(rows):
+        text = rng.choice(PREFIXES) + rng.choice(MERCHANTS)
+        # a third of the rows carry a reference number and never repeat
+        if rng.random() < 0.33:
+            text += f"/{rng.randint(100000, 999999)}"
+        out.append(text)
+    return out
+
+
+# ---------------------------
+# OLD MATCHING
+# ---------------------------
+KEYWORD_PATTERNS = {
+    category: [(re.compile(rf"\b{re.escape(word)}\b"), weight) for word, weight in keywords.items()]
+    for category, keywords in CATEGORY_KEYWORDS.items()
+}
+
+
+def legacy_category(text: str):
+    if "salary" in text:
+        return "salary"
+
+    scores = {}
+    for category, patterns in KEYWORD_PATTERNS.items():
+        score = sum(weight for pattern, weight in patterns if pattern.search(text))
+        if score:
+            scores[category] = score
+
+    return max(scores, key=scores.get) if scores else "other"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keyword categorisation benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    texts = [normalize(d) for d in descriptions(args.rows)]
+
+    started = time.perf_counter()
+    legacy = [legacy_category(t) for t in texts]
+    legacy_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    single = [detect_category(t) for t in texts]
+    single_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch = detect_categories(texts)
+    batch_s = time.perf_counter() - started
+
+    mismatched = sum(a != b or a != c for a, b, c in zip(legacy, single, batch))
+
+    n = len(texts)
+    print(f"{n:,} descriptions ({len(set(texts)):,} distinct)")
+    print(f"  legacy  {legacy_s:8.2f} s")
+    print(f"  single  {single_s:8.2f} s  ({legacy_s / single_s:,.1f}x)")
+    print(f"  batch   {batch_s:8.2f} s  ({legacy_s / batch_s:,.1f}x)")
+    print(f"  rows categorised differently: {mismatched}")
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
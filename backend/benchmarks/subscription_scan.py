@@ -0,0 +1,148 @@
+"""
+Subscription detector benchmark.
+
+    python -m backend.benchmarks.subscription_scan --rows 100000 --repeat 10
+
+Seeds a throwaway SQLite database (unless DATABASE_URL is already set) with
+one user's expenses: a handful of planted weekly / monthly / yearly charges
+with a little date and amount jitter, buried in random one-off spending.
+Times subscriptions.detect (query + NumPy scan) and the scan on its own,
+and checks that every planted charge is found.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+if not os.getenv("DATABASE_URL"):
+    _db_path = os.path.join(tempfile.mkdtemp(prefix="vitya-bench-"), "subscriptions.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+
+import numpy as np
+
+from backend.api import migrations
+from backend.api.database import SessionLocal, engine
+from backend.api.models.vitya import Expense, User
+from backend.api.services import subscriptions
+from backend.api.time_buckets import dialect_name
+
+# description, category, amount, period
+PLANTED = [
+    ("Netflix", "Entertainment", 649.0, "monthly"),
+    ("House rent", "Housing", 18000.0, "monthly"),
+    ("HDFC car loan EMI", "Bills", 12450.0, "monthly"),
+    ("Jio recharge", "Utilities", 299.0, "monthly"),
+    ("Gym membership", "Health", 1200.0, "monthly"),
+    ("Milkman", "Food", 420.0, "weekly"),
+    ("Amazon Prime annual", "Entertainment", 1499.0, "yearly"),
+    ("Car insurance", "Transport", 9800.0, "yearly"),
+]
+NOISE = ["Swiggy order", "Uber ride", "Groceries", "Shopping", "Chai", "Petrol", "Pharmacy", "Movie"]
+CATEGORIES = ["Food", "Transport", "Shopping", "Health", "Entertainment"]
+
+
+def seed(rows: int, days: int = 1095, batch: int = 50_000) -> int:
+    migrations.upgrade(engine)
+    rng = np.random.default_rng(7)
+    start = datetime(2023, 1, 1)
+
+    planted = []
+    for description, category, amount, period in PLANTED:
+        when = start + timedelta(days=int(rng.integers(0, 28)))
+        while when < start + timedelta(days=days):
+            planted.append({
+                "description": description,
+                "category": category,
+                "amount": round(amount * float(rng.uniform(0.98, 1.02)), 2),
+                "date": when + timedelta(days=int(rng.integers(-1, 2))),
+            })
+            when = subscriptions.next_charge(when.date(), period)
+            when = datetime(when.year, when.month, when.day)
+
+    with engine.begin() as conn:
+        user_id = conn.execute(
+            User.__table__.insert().values(username=f"bench-{time.time_ns()}", email=None, password="x")
+        ).inserted_primary_key[0]
+
+        conn.execute(Expense.__table__.insert(), [dict(row, user_id=user_id) for row in planted])
+
+        noise = rows - len(planted)
+        offsets = rng.uniform(0, days * 86400, noise)
+        amounts = np.round(rng.lognormal(6, 1.2, noise), 2)
+        picks = rng.integers(0, len(NOISE), noise)
+        for lo in range(0, noise, batch):
+            conn.execute(Expense.__table__.insert(), [
+                {
+                    "user_id": user_id,
+                    "amount": float(amounts[i]),
+                    "category": CATEGORIES[i % len(CATEGORIES)],
+                    "description": f"{NOISE[picks[i]]} #{i}",
+                    "date": start + timedelta(seconds=float(offsets[i])),
+                }
+                for i in range(lo, min(lo + batch, noise))
+            ])
+
+    return user_id
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Subscription detector benchmark")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--user-id", type=int, default=None, help="benchmark an existing user instead of seeding")
+    args = parser.parse_args(argv)
+
+    user_id = args.user_id
+    if user_id is None:
+        started = time.perf_counter()
+        user_id = seed(args.rows)
+        print(f"seeded {args.rows:,} rows in {time.perf_counter() - started:.1f}s")
+
+    samples = []
+    for _ in range(args.repeat):
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            result = subscriptions.detect(db, user_id, lookback_days=0)
+            samples.append(time.perf_counter() - started)
+        finally:
+            db.close()
+
+    print(f"detect: median {statistics.median(samples) * 1000:.1f} ms, min {min(samples) * 1000:.1f} ms, "
+          f"{args.repeat} runs")
+
+    # the NumPy part alone, on arrays already in memory
+    db = SessionLocal()
+    try:
+        days, amounts, descriptions, categories = zip(*db.execute(
+            subscriptions.history_query(dialect_name(db), user_id)
+        ).all())
+    finally:
+        db.close()
+    days, amounts = np.array(days, dtype=np.int64), np.array(amounts, dtype=np.float64)
+
+    scans = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        subscriptions.find_recurring(days, amounts, subscriptions._codes(descriptions, categories))
+        scans.append(time.perf_counter() - started)
+    print(f"scan of {len(days):,} rows (keys + periodicity): median {statistics.median(scans) * 1000:.1f} ms")
+
+    for s in result["subscriptions"]:
+        print(f"  {s['period']:>8} {s['amount']:>10.2f} x{s['charges']:<4} next {s['next_charge']}  "
+              f"{s['description']}")
+
+    if args.user_id is None:
+        found = {s["description"] for s in result["subscriptions"]}
+        missing = [d for d, _, _, _ in PLANTED if d not in found]
+        extra = sorted(found - {d for d, _, _, _ in PLANTED})
+        print(f"planted {len(PLANTED)}, missing {missing or 'none'}, unexpected {extra or 'none'}")
+        return 1 if missing else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,10 +6,8 @@ from backend.api.database import get_db
 from backend.api.models.vitya import User
 from backend.api.auth import token_required
 
-from backend.chats.handlers.file_handler import handle_file_request
-from backend.chats.handlers.news_handler import handle_news_request
-from backend.chats.handlers.wiki_handler import handle_wiki_request
-from backend.chats.handlers.chatbot_handler import handle_chatbot
+from backend.chats.chatbot import NOT_UNDERSTOOD
+from backend.chats.router import dispatch
 
 router = APIRouter()
 
@@ -27,18 +25,9 @@ def chat(
     if not user_message:
         return {"type": "text", "content": "Message required."}
 
-    msg = user_message.lower().strip()
-
-    res = handle_file_request(msg, user_message, current_user)
-    if res:
-        return res
-
-    res = handle_news_request(msg, user_message)
-    if res:
-        return res
-
-    res = handle_wiki_request(msg, user_message)
+    # file > news > wiki > transaction > chart > utility > info, one scan
+    res = dispatch(user_message, db, current_user)
     if res:
         return res
 
-    return handle_chatbot(user_message, db, current_user)
\ No newline at end of file
+    return dict(NOT_UNDERSTOOD)
\ No newline at end of file
@@ -9,6 +9,13 @@ from backend.api.routes.vitya import (
     get_expenses_chart,
 )
 
+# every substring handle_chart_request branches on; besides these only
+# inline data ("food 200 rent 500", two or more numbers) makes a chart
+CHART_WORDS = (
+    "multi line", "compare", "vs", "composed", "combined", "mix", "stack", "pie", "donut",
+    "line", "trend", "area", "scatter", "radar", "heatmap", "waterfall", "chart", "graph",
+)
+
 
 def contains_any(text: str, words) -> bool:
     return any(word in text for word in words)
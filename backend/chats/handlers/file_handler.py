@@ -22,6 +22,23 @@ from backend.chats.utils.media_and_exports import generate_all_files, generate_q
 
 FileType = Literal["csv", "docx", "pdf", "pptx", "unknown"]
 
+# whole-word triggers per file type, checked in this order
+FILE_TYPE_WORDS = {
+    # CSV / Excel / Spreadsheet
+    "csv": ("csv", "excel", "spreadsheet", "sheet", "table"),
+    # DOCX / Word / Document
+    "docx": ("doc", "docx", "word", "document", "report", "notes"),
+    # PDF
+    "pdf": ("pdf", "portable document"),
+    # PPT / Presentation / Slides
+    "pptx": ("ppt", "pptx", "powerpoint", "slides", "presentation", "deck", "slideshow"),
+}
+
+FILE_TYPE_PATTERNS = {
+    file_type: re.compile(rf"\b({'|'.join(map(re.escape, words))})\b")
+    for file_type, words in FILE_TYPE_WORDS.items()
+}
+
 
 @dataclass
 class PromptIntent:
@@ -52,21 +69,9 @@ def detect_file_type(msg: str) -> FileType:
     """
     msg = normalize_text(msg)
 
-    # CSV / Excel / Spreadsheet
-    if re.search(r"\b(csv|excel|spreadsheet|sheet|table)\b", msg):
-        return "csv"
-
-    # DOCX / Word / Document
-    if re.search(r"\b(doc|docx|word|document|report|notes)\b", msg):
-        return "docx"
-
-    # PDF
-    if re.search(r"\b(pdf|portable document)\b", msg):
-        return "pdf"
-
-    # PPT / Presentation / Slides
-    if re.search(r"\b(ppt|pptx|powerpoint|slides|presentation|deck|slideshow)\b", msg):
-        return "pptx"
+    for file_type, pattern in FILE_TYPE_PATTERNS.items():
+        if pattern.search(msg):
+            return file_type
 
     return "unknown"
 
@@ -5,9 +5,12 @@ from backend.chats.utils.news_utils import (
     detect_news_category,
 )
 
+# substring match, so "newsletter" counts too
+NEWS_TRIGGERS = ("news",)
+
 
 def handle_news_request(msg, user_message):
-    if "news" not in msg:
+    if not any(word in msg for word in NEWS_TRIGGERS):
         return None
 
     category = detect_news_category(user_message)
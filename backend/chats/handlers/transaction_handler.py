@@ -1,8 +1,9 @@
 import re
 from datetime import datetime
 
-from backend.api.models.vitya import Expense, Income
+from backend.api.services import ledger
 from backend.chats.utils.categories import CATEGORY_KEYWORDS
+from backend.chats.utils.keyword_matcher import KeywordMatcher
 
 NORMALIZATION_MAP = {
     "kharida": "buy",
@@ -14,11 +15,13 @@ NORMALIZATION_MAP = {
 }
 
 
+# one pass for every word; no replacement is itself a key, so order doesn't matter
+NORMALIZATION_PATTERN = re.compile(rf"\b({'|'.join(map(re.escape, NORMALIZATION_MAP))})\b")
+
+
 def normalize(text: str) -> str:
     text = (text or "").lower().strip()
-    for k, v in NORMALIZATION_MAP.items():
-        text = re.sub(rf"\b{re.escape(k)}\b", v, text)
-    return text
+    return NORMALIZATION_PATTERN.sub(lambda m: NORMALIZATION_MAP[m.group(1)], text)
 
 
 def contains_any(text: str, words) -> bool:
@@ -30,12 +33,14 @@ def extract_amount(text: str):
     return float(match.group(1)) if match else None
 
 
-def detect_txn_type(text: str):
-    income_words = ["salary", "income", "credited", "received", "earn"]
-    expense_words = ["spent", "buy", "paid", "expense"]
+# substring matches against the normalized text
+INCOME_WORDS = ("salary", "income", "credited", "received", "earn")
+EXPENSE_WORDS = ("spent", "buy", "paid", "expense")
 
-    income_score = sum(word in text for word in income_words)
-    expense_score = sum(word in text for word in expense_words)
+
+def detect_txn_type(text: str):
+    income_score = sum(word in text for word in INCOME_WORDS)
+    expense_score = sum(word in text for word in EXPENSE_WORDS)
 
     if income_score > expense_score:
         return "income"
@@ -44,21 +49,21 @@ def detect_txn_type(text: str):
     return None
 
 
+# indexed once; detect_category runs per row during statement imports
+CATEGORY_MATCHER = KeywordMatcher(CATEGORY_KEYWORDS)
+
+
 def detect_category(text: str):
     if "salary" in text:
         return "salary"
 
-    scores = {}
-    for category, keywords in CATEGORY_KEYWORDS.items():
-        score = sum(
-            weight
-            for word, weight in keywords.items()
-            if re.search(rf"\b{re.escape(word)}\b", text)
-        )
-        if score:
-            scores[category] = score
+    return CATEGORY_MATCHER.best(text, "other")
+
 
-    return max(scores, key=scores.get) if scores else "other"
+def detect_categories(texts) -> list:
+    """detect_category for a batch of normalized texts."""
+    categories = CATEGORY_MATCHER.best_many(texts, "other")
+    return ["salary" if "salary" in text else category for text, category in zip(texts, categories)]
 
 
 def handle_transaction(message: str, db, current_user):
@@ -69,25 +74,23 @@ def handle_transaction(message: str, db, current_user):
     category = detect_category(text)
 
     if amount is not None and txn_type == "expense":
-        db.add(
-            Expense(
-                amount=amount,
-                category=category,
-                date=datetime.utcnow(),
-                user_id=current_user.id,
-            )
+        ledger.record_expense(
+            db,
+            current_user.id,
+            amount=amount,
+            category=category,
+            date=datetime.utcnow(),
         )
         db.commit()
         return {"type": "text", "content": f"Expense ₹{amount} added in {category}"}
 
     if amount is not None and txn_type == "income":
-        db.add(
-            Income(
-                amount=amount,
-                source=category,
-                date=datetime.utcnow(),
-                user_id=current_user.id,
-            )
+        ledger.record_income(
+            db,
+            current_user.id,
+            amount=amount,
+            source=category,
+            date=datetime.utcnow(),
         )
         db.commit()
         return {"type": "text", "content": f"Income ₹{amount} added as {category}"}
@@ -6,6 +6,10 @@ from backend.api.models.vitya import Expense, Income
 from backend.api.routes.ai import budget_plan, monthly_trend
 from backend.chats.utils.media_and_exports import generate_qr, generate_barcode
 
+# every substring handle_utility_request can answer on ("monthly" needs
+# "report" or "trend" as well)
+UTILITY_WORDS = ("qr", "barcode", "total expense", "total income", "budget", "monthly")
+
 
 def handle_utility_request(message: str, db, current_user):
     text = (message or "").lower().strip()
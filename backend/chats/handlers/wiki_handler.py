@@ -2,9 +2,11 @@ from fastapi import HTTPException
 from backend.chats.utils.wikipedia_utils import get_complete
 from backend.chats.utils.news_utils import extract_wiki_title
 
+WIKI_TRIGGERS = ("wiki", "wikipedia", "who is", "what is", "tell me about")
+
 
 def handle_wiki_request(msg, user_message):
-    if not any(word in msg for word in ["wiki", "wikipedia", "who is", "what is", "tell me about"]):
+    if not any(word in msg for word in WIKI_TRIGGERS):
         return None
 
     try:
@@ -0,0 +1,188 @@
+"""
+Single-pass intent router for /api/chat.
+
+Every handler's trigger vocabulary is compiled at import time into one
+regex: an alternation of named groups (one per stage) inside a lookahead,
+so finditer reports a token at every position and overlapping triggers
+("total expense" for utility, "expense" for transactions) are all seen.
+The lowercased message is scanned once; the stages whose triggers fired
+are tried in the old priority order
+
+    file > news > wiki > transaction > chart > utility > info
+
+and the first one that answers wins. A trigger is a necessary condition
+for its handler answering, so skipping the others never changes the
+reply; a handler that still says no just passes to the next candidate.
+info answers everything and always comes last.
+
+Time spent routing and inside each stage is kept as histograms and
+exposed through stats() (and /health/stats).
+"""
+import re
+import threading
+import time
+
+from backend.api.services.metrics import LATENCY_MS_BUCKETS, Histogram
+from backend.chats.handlers.chart_handler import CHART_WORDS, handle_chart_request
+from backend.chats.handlers.file_handler import FILE_TYPE_WORDS, handle_file_request
+from backend.chats.handlers.info_handler import handle_info_request
+from backend.chats.handlers.news_handler import NEWS_TRIGGERS, handle_news_request
+from backend.chats.handlers.transaction_handler import (
+    EXPENSE_WORDS, INCOME_WORDS, NORMALIZATION_MAP, handle_transaction
+)
+from backend.chats.handlers.utility_handler import UTILITY_WORDS, handle_utility_request
+from backend.chats.handlers.wiki_handler import WIKI_TRIGGERS, handle_wiki_request
+
+STAGES = ("file", "news", "wiki", "transaction", "chart", "utility", "info")
+# what chatbot_reply used to run after the request-level handlers
+CHATBOT_STAGES = ("transaction", "chart", "utility", "info")
+
+
+# ---------------------------
+# VOCABULARY
+# ---------------------------
+def _alternation(words) -> str:
+    # longest first, so a word never loses to its own prefix
+    return "|".join(re.escape(word) for word in sorted(set(words), key=lambda w: (-len(w), w)))
+
+
+_TXN_WORDS = INCOME_WORDS + EXPENSE_WORDS
+# Hinglish verbs the transaction handler rewrites into one of its words
+_TXN_HINDI = [word for word, english in NORMALIZATION_MAP.items() if any(w in english for w in _TXN_WORDS)]
+
+# stage -> substrings; the file and Hinglish triggers are whole words
+VOCABULARY = {
+    "file": [word for words in FILE_TYPE_WORDS.values() for word in words],
+    "news": list(NEWS_TRIGGERS),
+    "wiki": list(WIKI_TRIGGERS),
+    "transaction": list(_TXN_WORDS) + _TXN_HINDI,
+    "chart": list(CHART_WORDS),
+    "utility": list(UTILITY_WORDS),
+}
+
+_GROUPS = (
+    ("file", rf"\b(?:{_alternation(VOCABULARY['file'])})\b"),
+    ("news", _alternation(VOCABULARY["news"])),
+    ("wiki", _alternation(VOCABULARY["wiki"])),
+    ("transaction", rf"{_alternation(_TXN_WORDS)}|\b(?:{_alternation(_TXN_HINDI)})\b"),
+    ("chart", _alternation(VOCABULARY["chart"])),
+    ("utility", _alternation(VOCABULARY["utility"])),
+    # first digit of every number
+    ("number", r"(?<!\d)\d"),
+)
+
+
+def _check_vocabulary():
+    # within the lookahead only the first group matching at a position is
+    # reported: a trigger that is a prefix of another stage's would hide it
+    for stage, words in VOCABULARY.items():
+        for other, other_words in VOCABULARY.items():
+            if stage >= other:
+                continue
+            for word in words:
+                clash = next((w for w in other_words if w.startswith(word) or word.startswith(w)), None)
+                if clash is not None:
+                    raise ValueError(f"Trigger '{word}' ({stage}) overlaps '{clash}' ({other})")
+
+
+_check_vocabulary()
+
+TRIGGERS = re.compile("(?=" + "|".join(f"(?P<{name}>{body})" for name, body in _GROUPS) + ")")
+
+
+# ---------------------------
+# ROUTING
+# ---------------------------
+def route(msg: str) -> tuple:
+    """Stages worth trying for a lowercased message, in priority order."""
+    fired = set()
+    numbers = 0
+    for match in TRIGGERS.finditer(msg):
+        if match.lastgroup == "number":
+            numbers += 1
+        else:
+            fired.add(match.lastgroup)
+
+    candidates = {
+        "file": "file" in fired,
+        "news": "news" in fired,
+        "wiki": "wiki" in fired,
+        # an amount and an income / expense word
+        "transaction": numbers > 0 and "transaction" in fired,
+        # a chart word, or inline data pairs such as "food 200 rent 500"
+        "chart": "chart" in fired or numbers >= 2,
+        "utility": "utility" in fired,
+        "info": True,
+    }
+    return tuple(stage for stage in STAGES if candidates[stage])
+
+
+_HANDLERS = {
+    "file": lambda msg, message, db, user: handle_file_request(msg, message, user),
+    "news": lambda msg, message, db, user: handle_news_request(msg, message),
+    "wiki": lambda msg, message, db, user: handle_wiki_request(msg, message),
+    "transaction": lambda msg, message, db, user: handle_transaction(message, db, user),
+    "chart": lambda msg, message, db, user: handle_chart_request(message, db, user),
+    "utility": lambda msg, message, db, user: handle_utility_request(message, db, user),
+    "info": lambda msg, message, db, user: handle_info_request(message),
+}
+
+
+# ---------------------------
+# TIMING
+# ---------------------------
+class _StageStats:
+
+    def __init__(self):
+        self.attempts = 0
+        self.answered = 0
+        self.ms = Histogram(LATENCY_MS_BUCKETS)
+
+    def snapshot(self) -> dict:
+        return {"attempts": self.attempts, "answered": self.answered, "ms": self.ms.snapshot()}
+
+
+_lock = threading.Lock()
+_route_ms = Histogram(LATENCY_MS_BUCKETS)
+_stages = {stage: _StageStats() for stage in STAGES}
+
+
+def _record(stage: str, started: float, answered: bool):
+    elapsed = (time.perf_counter() - started) * 1000
+    with _lock:
+        stats = _stages[stage]
+        stats.attempts += 1
+        stats.answered += answered
+        stats.ms.observe(elapsed)
+
+
+def stats() -> dict:
+    with _lock:
+        return {
+            "route_ms": _route_ms.snapshot(),
+            "stages": {stage: s.snapshot() for stage, s in _stages.items()},
+        }
+
+
+# ---------------------------
+# DISPATCH
+# ---------------------------
+def dispatch(message: str, db, current_user, stages=STAGES):
+    """First answer among the routed stages (limited to `stages`), or None."""
+    started = time.perf_counter()
+    msg = (message or "").lower().strip()
+    candidates = [stage for stage in route(msg) if stage in stages]
+    with _lock:
+        _route_ms.observe((time.perf_counter() - started) * 1000)
+
+    for stage in candidates:
+        started = time.perf_counter()
+        res = None
+        try:
+            res = _HANDLERS[stage](msg, message, db, current_user)
+        finally:
+            _record(stage, started, bool(res))
+        if res:
+            return res
+
+    return None
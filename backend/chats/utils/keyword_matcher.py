@@ -0,0 +1,112 @@
+"""
+Weighted keyword matching over a precompiled token / phrase index.
+
+A table maps labels to keywords, either {label: {keyword: weight}} or
+{label: [keyword, ...]} (weight 1 each). Keywords are split into tokens
+with the same pattern as the text, once, into two dicts:
+
+    single-token keywords   token -> entries
+    phrases                 first token -> (remaining tokens, entry)
+
+Matching tokenises the lowercased text once and walks the tokens, so the
+cost is one dict lookup per token whatever the size of the table. A
+keyword counts once per text however often it occurs; a keyword listed
+under several labels scores for each of them. Phrases match whole
+consecutive tokens ("see you" does not match "see yourself").
+
+    best(text)        label with the highest total, ties to the earlier label
+    first(text)       earliest label (table order) with any match
+    scores(text)      {label: total} for the labels that matched
+    best_many(texts)  best() over a batch, each distinct text scored once
+"""
+import re
+
+WORD = re.compile(r"\w+")
+_UNSEEN = object()
+
+
+class KeywordMatcher:
+
+    def __init__(self, table: dict, token_pattern=WORD):
+        self.labels = list(table)
+        self.token_pattern = re.compile(token_pattern)
+
+        self._entries = []      # entry id -> (label index, weight)
+        self._words = {}        # token -> [entry id, ...]
+        self._phrases = {}      # first token -> [(remaining tokens, entry id), ...]
+
+        for index, keywords in enumerate(table.values()):
+            weighted = keywords.items() if isinstance(keywords, dict) else ((k, 1) for k in keywords)
+            for keyword, weight in weighted:
+                tokens = self.tokens(keyword)
+                if not tokens:
+                    continue
+
+                entry = len(self._entries)
+                self._entries.append((index, weight))
+
+                if len(tokens) == 1:
+                    self._words.setdefault(tokens[0], []).append(entry)
+                else:
+                    self._phrases.setdefault(tokens[0], []).append((tuple(tokens[1:]), entry))
+
+    def tokens(self, text: str) -> list:
+        return self.token_pattern.findall((text or "").lower())
+
+    # ---------------------------
+    # MATCHING
+    # ---------------------------
+    def _matched(self, text: str) -> set:
+        tokens = self.tokens(text)
+        words, phrases = self._words, self._phrases
+        hits = set()
+
+        for i, token in enumerate(tokens):
+            entries = words.get(token)
+            if entries:
+                hits.update(entries)
+
+            candidates = phrases.get(token)
+            if candidates:
+                for rest, entry in candidates:
+                    if tuple(tokens[i + 1:i + 1 + len(rest)]) == rest:
+                        hits.add(entry)
+
+        return hits
+
+    def _totals(self, text: str) -> dict:
+        totals = {}
+        for entry in self._matched(text):
+            index, weight = self._entries[entry]
+            totals[index] = totals.get(index, 0) + weight
+        return totals
+
+    def scores(self, text: str) -> dict:
+        totals = self._totals(text)
+        return {self.labels[index]: totals[index] for index in sorted(totals)}
+
+    def best(self, text: str, default=None):
+        totals = self._totals(text)
+        if not totals:
+            return default
+        return self.labels[min(totals, key=lambda index: (-totals[index], index))]
+
+    def first(self, text: str, default=None):
+        hits = self._matched(text)
+        if not hits:
+            return default
+        return self.labels[min(self._entries[entry][0] for entry in hits)]
+
+    # ---------------------------
+    # BATCH
+    # ---------------------------
+    def best_many(self, texts, default=None) -> list:
+        """best() for every text; repeated texts (statement descriptions) are scored once."""
+        seen = {}
+        results = []
+        for text in texts:
+            label = seen.get(text, _UNSEEN)
+            if label is _UNSEEN:
+                label = seen[text] = self.best(text, default)
+            results.append(label)
+        return results
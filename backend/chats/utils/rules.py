@@ -1,5 +1,7 @@
 import re
 
+from backend.chats.utils.keyword_matcher import KeywordMatcher
+
 rules = {
     "greeting": {
         "type": "text",
@@ -208,25 +210,14 @@ def normalize_message(message: str) -> str:
     return message
 
 
-def keyword_matches(message: str, keyword: str) -> bool:
-    """
-    Single word keywords -> word boundary match
-    Multi-word keywords -> normalized phrase search
-    """
-    keyword = keyword.lower().strip()
-
-    if " " in keyword:
-        return keyword in message
-
-    return bool(re.search(rf"\b{re.escape(keyword)}\b", message))
+# single words and phrases both match on whole tokens; the first intent (in
+# the order above) with any keyword wins
+RULES_MATCHER = KeywordMatcher({name: intent["keywords"] for name, intent in rules.items()})
 
 
 def get_reply(message: str):
-    msg = normalize_message(message)
-
-    for intent in rules.values():
-        for keyword in intent["keywords"]:
-            if keyword_matches(msg, keyword):
-                return intent["response"]
+    intent = RULES_MATCHER.first(normalize_message(message))
+    if intent is not None:
+        return rules[intent]["response"]
 
     return "Sorry, I didn't understand. Please contact support."
\ No newline at end of file
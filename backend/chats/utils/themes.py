@@ -1,6 +1,7 @@
-import re
 from typing import Dict
 
+from backend.chats.utils.keyword_matcher import KeywordMatcher
+
 TECH_THEMES = {
     "ai": {"bg": "F0F9FF", "accent": (37, 99, 235), "text": (30, 58, 138)},      # Blue/Brain
     "cyber": {"bg": "0F172A", "accent": (34, 197, 94), "text": (248, 250, 252)}, # Dark/Green
@@ -260,26 +261,16 @@ THEME_KEYWORDS = {
     ],
 }
 
-def detect_theme(text: str) -> Dict:
-    raw = text.lower()
-    normalized = re.sub(r"[^a-z0-9]+", " ", raw)
-    padded = f" {normalized} "
-
-    scores = {}
-    for theme, keywords in THEME_KEYWORDS.items():
-        score = 0
-        for kw in keywords:
-            kw_norm = kw.lower().strip()
+# Multi-word phrases get a stronger weight
+THEME_MATCHER = KeywordMatcher(
+    {
+        theme: {kw: 3 if " " in kw.strip() else 1 for kw in keywords}
+        for theme, keywords in THEME_KEYWORDS.items()
+    },
+    token_pattern=r"[a-z0-9]+",
+)
 
-            # Multi-word phrases get a stronger weight
-            if " " in kw_norm:
-                if f" {kw_norm} " in padded:
-                    score += 3
-            else:
-                if re.search(rf"\b{re.escape(kw_norm)}\b", normalized):
-                    score += 1
 
-        scores[theme] = score
-
-    best_theme = max(scores, key=scores.get)
-    return TECH_THEMES[best_theme] if scores[best_theme] > 0 else TECH_THEMES["default"]
+def detect_theme(text: str) -> Dict:
+    best_theme = THEME_MATCHER.best(text)
+    return TECH_THEMES[best_theme] if best_theme else TECH_THEMES["default"]